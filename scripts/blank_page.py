@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Blank Page Detection
+====================
+Erkennt leere Seiten (Versos, Vorsatzblätter) vor der Inferenz
+
+Bisher rechnet das Modell auf leeren Seiten die volle Zeit und erzeugt Whitespace
+oder Unicode-Rauschen, das erst clean_ocr_text() als "[EMPTY PAGE - FILTERED]"
+markiert. Die Vorab-Prüfung arbeitet nur mit billigen Statistiken auf einer
+verkleinerten Graustufen-Kopie:
+
+- Lokaler Kontrast: Pixel, die deutlich dunkler sind als ihre (stark geglättete)
+  Umgebung → Tinte; Flecken, Vergilbung und Scanner-Hintergrund fallen heraus
+- Rand (Seitenkanten, Schatten, Falz) wird ignoriert
+- Tinten-Anteil und Anzahl der Zusammenhangskomponenten
+- Ausgerichtete Komponenten: Nachbar gleicher Höhe in derselben Zeile →
+  Buchstaben einer Textzeile; Stockflecken und Risse liegen verstreut
+
+Klassen:
+- blank:        wenige Komponenten, kaum Tinte, keine Textzeile (Papierstruktur,
+                Stockflecken, Risse, einzelne Zeichen) → keine Inferenz,
+                Text = EMPTY_PAGE
+- nearly_blank: Exlibris, Signatur, Stempel, Einband → wird normal gerechnet
+- content:      alles andere
+
+Als "blank" gilt nur, was auch nach der Inferenz als leer gefiltert würde
+(weniger als 50 Buchstaben). `check` prüft das an synthetischen Seiten mit 50
+Buchstaben ab 1% der Seitenlänge; kleinere Schrift ist in der Analyse-Auflösung
+nicht mehr zuverlässig sichtbar. Bilder, die kleiner als die Analyse-Auflösung
+sind, gelten immer als content.
+
+Usage:
+    from blank_page import classify_page
+
+    page_class, stats = classify_page(pil_image)
+
+    python scripts/blank_page.py classify data/1617-wecker-antidotiarum-001-150_pdf/*.jpg
+    python scripts/blank_page.py validate results/pdf_*/..._ocr.json --images results/pdf_*/images
+    python scripts/blank_page.py check
+
+    # OCR-Skripte: --skip-blank
+"""
+
+import argparse
+import io
+import json
+import random
+import sys
+from pathlib import Path
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont, ImageStat
+
+sys.path.append(str(Path(__file__).parent))
+from calibration_targets import connected_components
+from filter_artifacts import EMPTY_PAGE, is_empty_page_artifact
+from image_loader import load_image
+
+# Analyse-Auflösung (längere Seite); Schwellwerte unten gelten für diese Größe
+ANALYSIS_SIZE = 1024
+
+BACKGROUND_SCALE = 16       # Glättung des Hintergrunds: Bild auf 1/16 verkleinern und zurück
+INK_CONTRAST = 40           # So viel dunkler als die Umgebung → Tinte
+MARGIN = 0.05               # Ignorierter Rand je Seite (Anteil der Bildgröße)
+MIN_COMPONENT = 2           # Kleinere Komponenten (einzelne Pixel) sind Rauschen
+
+LINE_GAP = 2.0              # Nachbar in derselben Zeile: Abstand höchstens 2 Zeichenhöhen,
+LINE_OVERLAP = 0.5          # mindestens halbe Höhe überlappend,
+LINE_HEIGHT_RATIO = 3.0     # höchstens dreimal so hoch oder niedrig
+
+BLANK_COMPONENTS = 150      # Höchstens so viele Komponenten,
+BLANK_INK = 0.01            # so wenig Tinte
+BLANK_ALIGNED = 28          # und so wenige ausgerichtete Komponenten → blank
+NEARLY_BLANK_COMPONENTS = 500
+NEARLY_BLANK_INK = 0.03
+
+PAGE_CLASSES = ('blank', 'nearly_blank', 'content')
+
+# check: 50 Buchstaben (Grenze von is_empty_page_artifact) auf diesen Seiten
+CHECK_LETTERS = 50
+CHECK_PAGE_SIZES = ((2000, 3000), (1500, 2200), (2500, 3500), (3000, 2000))
+CHECK_LETTER_SIZES = (0.01, 0.013, 0.018, 0.025)   # Schriftgröße, Anteil der längeren Seite
+CHECK_INKS = ((40, 35, 30), (150, 140, 125))       # Schwarz, verblasst
+CHECK_WORDS = ("antidotum contra venena omnia sumitur cum vino recipe theriacae "
+               "mithridatii radicis angelicae drachmam unam misce fiat pulvis").split()
+
+
+def page_stats(image: Image.Image) -> dict:
+    """
+    Billige Statistiken für die Leer-Erkennung
+
+    Returns:
+        dict mit stddev, ink_coverage, components und aligned (None, wenn nicht
+        gezählt) oder {'too_small': True}
+    """
+    gray = image.convert('L')
+    if max(gray.size) < ANALYSIS_SIZE:
+        return {'too_small': True}
+    gray.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+    w, h = gray.size
+
+    background = gray.resize((max(1, w // BACKGROUND_SCALE), max(1, h // BACKGROUND_SCALE)), Image.BOX)
+    background = background.resize((w, h), Image.BILINEAR)
+    # Tinte = um wie viel dunkler als die Umgebung (heller → 0)
+    contrast = ImageChops.subtract(background, gray)
+
+    margin_x, margin_y = int(w * MARGIN), int(h * MARGIN)
+    contrast = contrast.crop((margin_x, margin_y, w - margin_x, h - margin_y))
+
+    stddev = ImageStat.Stat(contrast).stddev[0]
+    ink = contrast.point(lambda v: 255 if v > INK_CONTRAST else 0)
+    coverage = ink.histogram()[255] / (ink.size[0] * ink.size[1])
+
+    stats = {'stddev': round(stddev, 2), 'ink_coverage': round(coverage, 4), 'components': None, 'aligned': None}
+    # Keine Abkürzung über die Streuung: 50 Buchstaben kleiner Schrift bleiben darunter
+    if coverage <= NEARLY_BLANK_INK:
+        boxes = connected_components(ink, MIN_COMPONENT)
+        stats['components'] = len(boxes)
+        if len(boxes) <= BLANK_COMPONENTS:
+            stats['aligned'] = aligned_components(boxes)
+    return stats
+
+
+def aligned_components(boxes: list) -> int:
+    """Anzahl der Komponenten mit einem Nachbarn wie in einer Textzeile (ähnliche Höhe, gleiche Zeile, nah)"""
+    aligned = 0
+    for i, (x0, y0, x1, y1, _) in enumerate(boxes):
+        height = y1 - y0
+        for j, (other_x0, other_y0, other_x1, other_y1, _) in enumerate(boxes):
+            other_height = other_y1 - other_y0
+            if i == j or max(height, other_height) > LINE_HEIGHT_RATIO * min(height, other_height):
+                continue
+            if min(y1, other_y1) - max(y0, other_y0) < LINE_OVERLAP * min(height, other_height):
+                continue
+            if max(other_x0 - x1, x0 - other_x1, 0) <= LINE_GAP * max(height, other_height):
+                aligned += 1
+                break
+    return aligned
+
+
+def choose_class(stats: dict) -> str:
+    """Klasse für diese Statistiken"""
+    if stats.get('too_small'):
+        return 'content'
+    if stats['components'] is None:
+        return 'content'
+    if (stats['components'] <= BLANK_COMPONENTS and stats['ink_coverage'] <= BLANK_INK
+            and stats['aligned'] <= BLANK_ALIGNED):
+        return 'blank'
+    if stats['components'] <= NEARLY_BLANK_COMPONENTS:
+        return 'nearly_blank'
+    return 'content'
+
+
+def classify_page(image: Image.Image):
+    """Klassifiziere eine Seite, liefert (page_class, stats)"""
+    stats = page_stats(image)
+    return choose_class(stats), stats
+
+
+def setup_utf8():
+    """UTF-8 Fix für Windows"""
+    if sys.platform == 'win32':
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def cmd_classify(args):
+    counts = {page_class: 0 for page_class in PAGE_CLASSES}
+    for path in args.images:
+        page_class, stats = classify_page(load_image(path, (ANALYSIS_SIZE, ANALYSIS_SIZE)))
+        counts[page_class] += 1
+        print(f"{path}: {page_class} {stats}")
+
+    print(f"\n{', '.join(f'{page_class}: {count}' for page_class, count in counts.items())}")
+
+
+def cmd_validate(args):
+    """Vorab-Klasse gegen das Ergebnis der Inferenz (clean_ocr_text() hätte die Seite geleert?)"""
+    with open(args.ocr_json, 'r', encoding='utf-8') as f:
+        pages = json.load(f).get('pages', [])
+
+    images_dir = Path(args.images)
+    skipped_empty = lost = kept_empty = total = 0
+
+    for page in pages:
+        if 'text' not in page or not page.get('image_file'):
+            continue
+        image_file = images_dir / page['image_file']
+        if not image_file.exists():
+            print(f"[WARNING] Image not found: {image_file}")
+            continue
+
+        total += 1
+        empty = page['text'] == EMPTY_PAGE or is_empty_page_artifact(page['text'])
+        page_class, stats = classify_page(load_image(image_file, (ANALYSIS_SIZE, ANALYSIS_SIZE)))
+
+        if page_class == 'blank' and empty:
+            skipped_empty += 1
+        elif page_class == 'blank':
+            lost += 1
+            print(f"[LOST] page {page['page']} ({page['image_file']}): blank, but OCR found "
+                  f"{len(page['text'].strip())} characters {stats}")
+        elif empty:
+            kept_empty += 1
+            print(f"[MISSED] page {page['page']} ({page['image_file']}): {page_class}, OCR text empty {stats}")
+
+    print("="*60)
+    print("BLANK PAGE DETECTION VS. OCR")
+    print("="*60)
+    print(f"Pages:                   {total}")
+    print(f"Skipped, empty anyway:   {skipped_empty}")
+    print(f"Skipped, text lost:      {lost}")
+    print(f"Empty, still computed:   {kept_empty}")
+
+
+def render_text_page(size, letter_size, ink, letters=CHECK_LETTERS, seed=0) -> Image.Image:
+    """Synthetische Seite: Papierton mit `letters` Buchstaben Fließtext oder schmaler Spalte"""
+    rng = random.Random(seed)
+    width, height = size
+    image = Image.new('RGB', size, (235, 228, 210))
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=letter_size)
+
+    left = rng.randint(int(width * 0.1), int(width * 0.3))
+    right = rng.choice([int(width * 0.85), left + letter_size * 12])
+    x, y = left, rng.randint(int(height * 0.1), int(height * 0.6))
+    while letters > 0:
+        word = rng.choice(CHECK_WORDS)[:letters]
+        draw.text((x, y), word, fill=ink, font=font)
+        letters -= len(word)
+        x += draw.textlength(word + ' ', font=font)
+        if x > right:
+            x, y = left, y + letter_size * 1.6
+    return image
+
+
+def cmd_check(args):
+    """Seiten mit 50 Buchstaben dürfen nie blank sein (clean_ocr_text() würde sie behalten)"""
+    total = failed = 0
+    for size in CHECK_PAGE_SIZES:
+        for share in CHECK_LETTER_SIZES:
+            letter_size = round(share * max(size))
+            for ink in CHECK_INKS:
+                for seed in range(args.seeds):
+                    page_class, stats = classify_page(render_text_page(size, letter_size, ink, seed=seed))
+                    total += 1
+                    if page_class == 'blank':
+                        failed += 1
+                        print(f"[ERROR] {size[0]}x{size[1]}, {letter_size}px, ink {ink}, seed {seed}: blank {stats}")
+
+    print("="*60)
+    print(f"Synthetic pages with {CHECK_LETTERS} letters: {total}, classified blank: {failed}")
+    if failed:
+        sys.exit(1)
+    print("[OK] No text page classified as blank")
+
+
+def main():
+    setup_utf8()
+
+    parser = argparse.ArgumentParser(description='Classify pages as blank, nearly blank or content before OCR')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    classify = commands.add_parser('classify', help='Classify images')
+    classify.add_argument('images', nargs='+', help='Image files')
+
+    validate = commands.add_parser('validate', help='Compare the classes with the empty pages of an _ocr.json')
+    validate.add_argument('ocr_json', help='Raw OCR result (test_ocr_mets.py / test_ocr_pdf.py)')
+    validate.add_argument('--images', required=True, help='Directory with the page images')
+
+    check = commands.add_parser('check', help=f'Render synthetic pages with {CHECK_LETTERS} letters and fail if any is classified blank')
+    check.add_argument('--seeds', type=int, default=3, help='Layouts per page size, letter size and ink (default: 3)')
+
+    args = parser.parse_args()
+    {'classify': cmd_classify, 'validate': cmd_validate, 'check': cmd_check}[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Kalibrier-Targets erkennen und wegschneiden
+===========================================
+Farbkarten, Graukeile und Lineale neben dem Dokument werden vor der OCR
+abgeschnitten, statt ihre Beschriftung ("Farbkarte #13", "Grauskala", "Inches",
+Patch-Buchstaben und -Nummern) zu lesen und danach wegzufiltern
+
+Arbeitet nur mit billigen Heuristiken auf einer verkleinerten Kopie:
+- Hintergrund = Median-Farbe des Bildrands (Scanner-Unterlage)
+- Vordergrund-Objekte = Zusammenhangskomponenten der Pixel, die sich vom
+  Hintergrund abheben (nach Dilatation, damit Text und Papier verschmelzen)
+- Farbkarte: Objekt mit vielen gesättigten Pixeln in mindestens 3 Farbtönen
+- Graukeil mit Farbmarken: wenige gesättigte Pixel, aber ebenfalls >= 3 Farbtöne
+- Lineal: langes, schmales Objekt mit regelmäßigen Teilstrichen
+- Zuschnitt: Bounding-Box der übrigen Objekte (Dokument) plus Rand, so verkleinert,
+  dass kein Target mehr hineinragt; ohne Dokument-Objekt wird nichts geschnitten
+
+Usage:
+    from calibration_targets import crop_targets
+
+    image, targets = crop_targets(pil_image)   # targets: None, wenn nichts gefunden
+
+    python scripts/calibration_targets.py detect data/o_szd.151/images/*.jpg --save results/targets
+    python scripts/calibration_targets.py validate results/mets_o_szd.151_*/o_szd.151_ocr.json \\
+        --images data/o_szd.151/images
+
+    # OCR-Skripte: --crop-targets
+"""
+
+import argparse
+import io
+import json
+import sys
+from collections import deque
+from pathlib import Path
+
+from PIL import Image, ImageChops, ImageFilter
+
+sys.path.append(str(Path(__file__).parent))
+from image_loader import SOURCE_SIZE, load_image, source_size
+
+# Analyse-Auflösung (längere Seite)
+ANALYSIS_SIZE = 256
+
+# Schwellwerte
+BACKGROUND_DIFF = 25        # Max. Kanal-Abstand zur Hintergrundfarbe, darüber → Vordergrund
+DILATE = 5                  # Filtergröße, mit der Text und Papier zu einem Objekt verschmelzen
+MIN_OBJECT_AREA = 0.003     # Kleinere Objekte (Staub, Flecken) ignorieren (Anteil der Bildfläche)
+MIN_DOCUMENT_AREA = 0.02    # Mindestgröße eines Dokument-Objekts
+SATURATION = 100            # Ab dieser Sättigung (HSV, 0-255) zählt ein Pixel als farbig
+MIN_VALUE = 50              # ... sofern es nicht fast schwarz ist
+CHECKER_SATURATED = 0.05    # Anteil farbiger Pixel einer Farbkarte
+MARKER_SATURATED = 0.005    # Anteil farbiger Pixel eines Graukeils mit Farbmarken
+HUE_BINS = 6                # Farbton-Sektoren (je 60°)
+MIN_HUE_SHARE = 0.05        # Anteil der farbigen Pixel, ab dem ein Sektor zählt
+MIN_HUES = 3                # Verschiedene Farbtöne einer Farbkarte
+RULER_ASPECT = 5            # Seitenverhältnis eines Lineals
+RULER_MIN_TICKS = 8         # Mindestanzahl Teilstriche
+RULER_MAX_CV = 0.35         # Max. Variationskoeffizient der Strich-Abstände
+MARGIN = 0.02               # Rand um das Dokument (Anteil der Bildgröße)
+
+TARGETS_INFO = 'calibration_targets'   # image.info-Schlüssel eines zugeschnittenen Bildes
+
+# Beschriftungen von Kalibrier-Targets im OCR-Text (Teilmenge von filter_artifacts.ARTIFACT_KEYWORDS
+# ohne Wörter wie "red" oder "cm", die auch im Dokument vorkommen)
+TARGET_KEYWORDS = ('farbkarte', 'grauskala', 'color chart', 'gray scale', 'grayscale',
+                   'b.i.g.', 'inches', 'centimetres', 'centimeters')
+
+
+def _background(image: Image.Image) -> tuple:
+    """Median-Farbe der äußersten Pixel-Reihen"""
+    w, h = image.size
+    strips = [image.crop((0, 0, w, 1)), image.crop((0, h - 1, w, h)),
+              image.crop((0, 0, 1, h)), image.crop((w - 1, 0, w, h))]
+    border = Image.new('RGB', (2 * (w + h), 1))
+    x = 0
+    for strip in strips:
+        strip = strip.resize((strip.width * strip.height, 1))
+        border.paste(strip, (x, 0))
+        x += strip.width
+    return tuple(_median(channel.histogram()) for channel in border.split())
+
+
+def _median(histogram) -> int:
+    half = sum(histogram) / 2
+    seen = 0
+    for i, count in enumerate(histogram):
+        seen += count
+        if seen >= half:
+            return i
+    return 255
+
+
+def connected_components(mask: Image.Image, min_pixels: int) -> list:
+    """Bounding-Boxen (x0, y0, x1, y1, pixel) der 4-zusammenhängenden Vordergrund-Bereiche"""
+    w, h = mask.size
+    data = mask.tobytes()
+    seen = bytearray(w * h)
+    components = []
+
+    for start in range(w * h):
+        if not data[start] or seen[start]:
+            continue
+
+        seen[start] = 1
+        queue = deque([start])
+        x0, y0, x1, y1, count = w, h, -1, -1, 0
+        while queue:
+            p = queue.popleft()
+            x, y = p % w, p // w
+            count += 1
+            x0, x1 = min(x0, x), max(x1, x)
+            y0, y1 = min(y0, y), max(y1, y)
+            for q in (p - 1 if x > 0 else -1, p + 1 if x < w - 1 else -1, p - w, p + w):
+                if 0 <= q < w * h and data[q] and not seen[q]:
+                    seen[q] = 1
+                    queue.append(q)
+
+        if count >= min_pixels:
+            components.append((x0, y0, x1 + 1, y1 + 1, count))
+
+    return components
+
+
+def _colour_stats(hsv: Image.Image, box) -> tuple:
+    """(Anteil farbiger Pixel, Anzahl Farbtöne) innerhalb box"""
+    hue, saturation, value = hsv.crop(box).split()
+    coloured = ImageChops.multiply(saturation.point(lambda s: 255 if s >= SATURATION else 0),
+                                   value.point(lambda v: 255 if v >= MIN_VALUE else 0))
+    total = coloured.width * coloured.height
+    count = coloured.histogram()[255]
+    if not count:
+        return 0.0, 0
+
+    sectors = [0] * HUE_BINS
+    for h, n in enumerate(hue.histogram(mask=coloured)):
+        sectors[h * HUE_BINS // 256] += n
+    hues = sum(1 for n in sectors if n >= MIN_HUE_SHARE * count)
+    return count / total, hues
+
+
+def _has_ticks(gray: Image.Image, box) -> bool:
+    """Regelmäßige dunkle Striche entlang der langen Achse (Lineal)"""
+    region = gray.crop(box)
+    w, h = region.size
+    horizontal = w >= h
+    profile = list(region.resize((w, 1) if horizontal else (1, h), Image.BOX).tobytes())
+    if len(profile) < 2 * RULER_MIN_TICKS:
+        return False
+
+    threshold = (max(profile) + min(profile)) / 2
+    starts = [i for i in range(1, len(profile)) if profile[i] < threshold <= profile[i - 1]]
+    if len(starts) < RULER_MIN_TICKS:
+        return False
+
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    mean = sum(gaps) / len(gaps)
+    deviation = (sum((g - mean) ** 2 for g in gaps) / len(gaps)) ** 0.5
+    return deviation / mean <= RULER_MAX_CV
+
+
+def _classify(hsv, gray, box) -> str:
+    """'colour_checker', 'grey_scale', 'ruler' oder None (Dokument/Sonstiges)"""
+    saturated, hues = _colour_stats(hsv, box)
+    if hues >= MIN_HUES and saturated >= CHECKER_SATURATED:
+        return 'colour_checker'
+    if hues >= MIN_HUES and saturated >= MARKER_SATURATED:
+        return 'grey_scale'
+
+    w, h = box[2] - box[0], box[3] - box[1]
+    if max(w, h) >= RULER_ASPECT * min(w, h) and _has_ticks(gray, box):
+        return 'ruler'
+    return None
+
+
+def _overlaps(a, b) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _exclude(box, target) -> tuple:
+    """box so verkleinern, dass target nicht mehr hineinragt (größte verbleibende Fläche)"""
+    x0, y0, x1, y1 = box
+    candidates = [
+        (x0, y0, x1, target[1]),    # Target unten → oberhalb behalten
+        (x0, target[3], x1, y1),    # Target oben → unterhalb behalten
+        (x0, y0, target[0], y1),    # Target rechts
+        (target[2], y0, x1, y1),    # Target links
+    ]
+    valid = [c for c in candidates if c[2] > c[0] and c[3] > c[1]]
+    if not valid:
+        return None
+    return max(valid, key=lambda c: (c[2] - c[0]) * (c[3] - c[1]))
+
+
+def detect_targets(image: Image.Image) -> dict:
+    """
+    Kalibrier-Targets und Dokument-Bereich finden
+
+    Returns:
+        dict mit targets [{kind, box}], crop_box (oder None) - Boxen in Pixeln der
+        Originalgröße (source_size)
+    """
+    width, height = source_size(image)
+
+    small = image.convert('RGB')
+    small.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+    w, h = small.size
+
+    background = Image.new('RGB', small.size, _background(small))
+    diff = ImageChops.difference(small, background).split()
+    distance = ImageChops.lighter(ImageChops.lighter(diff[0], diff[1]), diff[2])
+    mask = distance.point(lambda v: 255 if v > BACKGROUND_DIFF else 0).filter(ImageFilter.MaxFilter(DILATE))
+
+    hsv = small.convert('HSV')
+    gray = small.convert('L')
+
+    targets, documents = [], []
+    for x0, y0, x1, y1, count in connected_components(mask, int(MIN_OBJECT_AREA * w * h) + 1):
+        box = (x0, y0, x1, y1)
+        kind = _classify(hsv, gray, box)
+        if kind:
+            targets.append({'kind': kind, 'box': box})
+        elif count >= MIN_DOCUMENT_AREA * w * h:
+            documents.append(box)
+
+    crop_box = None
+    if targets and documents:
+        margin_x, margin_y = int(MARGIN * w) + 1, int(MARGIN * h) + 1
+        crop_box = (max(0, min(b[0] for b in documents) - margin_x), max(0, min(b[1] for b in documents) - margin_y),
+                    min(w, max(b[2] for b in documents) + margin_x), min(h, max(b[3] for b in documents) + margin_y))
+        for target in targets:
+            if crop_box and _overlaps(crop_box, target['box']):
+                crop_box = _exclude(crop_box, target['box'])
+
+    scale_x, scale_y = width / w, height / h
+
+    def to_source(box):
+        return [round(box[0] * scale_x), round(box[1] * scale_y),
+                min(width, round(box[2] * scale_x)), min(height, round(box[3] * scale_y))]
+
+    return {
+        'targets': [{'kind': t['kind'], 'box': to_source(t['box'])} for t in targets],
+        'crop_box': to_source(crop_box) if crop_box else None,
+    }
+
+
+def crop_box(image: Image.Image, box) -> Image.Image:
+    """Ausschnitt box (Originalpixel) aus einem evtl. reduziert dekodierten Bild"""
+    width, height = source_size(image)
+    scale_x, scale_y = image.size[0] / width, image.size[1] / height
+    pixels = (int(box[0] * scale_x), int(box[1] * scale_y), round(box[2] * scale_x), round(box[3] * scale_y))
+
+    cropped = image.crop(pixels)
+    if cropped.size != (box[2] - box[0], box[3] - box[1]):
+        cropped.info[SOURCE_SIZE] = (box[2] - box[0], box[3] - box[1])
+    else:
+        cropped.info.pop(SOURCE_SIZE, None)
+    return cropped
+
+
+def crop_targets(image: Image.Image):
+    """
+    Schneide Kalibrier-Targets weg
+
+    Returns:
+        (Bild, Info) - Info None, wenn nichts geschnitten wurde, sonst dict mit
+        targets, crop_box (Originalpixel) und kept (Anteil der behaltenen Fläche);
+        das zugeschnittene Bild trägt Info in image.info[TARGETS_INFO]
+    """
+    if TARGETS_INFO in image.info:
+        # Bereits zugeschnitten (z.B. Retry mit dem vorbereiteten Bild)
+        return image, image.info[TARGETS_INFO]
+
+    found = detect_targets(image)
+    if not found['crop_box']:
+        return image, None
+
+    width, height = source_size(image)
+    box = found['crop_box']
+    found['kept'] = round((box[2] - box[0]) * (box[3] - box[1]) / (width * height), 3)
+
+    cropped = crop_box(image, box)
+    cropped.info[TARGETS_INFO] = found
+    return cropped, found
+
+
+def setup_utf8():
+    """UTF-8 Fix für Windows"""
+    if sys.platform == 'win32':
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def cmd_detect(args):
+    save_dir = Path(args.save) if args.save else None
+    if save_dir:
+        save_dir.mkdir(parents=True, exist_ok=True)
+
+    for path in args.images:
+        image = load_image(path, (ANALYSIS_SIZE * 4, ANALYSIS_SIZE * 4))
+        cropped, info = crop_targets(image)
+        if not info:
+            print(f"{path}: no targets")
+            continue
+
+        kinds = ', '.join(t['kind'] for t in info['targets'])
+        print(f"{path}: {kinds} → crop {info['crop_box']} ({info['kept'] * 100:.0f}% kept)")
+        if save_dir:
+            cropped.save(save_dir / f"{Path(path).stem}_cropped.jpg", quality=85)
+
+
+def cmd_validate(args):
+    """Keyword-Treffer der OCR (Farbkarte, Grauskala, Inches, ...) als Referenz für die Erkennung"""
+    from filter_artifacts import compile_keywords
+
+    matcher = compile_keywords(TARGET_KEYWORDS)
+    with open(args.ocr_json, 'r', encoding='utf-8') as f:
+        pages = json.load(f).get('pages', [])
+
+    images_dir = Path(args.images)
+    counts = {'both': 0, 'keywords_only': 0, 'detected_only': 0, 'neither': 0}
+
+    for page in pages:
+        if 'text' not in page or not page.get('image_file'):
+            continue
+        image_file = images_dir / page['image_file']
+        if not image_file.exists():
+            print(f"[WARNING] Image not found: {image_file}")
+            continue
+
+        has_keywords = bool(matcher.search(page['text'].lower()))
+        detected = bool(detect_targets(load_image(image_file, (ANALYSIS_SIZE * 4, ANALYSIS_SIZE * 4)))['crop_box'])
+
+        if has_keywords and detected:
+            counts['both'] += 1
+        elif has_keywords:
+            counts['keywords_only'] += 1
+            print(f"[MISS] page {page['page']} ({page['image_file']}): target text in OCR, nothing detected")
+        elif detected:
+            counts['detected_only'] += 1
+            print(f"[EXTRA] page {page['page']} ({page['image_file']}): detected, no target text in OCR")
+        else:
+            counts['neither'] += 1
+
+    with_keywords = counts['both'] + counts['keywords_only']
+    with_detection = counts['both'] + counts['detected_only']
+    print("="*60)
+    print("TARGET DETECTION VS. OCR KEYWORDS")
+    print("="*60)
+    print(f"Pages with target text:  {with_keywords}")
+    print(f"Pages with detection:    {with_detection}")
+    print(f"Agreement:               {counts['both'] + counts['neither']}/{sum(counts.values())}")
+    if with_keywords:
+        print(f"Recall:                  {counts['both'] / with_keywords * 100:.0f}%")
+    if with_detection:
+        print(f"Precision:               {counts['both'] / with_detection * 100:.0f}%")
+
+
+def main():
+    setup_utf8()
+
+    parser = argparse.ArgumentParser(description='Detect and crop colour checkers and rulers in scans')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    detect = commands.add_parser('detect', help='Detect targets in images')
+    detect.add_argument('images', nargs='+', help='Image files')
+    detect.add_argument('--save', help='Save cropped images to this directory')
+
+    validate = commands.add_parser('validate', help='Compare detections with target text in an _ocr.json')
+    validate.add_argument('ocr_json', help='Raw OCR result (test_ocr_mets.py / test_ocr_pdf.py)')
+    validate.add_argument('--images', required=True, help='Directory with the page images')
+
+    args = parser.parse_args()
+    {'detect': cmd_detect, 'validate': cmd_validate}[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Checkpointing für OCR-Läufe
+===========================
+Schreibt jede fertige Seite sofort in ein JSONL-Journal neben dem Output,
+damit ein Absturz keine GPU-Arbeit kostet
+
+Features:
+- Eine Zeile pro Seite, flush + fsync nach jeder Zeile
+- Run-Metadaten (Timestamp, Quelle) als eigene Zeile
+- Laden toleriert eine abgeschnittene letzte Zeile und schneidet sie ab
+- Spätere Einträge einer Seite überschreiben frühere (Retry nach Fehler)
+- Finale _ocr.json / _fulltext.txt werden aus dem Journal zusammengesetzt
+
+Usage:
+    from checkpoint import PageJournal
+
+    journal = PageJournal(output_dir, "DTS_Flechte")
+    done = journal.done_pages()
+    journal.append({'page': 1, 'text': '...'})
+"""
+
+import json
+import os
+from pathlib import Path
+
+JOURNAL_SUFFIX = "_journal.jsonl"
+
+
+def write_json_atomic(path, data):
+    """Schreibe JSON über eine temporäre Datei + os.replace"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_fulltext(text_file, pages):
+    """Schreibe alle Seiten mit Text als Plain Text"""
+    with open(text_file, 'w', encoding='utf-8') as f:
+        for page_result in pages:
+            if 'text' in page_result:
+                f.write(f"--- PAGE {page_result['page']} ---\n\n")
+                f.write(page_result['text'])
+                f.write("\n\n")
+
+
+class PageJournal:
+    """Append-only JSONL-Journal der fertigen Seiten eines Laufs"""
+
+    def __init__(self, output_dir, name):
+        """
+        Args:
+            output_dir: Output-Verzeichnis des Laufs
+            name: Dokumentname (Journal: <name>_journal.jsonl)
+        """
+        self.path = Path(output_dir) / f"{name}{JOURNAL_SUFFIX}"
+        self.run = {}
+        self.pages = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        complete = data.rfind(b"\n") + 1
+        if complete < len(data):
+            # Abgeschnittene letzte Zeile nach Absturz → abschneiden, damit der nächste
+            # Eintrag in einer eigenen Zeile beginnt; die Seite wird wiederholt
+            with open(self.path, 'r+b') as f:
+                f.truncate(complete)
+                f.flush()
+                os.fsync(f.fileno())
+
+        for line in data[:complete].decode('utf-8', errors='replace').split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Beschädigte Zeile → ignorieren, Seite wird wiederholt
+                continue
+
+            if 'run' in record:
+                self.run.update(record['run'])
+            elif 'page' in record:
+                self.pages[record['page']] = record
+
+    def _write(self, record):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start_run(self, **run):
+        """Speichere Run-Metadaten (nur beim ersten Start, bei Resume bleiben sie erhalten)"""
+        new = {key: value for key, value in run.items() if key not in self.run}
+        if new:
+            self.run.update(new)
+            self._write({'run': new})
+        return self.run
+
+    def append(self, entry):
+        """Seite dauerhaft speichern"""
+        self._write(entry)
+        self.pages[entry['page']] = entry
+
+    def done_pages(self):
+        """Seiten mit erfolgreichem Ergebnis (fehlerhafte werden wiederholt)"""
+        return {page for page, entry in self.pages.items() if 'error' not in entry}
+
+    def failed_pages(self):
+        return {page for page, entry in self.pages.items() if 'error' in entry}
+
+    def entries(self, pages=None):
+        """
+        Seiten-Einträge in Seitenreihenfolge
+
+        Args:
+            pages: Nur diese Seiten (z.B. die aktuelle --pages/--shard Auswahl);
+                ein früherer Lauf mit anderer Auswahl hinterlässt weitere Seiten
+        """
+        selected = self.pages if pages is None else set(pages) & set(self.pages)
+        return [self.pages[page] for page in sorted(selected)]
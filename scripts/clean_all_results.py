@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Clean All OCR Results
+=====================
+Bereinigt alle results/*/*_ocr.json in einem Aufruf, parallel und inkrementell
+
+Features:
+- Findet alle Roh-Ergebnisse (test_ocr_mets.py, test_ocr_pdf.py, merge_shards.py)
+- Manifest (results/.clean_manifest.json): Inhalts-Hash pro Datei + Regelsatz-Version
+  (filter_artifacts.rules_version()); neu bereinigt wird nur, was sich geändert hat
+  oder dessen Ausgaben fehlen
+- Schneller Check über Größe + mtime, Hash nur bei Abweichung
+- Process-Pool, jede Datei wird gestreamt (clean_ocr_results.clean_result_file)
+
+Usage:
+    python scripts/clean_all_results.py                  # results/, alle Kerne
+    python scripts/clean_all_results.py --workers 4
+    python scripts/clean_all_results.py --dry-run        # nur anzeigen, was bereinigt würde
+    python scripts/clean_all_results.py --force          # alles neu bereinigen
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+from checkpoint import write_json_atomic
+from clean_ocr_results import clean_result_file, output_paths
+from filter_artifacts import rules_version
+
+MANIFEST_NAME = ".clean_manifest.json"
+
+
+def setup_utf8():
+    """UTF-8 Fix für Windows"""
+    if sys.platform == 'win32':
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def find_results(results_dir: Path) -> list:
+    """Alle Roh-Ergebnisse (bereinigte Dateien heißen *_ocr_cleaned.json und fallen heraus)"""
+    return sorted(results_dir.glob("*/*_ocr.json"))
+
+
+def file_digest(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('files', {})
+    except (OSError, ValueError):
+        print(f"[WARNING] Manifest unreadable, cleaning everything: {path}")
+        return {}
+
+
+def outputs_exist(input_file) -> bool:
+    return all(Path(p).exists() for p in output_paths(input_file))
+
+
+def is_current(input_file, entry: dict, version: str) -> bool:
+    """Schneller Check ohne Hash: gleiche Regeln, gleiche Größe + mtime, Ausgaben vorhanden"""
+    if not entry or entry.get('rules') != version or not outputs_exist(input_file):
+        return False
+    stat = os.stat(input_file)
+    return entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns
+
+
+def clean_worker(input_file: str, entry: dict, version: str) -> dict:
+    """
+    Eine Datei im Worker: hashen, bei unverändertem Inhalt überspringen, sonst bereinigen
+
+    Returns:
+        Neuer Manifest-Eintrag + 'status' (cleaned / unchanged) und ggf. Statistik
+    """
+    stat = os.stat(input_file)
+    digest = file_digest(input_file)
+    record = {'sha256': digest, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'rules': version}
+
+    if entry and entry.get('sha256') == digest and entry.get('rules') == version and outputs_exist(input_file):
+        # Nur mtime geändert (kopiert, touch) → Ausgaben gelten weiter
+        return dict(entry, **record, status='unchanged')
+
+    start_time = time.time()
+    stats = clean_result_file(input_file)
+    record.update(status='cleaned', pages=stats['pages'], seconds=round(time.time() - start_time, 2),
+                  original_characters=stats['original_characters'],
+                  cleaned_characters=stats['cleaned_characters'],
+                  cleaned=datetime.now().isoformat(timespec='seconds'))
+    return record
+
+
+def main():
+    setup_utf8()
+
+    parser = argparse.ArgumentParser(description='Re-clean all raw OCR results whose input or filter rules changed')
+    parser.add_argument('results_dir', nargs='?', default='results', help='Results directory (default: results)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes (default: all cores)')
+    parser.add_argument('--force', action='store_true', help='Re-clean every file, ignoring the manifest')
+    parser.add_argument('--dry-run', action='store_true', help='Only list the files that would be cleaned')
+
+    args = parser.parse_args()
+
+    results_dir = Path(args.results_dir)
+    if not results_dir.is_dir():
+        print(f"[ERROR] Results directory not found: {results_dir}")
+        sys.exit(1)
+
+    manifest_path = results_dir / MANIFEST_NAME
+    manifest = {} if args.force else load_manifest(manifest_path)
+    version = rules_version()
+
+    files = find_results(results_dir)
+    keys = {path: path.relative_to(results_dir).as_posix() for path in files}
+    pending = [path for path in files if not is_current(path, manifest.get(keys[path]), version)]
+
+    print("="*60)
+    print("CLEAN ALL RESULTS")
+    print("="*60)
+    print(f"Results:  {results_dir} ({len(files)} raw results)")
+    print(f"Rules:    {version}")
+    print(f"Current:  {len(files) - len(pending)}")
+    print(f"To check: {len(pending)}\n")
+
+    if args.dry_run:
+        for path in pending:
+            print(f"  {keys[path]}")
+        return
+
+    start_time = time.time()
+    counts = {'cleaned': 0, 'unchanged': 0, 'failed': 0}
+    # Einträge gelöschter Ergebnisse fallen aus dem Manifest
+    updated = {keys[path]: manifest[keys[path]] for path in files if keys[path] in manifest}
+
+    def record(path, result):
+        status = result.pop('status')
+        counts[status] += 1
+        updated[keys[path]] = result
+        if status == 'cleaned':
+            print(f"[OK] {keys[path]}: {result['pages']} pages, "
+                  f"{result['original_characters']} → {result['cleaned_characters']} chars ({result['seconds']:.1f}s)")
+
+    try:
+        if args.workers <= 1 or len(pending) <= 1:
+            for path in pending:
+                try:
+                    record(path, clean_worker(str(path), manifest.get(keys[path]), version))
+                except Exception as e:
+                    counts['failed'] += 1
+                    print(f"[ERROR] {keys[path]}: {e}")
+        else:
+            with ProcessPoolExecutor(max_workers=min(args.workers, len(pending))) as executor:
+                futures = {executor.submit(clean_worker, str(path), manifest.get(keys[path]), version): path
+                           for path in pending}
+                for future in as_completed(futures):
+                    path = futures[future]
+                    try:
+                        record(path, future.result())
+                    except Exception as e:
+                        counts['failed'] += 1
+                        print(f"[ERROR] {keys[path]}: {e}")
+    finally:
+        write_json_atomic(manifest_path, {'rules': version, 'files': dict(sorted(updated.items()))})
+
+    print(f"\n{'='*60}")
+    print("CLEANING COMPLETE")
+    print("="*60)
+    print(f"Cleaned:   {counts['cleaned']}")
+    print(f"Unchanged: {counts['unchanged'] + len(files) - len(pending)}")
+    print(f"Failed:    {counts['failed']}")
+    print(f"Time:      {time.time() - start_time:.1f}s")
+    print(f"Manifest:  {manifest_path}")
+    print("="*60)
+
+    if counts['failed']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
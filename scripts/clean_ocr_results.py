@@ -4,14 +4,21 @@ Clean OCR Results
 =================
 Wendet Artifact-Filter auf existierende OCR-Ergebnisse an
 
+Die Datei wird gestreamt (json_stream.py): Seite lesen, bereinigen, sofort in
+_cleaned.json und _fulltext_cleaned.txt schreiben. Der Speicherbedarf hängt nur
+von der größten Seite ab, nicht von der Seitenzahl.
+
 Usage:
     python clean_ocr_results.py results/mets_o_szd.151_TIMESTAMP/o_szd.151_ocr.json
 """
 
 import sys
-import json
+import os
 from pathlib import Path
-from filter_artifacts import clean_mets_ocr_result, print_filtering_stats
+
+sys.path.append(str(Path(__file__).parent))
+from filter_artifacts import EMPTY_PAGE, clean_page
+from json_stream import JsonObjectWriter, iter_document
 
 def setup_utf8():
     """UTF-8 Fix für Windows"""
@@ -19,6 +26,82 @@ def setup_utf8():
     if sys.platform == 'win32':
         sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
+def output_paths(input_file):
+    """(cleaned JSON, cleaned fulltext) neben dem Input"""
+    return (str(input_file).replace('.json', '_cleaned.json'),
+            str(input_file).replace('_ocr.json', '_fulltext_cleaned.txt'))
+
+def print_page_stats(page):
+    """Statistik-Zeile einer bereinigten Seite"""
+    page_num = page['page']
+    orig_chars = page.get('original_characters', 0)
+    clean_chars = page.get('cleaned_characters', 0)
+    filtered = page.get('filtered', 0)
+
+    if filtered > 0:
+        pct = (filtered / orig_chars * 100) if orig_chars > 0 else 0
+        print(f"Page {page_num}: {orig_chars} → {clean_chars} chars ({filtered} filtered, {pct:.1f}%)")
+    else:
+        print(f"Page {page_num}: {clean_chars} chars (no filtering)")
+
+def write_page_text(f, page):
+    """Seite in den Plain-Text schreiben (leere Seiten überspringen)"""
+    if 'text' in page and page['text'].strip():
+        if page['text'] == EMPTY_PAGE:
+            f.write(f"--- PAGE {page['page']} ---\n\n[EMPTY PAGE]\n\n")
+        else:
+            f.write(f"--- PAGE {page['page']} ---\n\n")
+            f.write(page['text'])
+            f.write("\n\n")
+
+def clean_result_file(input_file, output_file=None, text_file=None, on_page=None, on_field=None) -> dict:
+    """
+    Bereinige eine _ocr.json Seite für Seite
+
+    Args:
+        input_file: OCR-Ergebnis (test_ocr_mets.py / test_ocr_pdf.py)
+        output_file, text_file: Ziele (Default: output_paths(input_file))
+        on_page: Callback pro bereinigter Seite
+        on_field: Callback pro top-level Feld (key, value)
+
+    Returns:
+        dict mit pages, original_characters, cleaned_characters, output_file, text_file
+    """
+    default_output, default_text = output_paths(input_file)
+    output_file = output_file or default_output
+    text_file = text_file or default_text
+
+    stats = {'pages': 0, 'original_characters': 0, 'cleaned_characters': 0,
+             'output_file': output_file, 'text_file': text_file}
+
+    tmp_text = f"{text_file}.tmp"
+    try:
+        with JsonObjectWriter(output_file) as writer, open(tmp_text, 'w', encoding='utf-8') as text_out:
+            for kind, key, value in iter_document(input_file):
+                if kind == 'array':
+                    writer.array(key)
+                elif kind == 'item':
+                    page = clean_page(value)
+                    writer.item('pages', page)
+                    write_page_text(text_out, page)
+
+                    stats['pages'] += 1
+                    stats['original_characters'] += page.get('original_characters', 0)
+                    stats['cleaned_characters'] += page.get('cleaned_characters', 0)
+                    if on_page:
+                        on_page(page)
+                else:
+                    writer.field(key, value)
+                    if on_field:
+                        on_field(key, value)
+    except BaseException:
+        if os.path.exists(tmp_text):
+            os.remove(tmp_text)
+        raise
+
+    os.replace(tmp_text, text_file)
+    return stats
+
 def main():
     setup_utf8()
 
@@ -38,56 +121,31 @@ def main():
     print("="*60)
     print(f"Input: {input_file}\n")
 
-    # Lade OCR-Ergebnis
-    with open(input_file, 'r', encoding='utf-8') as f:
-        ocr_result = json.load(f)
+    header_printed = False
 
-    print(f"Document: {ocr_result['mets_metadata'].get('title', 'N/A')}")
-    print(f"Pages: {ocr_result['total_pages']}\n")
+    def on_field(key, value):
+        if key == 'mets_metadata':
+            print(f"Document: {value.get('title', 'N/A')}\n")
 
-    # Bereinige
-    cleaned_result = clean_mets_ocr_result(ocr_result)
+    def on_page(page):
+        nonlocal header_printed
+        if not header_printed:
+            print("="*60)
+            print("PER-PAGE STATISTICS")
+            print("="*60)
+            header_printed = True
+        print_page_stats(page)
 
-    # Statistik pro Seite
-    print("="*60)
-    print("PER-PAGE STATISTICS")
-    print("="*60)
-
-    for page in cleaned_result['pages']:
-        page_num = page['page']
-        orig_chars = page.get('original_characters', 0)
-        clean_chars = page.get('cleaned_characters', 0)
-        filtered = page.get('filtered', 0)
+    stats = clean_result_file(input_file, on_page=on_page, on_field=on_field)
 
-        if filtered > 0:
-            pct = (filtered / orig_chars * 100) if orig_chars > 0 else 0
-            print(f"Page {page_num}: {orig_chars} → {clean_chars} chars ({filtered} filtered, {pct:.1f}%)")
-        else:
-            print(f"Page {page_num}: {clean_chars} chars (no filtering)")
-
-    # Speichere bereinigtes Ergebnis
-    output_file = str(input_file).replace('.json', '_cleaned.json')
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(cleaned_result, f, indent=2, ensure_ascii=False)
-
-    # Speichere auch als Plain Text
-    text_file = str(input_file).replace('_ocr.json', '_fulltext_cleaned.txt')
-    with open(text_file, 'w', encoding='utf-8') as f:
-        for page in cleaned_result['pages']:
-            if 'text' in page and page['text'].strip():
-                # Skip leere Seiten
-                if page['text'] == "[EMPTY PAGE - FILTERED]":
-                    f.write(f"--- PAGE {page['page']} ---\n\n[EMPTY PAGE]\n\n")
-                else:
-                    f.write(f"--- PAGE {page['page']} ---\n\n")
-                    f.write(page['text'])
-                    f.write("\n\n")
+    print(f"\nPages: {stats['pages']}")
+    print(f"Characters: {stats['original_characters']} → {stats['cleaned_characters']}")
 
     print(f"\n{'='*60}")
     print("CLEANING COMPLETE")
     print("="*60)
-    print(f"Cleaned JSON: {output_file}")
-    print(f"Cleaned Text: {text_file}")
+    print(f"Cleaned JSON: {stats['output_file']}")
+    print(f"Cleaned Text: {stats['text_file']}")
     print("="*60)
 
 if __name__ == "__main__":
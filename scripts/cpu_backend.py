@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+CPU-Backend
+===========
+OCR ohne GPU: für CPU-Batch-Knoten (Nacht-Backlogs) und End-to-End-Tests der Pipeline
+
+Features:
+- Rechnet in float32 (bf16-Autocast nur auf GPU)
+- Optionale dynamische int8-Quantisierung aller Linear-Layer
+  (torch.ao.quantization.quantize_dynamic: Gewichte int8, Aktivierungen zur Laufzeit)
+- Konfigurierbare Anzahl Intra-Op-Threads
+- Mehrere kleine Worker pro Sockel: ocr_dispatch.py "--devices cpu*4" teilt die
+  erlaubten Kerne in zusammenhängende Blöcke, jeder Worker wird auf seinen Block gepinnt
+- Der Modell-Code ruft an einigen Stellen .cuda() auf; auf der CPU werden diese
+  Aufrufe während generate() zu No-Ops
+
+Usage:
+    engine = OcrEngine.load(device="cpu", quantize=True, threads=8)
+
+    python scripts/test_ocr_image.py card.jpg --device cpu --int8 --threads 8
+    python scripts/test_ocr_mets.py data/o_szd.151 --devices cpu*4 --int8
+"""
+
+import contextlib
+import os
+import time
+
+import torch
+
+
+def allowed_cores() -> list:
+    """Kerne, auf denen dieser Prozess laufen darf"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def split_cores(workers: int, cores: list = None) -> list:
+    """Teile die Kerne in zusammenhängende Blöcke (benachbarte Kerne liegen meist auf einem Sockel)"""
+    cores = cores if cores is not None else allowed_cores()
+    workers = max(1, min(workers, len(cores)))
+    size, extra = divmod(len(cores), workers)
+
+    blocks = []
+    start = 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        blocks.append(cores[start:end])
+        start = end
+    return blocks
+
+
+def configure_threads(threads: int = None, cores: list = None) -> int:
+    """
+    Intra-Op-Threads setzen, optional auf Kerne pinnen
+
+    Returns:
+        Anzahl Threads
+    """
+    if cores and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+
+    threads = threads or (len(cores) if cores else len(allowed_cores()))
+    torch.set_num_threads(threads)
+    try:
+        # Nur vor der ersten parallelen Operation erlaubt
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+    return threads
+
+
+def quantize_int8(model):
+    """Dynamische int8-Quantisierung aller nn.Linear (nur CPU)"""
+    start_time = time.time()
+    model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    print(f"[OK] Linear layers quantized to int8 ({time.time() - start_time:.1f}s)")
+    return model
+
+
+@contextlib.contextmanager
+def cuda_calls_to_cpu():
+    """Tensor.cuda() als No-Op, solange der Modell-Code auf der CPU läuft"""
+    original = torch.Tensor.cuda
+    torch.Tensor.cuda = lambda tensor, *args, **kwargs: tensor
+    try:
+        yield
+    finally:
+        torch.Tensor.cuda = original
@@ -36,7 +36,8 @@ sample = {
             {
                 'page': p['page'],
                 'file_id': f'page_{p["page"]:03d}',
-                'image_file': p['image_file'],
+                # Text-Layer Seiten und --in-memory Läufe ohne gespeicherte Bilder haben kein image_file
+                **({'image_file': p['image_file']} if p.get('image_file') else {}),
                 'text': p['text'],
                 'characters': p['characters'],
                 'time_seconds': p['time_seconds'],
@@ -71,6 +72,8 @@ images_dest = samples_dir / 'images' / 'o_DTS_Flechte_20pages'
 images_dest.mkdir(parents=True, exist_ok=True)
 
 for page in successful_pages:
+    if not page.get('image_file'):
+        continue
     src = images_src / page['image_file']
     dst = images_dest / page['image_file']
     if src.exists():
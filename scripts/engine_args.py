@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Engine-Optionen der Kommandozeile
+=================================
+Gemeinsame argparse-Flags für OcrEngine und das Laden der Engine aus diesen
+Flags. test_ocr_*.py, ocr_daemon.py, ocr_queue.py und die Worker von
+ocr_dispatch.py verwenden dieselben Namen, Defaults und Hilfetexte.
+
+Kein torch-Import beim Laden des Moduls: Stub-Daemon und Dispatcher brauchen
+nur die Flags, OcrEngine wird erst in engine_from_args() importiert.
+engine_settings() liefert die Werte, die ein laufender Daemon teilen muss.
+
+Usage:
+    from engine_args import add_daemon_args, add_engine_args, engine_from_args, engine_settings
+
+    add_engine_args(parser)
+    add_daemon_args(parser)
+    args = parser.parse_args()
+    engine = connect_daemon(args.daemon, engine_settings(args)) or engine_from_args(args)
+"""
+
+import argparse
+from pathlib import Path
+
+from ocr_types import parse_ladder
+
+DEFAULT_CACHE_DIR = str(Path("results") / ".cache")
+
+# Flags, die das Ergebnis einer Seite beeinflussen; ein Daemon mit anderen Werten wird nicht verwendet
+RESULT_SETTINGS = ('device', 'int8', 'repetition_threshold', 'char_share_threshold', 'max_seconds', 'max_tokens',
+                   'retry_modes', 'vram_budget_gb', 'crop_targets', 'skip_blank', 'no_cache', 'cache_dir')
+
+
+def add_engine_args(parser):
+    """Flags der Engine (Device, Budgets, Retry-Leiter, Caches, Vorverarbeitung)"""
+    parser.add_argument('--device', default='cuda', help='Torch device for the engine: cuda, cuda:1, ... or cpu (default: cuda)')
+    parser.add_argument('--int8', action='store_true', help='CPU backend: dynamic int8 quantization of the linear layers')
+    parser.add_argument('--threads', type=int, help='CPU backend: intra-op threads (default: all cores, or an equal share per cpu worker)')
+    parser.add_argument('--repetition-threshold', type=float, default=0.2,
+                        help='Abort generation when the share of distinct 4-grams in the last 256 tokens drops below this (default: 0.2, 0 = off)')
+    parser.add_argument('--char-share-threshold', type=float, default=0.6,
+                        help='Abort generation when one character exceeds this share of the last 256 tokens\' text; runs of . - _ | do not count (default: 0.6, 0 = off)')
+    parser.add_argument('--max-seconds', type=float, help='Wall-clock budget per generate() call (one page, or one batch of pages); exceeding it stops generation')
+    parser.add_argument('--max-tokens', type=int, help='Output token budget per page (default: 8192)')
+    parser.add_argument('--retry-modes', default='',
+                        help='Modes to retry failed/over-budget/OOM pages in, in order (tiny, small, base, large, gundam; e.g. small,tiny; default: off)')
+    parser.add_argument('--vram-budget-gb', type=float, help='Activation memory budget per engine in GB; larger batches are split, oversized pages run in a smaller mode (default: free GPU memory after loading, 0 = off)')
+    parser.add_argument('--crop-targets', action='store_true', help='Cut off colour checkers, grey scales and rulers before OCR (see calibration_targets.py)')
+    parser.add_argument('--skip-blank', action='store_true', help='Classify pages before OCR and record blank pages as [EMPTY PAGE - FILTERED] without inference (see blank_page.py)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='OCR result cache directory (default: results/.cache)')
+    parser.add_argument('--cache-size-gb', type=float, default=2.0, help='Cache size limit, least recently used entries are evicted (default: 2)')
+    parser.add_argument('--no-cache', action='store_true', help='Always run inference, do not read or write the result cache')
+
+
+def add_daemon_args(parser):
+    """Flags der Clients eines laufenden ocr_daemon.py"""
+    parser.add_argument('--daemon', metavar='ADDRESS', help='OCR daemon address (host:port or unix:/path; default: $DEEPSEEK_OCR_DAEMON or 127.0.0.1:8765)')
+    parser.add_argument('--no-daemon', action='store_true', help='Always load the model in this process, even if a daemon is running')
+
+
+def engine_defaults() -> dict:
+    """Defaults aller Engine-Flags (dest → Wert), z.B. für Worker ohne eigene Kommandozeile"""
+    parser = argparse.ArgumentParser(add_help=False)
+    add_engine_args(parser)
+    return vars(parser.parse_args([]))
+
+
+def engine_settings(args) -> dict:
+    """
+    Vergleichbare Werte der ergebnisrelevanten Engine-Flags
+
+    Der Daemon meldet sie in /health, Clients vergleichen sie mit ihren eigenen
+    (ocr_client.connect_daemon).
+    """
+    settings = {key: getattr(args, key) for key in RESULT_SETTINGS}
+    settings['retry_modes'] = parse_ladder(args.retry_modes)
+    settings['cache_dir'] = None if args.no_cache else str(Path(args.cache_dir).resolve())
+    return settings
+
+
+def engine_from_args(args, **options):
+    """
+    OcrEngine aus den Flags von add_engine_args() laden
+
+    Args:
+        args: argparse-Namespace
+        **options: Weitere Argumente für OcrEngine.load (artifacts_dir, vision_cache, cores)
+
+    Raises:
+        ValueError bei ungültiger --retry-modes Angabe
+    """
+    from ocr_engine import OcrEngine, PageBudget
+    from repetition import config_from_threshold
+    from result_cache import ResultCache
+
+    return OcrEngine.load(
+        device=args.device,
+        quantize=args.int8,
+        threads=args.threads,
+        repetition=config_from_threshold(args.repetition_threshold, args.char_share_threshold),
+        budget=PageBudget(args.max_seconds, args.max_tokens),
+        ladder=parse_ladder(args.retry_modes),
+        cache=None if args.no_cache else ResultCache(args.cache_dir, int(args.cache_size_gb * 1024 ** 3)),
+        vram_budget=args.vram_budget_gb,
+        crop_targets=args.crop_targets,
+        skip_blank=args.skip_blank,
+        **options
+    )
@@ -9,15 +9,27 @@ Features:
 - Keyword-Filtering (Farbkarte, Grauskala, B.I.G., etc.)
 - Strukturelle Filterung (isolierte Zahlen/Buchstaben)
 - Line-by-line cleaning
+- Regeln werden beim Import einmal kompiliert: alle Keywords in einem Regex
+  (ein Suchlauf pro Zeile), alle Patterns in einem verankerten Regex
+- clean_many() für ganze Dokumente/Korpora
 
 Usage:
-    from filter_artifacts import clean_ocr_text
+    from filter_artifacts import clean_ocr_text, clean_many
 
     cleaned = clean_ocr_text(raw_ocr_output)
+    cleaned_pages = clean_many(page_texts)
+
+    python scripts/filter_artifacts.py                     # Demo
+    python scripts/filter_artifacts.py --benchmark results/<run>/<doc>_ocr.json
 """
 
+import argparse
+import hashlib
+import json
 import re
-from typing import List, Set
+import time
+from pathlib import Path
+from typing import Iterable, List, Set
 
 # Bekannte Artefakt-Keywords
 ARTIFACT_KEYWORDS = {
@@ -44,6 +56,42 @@ ARTIFACT_PATTERNS = [
     r'^\d+/\w+$',                        # 3/Color
 ]
 
+
+def compile_keywords(keywords: Iterable[str]) -> re.Pattern:
+    """Alle Keywords als eine Alternation (längste zuerst), Suche im kleingeschriebenen Text"""
+    keywords = sorted(keywords, key=len, reverse=True)
+    if not keywords:
+        return re.compile(r'(?!)')
+    return re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+
+
+def compile_patterns(patterns: Iterable[str]) -> re.Pattern:
+    """Alle Patterns als ein Regex (re.match auf die Alternation = irgendein Pattern passt)"""
+    patterns = list(patterns)
+    if not patterns:
+        return re.compile(r'(?!)')
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns))
+
+
+KEYWORD_MATCHER = compile_keywords(ARTIFACT_KEYWORDS)
+PATTERN_MATCHER = compile_patterns(ARTIFACT_PATTERNS)
+
+NON_LETTERS = re.compile(r'[^a-zA-ZäöüÄÖÜß]+')
+BLANK_LINES = re.compile(r'\n{3,}')
+
+# Marker für leere Seiten (auch für Seiten, die blank_page.py vor der Inferenz überspringt)
+EMPTY_PAGE = "[EMPTY PAGE - FILTERED]"
+
+# Bei Änderungen an der Bereinigungs-Logik erhöhen (Regeln selbst gehen über den Quelltext-Hash ein)
+RULES_VERSION = 1
+
+
+def rules_version() -> str:
+    """Version des Regelsatzes: RULES_VERSION + Hash dieses Moduls (jede Regeländerung → neue Version)"""
+    with open(__file__, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    return f"{RULES_VERSION}-{digest}"
+
 def is_artifact_line(line: str) -> bool:
     """
     Prüfe, ob eine Zeile ein Artefakt ist
@@ -63,14 +111,12 @@ def is_artifact_line(line: str) -> bool:
     line_lower = line_stripped.lower()
 
     # 1. Keyword-Check
-    for keyword in ARTIFACT_KEYWORDS:
-        if keyword in line_lower:
-            return True
+    if KEYWORD_MATCHER.search(line_lower):
+        return True
 
     # 2. Pattern-Check
-    for pattern in ARTIFACT_PATTERNS:
-        if re.match(pattern, line_stripped):
-            return True
+    if PATTERN_MATCHER.match(line_stripped):
+        return True
 
     # 3. Strukturelle Checks
     # Sehr kurze Zeilen mit nur Zahlen/Buchstaben
@@ -87,17 +133,14 @@ def is_empty_page_artifact(text: str) -> bool:
     - Mehr als 90% Whitespace oder Sonderzeichen
     - Weniger als 50 tatsächliche Buchstaben
     """
-    # Entferne Whitespace
-    no_whitespace = re.sub(r'\s', '', text)
+    # Zähle Buchstaben: alles andere (auch Whitespace) in einem Durchlauf entfernen
+    letters = len(NON_LETTERS.sub('', text))
 
-    # Zähle ASCII-Buchstaben
-    letters = re.findall(r'[a-zA-ZäöüÄÖÜß]', no_whitespace)
-
-    if len(letters) < 50:
+    if letters < 50:
         return True
 
     # Ratio prüfen
-    ratio = len(letters) / len(text) if len(text) > 0 else 0
+    ratio = letters / len(text) if len(text) > 0 else 0
 
     if ratio < 0.05:  # Weniger als 5% echte Buchstaben
         return True
@@ -117,7 +160,7 @@ def clean_ocr_text(text: str, preserve_structure: bool = True) -> str:
     """
     # Check: Ist die ganze Seite leer?
     if is_empty_page_artifact(text):
-        return "[EMPTY PAGE - FILTERED]"
+        return EMPTY_PAGE
 
     lines = text.split('\n')
     cleaned_lines = []
@@ -139,10 +182,23 @@ def clean_ocr_text(text: str, preserve_structure: bool = True) -> str:
 
     # Optional: Mehrfache Leerzeilen reduzieren
     if not preserve_structure:
-        result = re.sub(r'\n{3,}', '\n\n', result)
+        result = BLANK_LINES.sub('\n\n', result)
 
     return result.strip()
 
+def clean_many(texts: Iterable[str], preserve_structure: bool = True) -> List[str]:
+    """
+    Bereinige viele Texte (z.B. alle Seiten eines Dokuments) mit denselben kompilierten Regeln
+
+    Args:
+        texts: Raw OCR outputs
+        preserve_structure: Behalte Leerzeilen zwischen Absätzen
+
+    Returns:
+        Gereinigte Texte in derselben Reihenfolge
+    """
+    return [clean_ocr_text(text, preserve_structure) for text in texts]
+
 def clean_mets_ocr_result(ocr_result: dict) -> dict:
     """
     Bereinige ein komplettes METS-OCR Ergebnis
@@ -156,17 +212,30 @@ def clean_mets_ocr_result(ocr_result: dict) -> dict:
     cleaned_result = ocr_result.copy()
 
     for page in cleaned_result.get('pages', []):
-        if 'text' in page:
-            original_text = page['text']
-            cleaned_text = clean_ocr_text(original_text)
-
-            page['text'] = cleaned_text
-            page['original_characters'] = page.get('characters', 0)
-            page['cleaned_characters'] = len(cleaned_text)
-            page['filtered'] = page['original_characters'] - page['cleaned_characters']
+        clean_page(page)
 
     return cleaned_result
 
+def clean_page(page: dict) -> dict:
+    """
+    Bereinige eine Seite eines OCR-Ergebnisses (in place)
+
+    Args:
+        page: Seiten-Eintrag aus 'pages' (mit 'text' und 'characters')
+
+    Returns:
+        Dieselbe Seite mit bereinigtem Text und Zeichen-Statistik
+    """
+    if 'text' in page:
+        cleaned_text = clean_ocr_text(page['text'])
+
+        page['text'] = cleaned_text
+        page['original_characters'] = page.get('characters', 0)
+        page['cleaned_characters'] = len(cleaned_text)
+        page['filtered'] = page['original_characters'] - page['cleaned_characters']
+
+    return page
+
 def print_filtering_stats(original: str, cleaned: str):
     """Zeige Filterungs-Statistik"""
     orig_lines = original.split('\n')
@@ -184,7 +253,8 @@ def print_filtering_stats(original: str, cleaned: str):
     print("="*60)
 
 # Beispiel-Usage
-if __name__ == "__main__":
+def run_demo():
+    """Beispiel-Text mit Artefakten"""
     # Test-Text mit Artefakten
     test_text = """Inches
 
@@ -230,3 +300,67 @@ M
     print()
 
     print_filtering_stats(test_text, cleaned)
+
+DEFAULT_BENCHMARK_SOURCE = Path(__file__).parent.parent / "data" / "1617-wecker-antidotiarum-001-150_pdf" / "txt"
+
+
+def load_pages(source) -> List[str]:
+    """Seitentexte aus einem _ocr.json, einem Ordner mit .txt-Dateien oder einer .txt-Datei"""
+    source = Path(source)
+    if source.is_dir():
+        return [f.read_text(encoding='utf-8') for f in sorted(source.glob("*.txt"))]
+    if source.suffix == '.json':
+        with open(source, 'r', encoding='utf-8') as f:
+            return [page.get('text', '') for page in json.load(f).get('pages', [])]
+    return [source.read_text(encoding='utf-8')]
+
+
+def run_benchmark(source, pages: int = 595, repeat: int = 5):
+    """Zeit für clean_many() über ein Dokument mit `pages` Seiten (Seiten aus source, zyklisch wiederholt)"""
+    texts = load_pages(source)
+    if not texts:
+        print(f"[ERROR] No pages in {source}")
+        return
+
+    if pages:
+        texts = [texts[i % len(texts)] for i in range(pages)]
+
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        cleaned = clean_many(texts)
+        best = min(best, time.perf_counter() - start_time)
+
+    chars = sum(len(text) for text in texts)
+    lines = sum(text.count('\n') + 1 for text in texts)
+
+    print("="*60)
+    print("FILTER BENCHMARK")
+    print("="*60)
+    print(f"Source:      {source}")
+    print(f"Document:    {len(texts)} pages, {lines} lines, {chars / 1024:.0f} KB")
+    print(f"Rules:       {len(ARTIFACT_KEYWORDS)} keywords, {len(ARTIFACT_PATTERNS)} patterns")
+    print(f"Time:        {best:.3f}s per document (best of {repeat})")
+    print(f"             {best / len(texts) * 1000:.3f} ms/page, {len(texts) / best:.0f} pages/s")
+    print(f"Removed:     {chars - sum(len(text) for text in cleaned)} characters")
+    print("="*60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Filter scan artifacts from OCR text (demo or benchmark)')
+    parser.add_argument('--benchmark', nargs='?', const=str(DEFAULT_BENCHMARK_SOURCE), metavar='SOURCE',
+                        help='Time clean_many() on an _ocr.json, a folder of .txt pages or a .txt file '
+                             '(default: the Wecker sample pages)')
+    parser.add_argument('--pages', type=int, default=595, help='Document length for --benchmark, pages are repeated (default: 595, 0 = as is)')
+    parser.add_argument('--repeat', type=int, default=5, help='Benchmark repetitions, best is reported (default: 5)')
+
+    args = parser.parse_args()
+
+    if args.benchmark:
+        run_benchmark(args.benchmark, pages=args.pages, repeat=args.repeat)
+    else:
+        run_demo()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Bild-Laden
+==========
+Gemeinsame Lade-Schicht für Seitenbilder
+
+Features:
+- read_size(): Abmessungen nur aus dem Datei-Header (keine Pixel dekodiert)
+- load_image(): JPEGs werden per Draft-Modus direkt in reduzierter Skalierung
+  (1/2, 1/4, 1/8) dekodiert - so klein wie möglich, aber nie kleiner als die Größe,
+  die die Vorverarbeitung braucht (ocr_engine.decode_size)
+- source_size(): Originalgröße eines reduziert dekodierten Bildes (für Crop-Raster,
+  Modus-Auswahl und die gemeldete Seitengröße)
+- EXIF-Orientierung (Kamera-Aufnahmen wie IMG_*.jpg): Bilder werden aufrecht
+  geliefert, alle Größen gelten für das gedrehte Bild
+
+Archiv-Scans haben oft 20-50 Megapixel, das Modell sieht davon höchstens
+base_size² bzw. das Crop-Raster. Andere Formate (PNG, TIFF, PDF-Renderings)
+werden wie bisher vollständig dekodiert.
+
+Usage:
+    from image_loader import load_image, read_size
+
+    width, height = read_size("scan.jpg")
+    image = load_image("scan.jpg", min_size=(1024, 1024))
+"""
+
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+from PIL import Image, ImageOps
+
+ImageInput = Union[str, Path, Image.Image]
+
+# Schlüssel in image.info für die Originalgröße
+SOURCE_SIZE = 'source_size'
+
+# EXIF-Tag Orientation; Werte 5-8 vertauschen Breite und Höhe
+ORIENTATION_TAG = 0x0112
+TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+
+def _orientation(img: Image.Image) -> int:
+    """EXIF-Orientierung einer geöffneten Datei (1 = aufrecht)"""
+    return img.getexif().get(ORIENTATION_TAG, 1)
+
+
+def _oriented(size: Tuple[int, int], orientation: int) -> Tuple[int, int]:
+    """Header-Größe → Größe nach der EXIF-Drehung"""
+    return (size[1], size[0]) if orientation in TRANSPOSED_ORIENTATIONS else tuple(size)
+
+
+def read_size(image: ImageInput) -> Tuple[int, int]:
+    """(Breite, Höhe) aus dem Header nach EXIF-Drehung, ohne die Pixel zu dekodieren"""
+    if isinstance(image, Image.Image):
+        return source_size(image)
+
+    with Image.open(image) as img:
+        return _oriented(img.size, _orientation(img))
+
+
+def source_size(image: Image.Image) -> Tuple[int, int]:
+    """Originalgröße vor einer reduzierten Dekodierung"""
+    return tuple(image.info.get(SOURCE_SIZE, image.size))
+
+
+def load_image(image: ImageInput, min_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+    """
+    Öffne Pfad oder übernehme PIL-Image, immer als RGB und (bei Dateien) nach
+    EXIF-Orientierung aufrecht gedreht
+
+    Args:
+        image: Pfad oder PIL-Image
+        min_size: (Breite, Höhe) des aufrechten Bilds, die es mindestens haben muss;
+            JPEGs werden dann in der kleinsten passenden Skalierung dekodiert
+            (None = volle Größe)
+    """
+    if isinstance(image, Image.Image):
+        return image if image.mode == 'RGB' else image.convert('RGB')
+
+    with Image.open(image) as img:
+        orientation = _orientation(img)
+        size = _oriented(img.size, orientation)
+        if min_size and img.format == 'JPEG':
+            # draft() arbeitet in Header-Koordinaten
+            draft_size = _oriented((max(1, int(min_size[0])), max(1, int(min_size[1]))), orientation)
+            img.draft('RGB', draft_size)
+
+        rgb = img.convert('RGB')
+
+    if orientation != 1:
+        rgb = ImageOps.exif_transpose(rgb)
+    if rgb.size != size:
+        rgb.info[SOURCE_SIZE] = size
+    return rgb
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Persistente OCR-Job-Queue (SQLite)
+==================================
+Dauerhafte Warteschlange für ganze Dokumente: PDFs, METS-Verzeichnisse, Bildordner
+
+Features:
+- Ein Job pro Dokument, eine Zeile pro Seite mit Status
+  (pending, running, done, failed, cancelled), Versuchszähler und Ergebnis
+- Seiten werden in Reihenfolge (Job, Seite) abgearbeitet
+- Überlebt Neustarts: geholte Seiten tragen Worker-ID und Lease, die der
+  Worker per Heartbeat verlängert; Seiten mit abgelaufener Lease (Worker
+  abgestürzt) werden wieder auf "pending" gesetzt
+- Fehlgeschlagene Seiten werden bis max_attempts erneut eingeplant
+- Mehrere Worker-Prozesse können dieselbe Datenbank nutzen (WAL, BEGIN IMMEDIATE)
+
+Usage:
+    from job_queue import JobQueue, LeaseKeeper
+
+    queue = JobQueue("results/ocr_queue.sqlite")
+    job_id = queue.submit('pdf', 'data/book.pdf', pages=[{'page': 1, 'ref': None}, ...])
+    pages = queue.claim(limit=8)
+    with LeaseKeeper(queue):
+        ...
+    queue.complete(job_id, 1, entry)
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+JOB_KINDS = ('pdf', 'mets', 'images')
+PAGE_STATES = ('pending', 'running', 'done', 'failed', 'cancelled')
+
+DEFAULT_DB = str(Path("results") / "ocr_queue.sqlite")
+MAX_ATTEMPTS = 3
+
+# Sekunden, die eine geholte Seite einem Worker gehört, ohne dass er sie verlängert
+LEASE_SECONDS = 120
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind        TEXT NOT NULL,
+    source      TEXT NOT NULL,
+    name        TEXT NOT NULL,
+    settings    TEXT NOT NULL DEFAULT '{}',
+    meta        TEXT NOT NULL DEFAULT '{}',
+    output_dir  TEXT,
+    cancelled   INTEGER NOT NULL DEFAULT 0,
+    created     REAL NOT NULL,
+    finished    REAL
+);
+
+CREATE TABLE IF NOT EXISTS pages (
+    job_id      INTEGER NOT NULL REFERENCES jobs(id),
+    page        INTEGER NOT NULL,
+    ref         TEXT,
+    status      TEXT NOT NULL DEFAULT 'pending',
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    result      TEXT,
+    error       TEXT,
+    updated     REAL,
+    worker      TEXT,
+    lease       REAL,
+    PRIMARY KEY (job_id, page)
+);
+
+CREATE INDEX IF NOT EXISTS pages_status ON pages (status, job_id, page);
+"""
+
+
+class JobQueue:
+    """SQLite-Warteschlange für OCR-Jobs"""
+
+    def __init__(self, db_path=DEFAULT_DB, max_attempts: int = MAX_ATTEMPTS, worker_id: str = None,
+                 lease_seconds: float = LEASE_SECONDS):
+        """
+        Args:
+            db_path: SQLite-Datei (wird angelegt)
+            max_attempts: Versuche pro Seite, bevor sie endgültig als failed gilt
+            worker_id: Besitzer geholter Seiten (Default: host:pid)
+            lease_seconds: Gültigkeit einer Lease ohne Heartbeat
+        """
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = str(db_path)
+        self.max_attempts = max_attempts
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+
+        self.db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Datenbanken ohne Lease-Spalten ergänzen"""
+        columns = {row['name'] for row in self.db.execute("PRAGMA table_info(pages)")}
+        for column, kind in (('worker', 'TEXT'), ('lease', 'REAL')):
+            if column not in columns:
+                self.db.execute(f"ALTER TABLE pages ADD COLUMN {column} {kind}")
+
+    def close(self):
+        self.db.close()
+
+    def _transaction(self):
+        """BEGIN IMMEDIATE: Schreibsperre sofort, damit zwei Worker nicht dieselbe Seite holen"""
+        return _Transaction(self.db)
+
+    # --- Jobs ---------------------------------------------------------------
+
+    def submit(self, kind: str, source: str, pages, name: str = None, settings: dict = None,
+               meta: dict = None, output_dir: str = None) -> int:
+        """
+        Neuen Job anlegen
+
+        Args:
+            kind: pdf, mets oder images
+            source: Pfad zum Dokument
+            pages: Liste von {'page': int, 'ref': str|None} (ref: Bildpfad, bei PDFs None)
+            settings: OCR-Einstellungen (mode, batch_size, dpi, ...)
+            meta: Dokument-Metadaten für das Ergebnis (z.B. METS)
+
+        Returns:
+            Job-ID
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind {kind!r}, choose from {JOB_KINDS}")
+
+        with self._transaction():
+            cursor = self.db.execute(
+                "INSERT INTO jobs (kind, source, name, settings, meta, output_dir, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, str(source), name or Path(source).stem, json.dumps(settings or {}),
+                 json.dumps(meta or {}, ensure_ascii=False), output_dir, time.time())
+            )
+            job_id = cursor.lastrowid
+            self.db.executemany(
+                "INSERT INTO pages (job_id, page, ref, updated) VALUES (?, ?, ?, ?)",
+                [(job_id, page['page'], page.get('ref'), time.time()) for page in pages]
+            )
+
+        return job_id
+
+    def job(self, job_id: int) -> dict:
+        row = self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Job {job_id} not found")
+
+        job = dict(row)
+        job['settings'] = json.loads(job['settings'])
+        job['meta'] = json.loads(job['meta'])
+        return job
+
+    def jobs(self) -> list:
+        return [self.job(row['id']) for row in self.db.execute("SELECT id FROM jobs ORDER BY id")]
+
+    def counts(self, job_id: int) -> dict:
+        """Anzahl Seiten pro Status"""
+        counts = {state: 0 for state in PAGE_STATES}
+        for row in self.db.execute("SELECT status, COUNT(*) AS n FROM pages WHERE job_id = ? GROUP BY status", (job_id,)):
+            counts[row['status']] = row['n']
+        return counts
+
+    def job_status(self, job_id: int) -> str:
+        """Status eines Jobs aus den Seiten abgeleitet"""
+        job = self.job(job_id)
+        counts = self.counts(job_id)
+
+        if job['cancelled']:
+            return 'cancelled'
+        if counts['running']:
+            return 'running'
+        if counts['pending']:
+            return 'pending' if not counts['done'] and not counts['failed'] else 'running'
+        if counts['failed']:
+            return 'failed'
+        return 'done'
+
+    def cancel(self, job_id: int) -> int:
+        """Job abbrechen: offene Seiten → cancelled (laufende Seiten werden noch fertig)"""
+        self.job(job_id)
+        with self._transaction():
+            self.db.execute("UPDATE jobs SET cancelled = 1 WHERE id = ?", (job_id,))
+            cursor = self.db.execute(
+                "UPDATE pages SET status = 'cancelled', updated = ? WHERE job_id = ? AND status = 'pending'",
+                (time.time(), job_id)
+            )
+        return cursor.rowcount
+
+    def mark_finished(self, job_id: int):
+        self.db.execute("UPDATE jobs SET finished = ? WHERE id = ?", (time.time(), job_id))
+
+    # --- Seiten -------------------------------------------------------------
+
+    def recover(self) -> int:
+        """Seiten abgestürzter Worker (Lease abgelaufen) wieder einplanen"""
+        with self._transaction():
+            return self._reclaim_stale()
+
+    def _reclaim_stale(self) -> int:
+        # lease IS NULL: Seiten aus Datenbanken vor den Leases
+        cursor = self.db.execute(
+            "UPDATE pages SET status = 'pending', worker = NULL, lease = NULL, updated = ? "
+            "WHERE status = 'running' AND (lease IS NULL OR lease < ?)",
+            (time.time(), time.time())
+        )
+        return cursor.rowcount
+
+    def release(self) -> int:
+        """Eigene laufende Seiten zurückgeben (Worker beendet), der Versuch zählt nicht"""
+        with self._transaction():
+            cursor = self.db.execute(
+                "UPDATE pages SET status = 'pending', attempts = MAX(attempts - 1, 0), worker = NULL, lease = NULL, "
+                "updated = ? WHERE status = 'running' AND worker = ?",
+                (time.time(), self.worker_id)
+            )
+        return cursor.rowcount
+
+    def heartbeat(self) -> int:
+        """Leases der eigenen laufenden Seiten verlängern"""
+        cursor = self.db.execute(
+            "UPDATE pages SET lease = ? WHERE status = 'running' AND worker = ?",
+            (time.time() + self.lease_seconds, self.worker_id)
+        )
+        return cursor.rowcount
+
+    def claim(self, limit: int = 1) -> list:
+        """
+        Nächste offene Seiten des ältesten Jobs holen und als running markieren
+
+        Die Seiten gehören diesem Worker für lease_seconds (heartbeat() / LeaseKeeper
+        verlängert); abgelaufene Leases anderer Worker werden vorher zurückgeholt.
+
+        Returns:
+            Liste von dicts (job_id, page, ref, attempts), alle aus demselben Job
+        """
+        with self._transaction():
+            self._reclaim_stale()
+            first = self.db.execute(
+                "SELECT p.job_id FROM pages p JOIN jobs j ON j.id = p.job_id "
+                "WHERE p.status = 'pending' AND j.cancelled = 0 ORDER BY p.job_id, p.page LIMIT 1"
+            ).fetchone()
+            if first is None:
+                return []
+
+            rows = self.db.execute(
+                "SELECT job_id, page, ref, attempts FROM pages WHERE job_id = ? AND status = 'pending' "
+                "ORDER BY page LIMIT ?",
+                (first['job_id'], limit)
+            ).fetchall()
+
+            self.db.executemany(
+                "UPDATE pages SET status = 'running', attempts = attempts + 1, worker = ?, lease = ?, updated = ? "
+                "WHERE job_id = ? AND page = ?",
+                [(self.worker_id, time.time() + self.lease_seconds, time.time(), row['job_id'], row['page'])
+                 for row in rows]
+            )
+
+        return [dict(row, attempts=row['attempts'] + 1) for row in rows]
+
+    def complete(self, job_id: int, page: int, entry: dict):
+        """Seite erfolgreich fertig"""
+        self.db.execute(
+            "UPDATE pages SET status = 'done', result = ?, error = NULL, worker = NULL, lease = NULL, updated = ? "
+            "WHERE job_id = ? AND page = ?",
+            (json.dumps(entry, ensure_ascii=False), time.time(), job_id, page)
+        )
+
+    def fail(self, job_id: int, page: int, error: str, entry: dict = None) -> str:
+        """
+        Seite fehlgeschlagen: erneut einplanen oder nach max_attempts endgültig failed
+
+        Seiten, die nicht (mehr) laufen oder inzwischen einem anderen Worker
+        gehören, bleiben unverändert.
+
+        Returns:
+            Neuer Status (pending oder failed)
+        """
+        row = self.db.execute("SELECT attempts, status, worker FROM pages WHERE job_id = ? AND page = ?",
+                              (job_id, page)).fetchone()
+        if row['status'] != 'running' or row['worker'] != self.worker_id:
+            return row['status']
+
+        status = 'pending' if row['attempts'] < self.max_attempts else 'failed'
+        self.db.execute(
+            "UPDATE pages SET status = ?, error = ?, result = ?, worker = NULL, lease = NULL, updated = ? "
+            "WHERE job_id = ? AND page = ?",
+            (status, error, json.dumps(entry, ensure_ascii=False) if entry else None, time.time(), job_id, page)
+        )
+        return status
+
+    def pages(self, job_id: int) -> list:
+        """Alle Seiten eines Jobs in Reihenfolge"""
+        rows = self.db.execute("SELECT * FROM pages WHERE job_id = ? ORDER BY page", (job_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def entries(self, job_id: int) -> list:
+        """Ergebnis-Einträge (wie in *_ocr.json) aller fertigen/fehlgeschlagenen Seiten"""
+        entries = []
+        for page in self.pages(job_id):
+            if page['status'] == 'done':
+                entries.append(json.loads(page['result']))
+            elif page['status'] == 'failed':
+                entry = json.loads(page['result']) if page['result'] else {'page': page['page']}
+                entry['error'] = page['error']
+                entry['attempts_total'] = page['attempts']
+                entries.append(entry)
+        return entries
+
+
+class LeaseKeeper:
+    """
+    Hintergrund-Thread, der die Leases eines Workers verlängert, solange er rechnet
+
+    Eigene SQLite-Verbindung (Verbindungen sind nicht zwischen Threads teilbar).
+    """
+
+    def __init__(self, queue: JobQueue):
+        self.queue = queue
+        self.stop = threading.Event()
+        self.thread = None
+
+    def _run(self):
+        keeper = JobQueue(self.queue.db_path, worker_id=self.queue.worker_id, lease_seconds=self.queue.lease_seconds)
+        try:
+            while not self.stop.wait(self.queue.lease_seconds / 3):
+                keeper.heartbeat()
+        finally:
+            keeper.close()
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self._run, name="lease-keeper", daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop.set()
+        self.thread.join()
+        return False
+
+
+class _Transaction:
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        return False
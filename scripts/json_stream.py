@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Streaming JSON für große Ergebnis-Dateien
+=========================================
+Liest und schreibt _ocr.json-Dateien Seite für Seite statt als Ganzes
+
+Features:
+- iter_document(): top-level Felder und die Elemente eines Arrays (Default "pages")
+  einzeln, in Datei-Reihenfolge; im Speicher liegt nur die aktuelle Seite plus
+  ein Lese-Puffer
+- JsonObjectWriter: schreibt dasselbe Format wie json.dump(indent=2, ensure_ascii=False),
+  Byte für Byte, aber inkrementell (über eine temporäre Datei + os.replace)
+- Nur Standardbibliothek (json.JSONDecoder.raw_decode auf einem gleitenden Puffer)
+
+Usage:
+    from json_stream import iter_document, JsonObjectWriter
+
+    with JsonObjectWriter("out.json") as writer:
+        for kind, key, value in iter_document("in.json"):
+            if kind == 'array':
+                writer.array(key)
+            elif kind == 'item':
+                writer.item('pages', clean(value))
+            else:
+                writer.field(key, value)
+"""
+
+import json
+import os
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = ' \t\n\r'
+NUMBER_CHARS = set('0123456789.eE+-')
+
+
+class _Reader:
+    """Gleitender Lese-Puffer über einer Textdatei"""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Verbrauchten Teil verwerfen, damit der Puffer nicht mit der Datei wächst
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Nächstes Zeichen nach Whitespace ('' am Dateiende)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r}, found {found or 'end of file'!r}")
+        self.pos += 1
+
+    def value(self):
+        """Ein vollständiger JSON-Wert ab der aktuellen Position"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # Zahl/Literal am Pufferende könnte noch weitergehen; raw_decode nimmt bei
+            # "12." oder "1e" am Pufferende die kürzere Zahl und lässt den Rest stehen
+            rest = self.buffer[end:]
+            number = isinstance(value, (int, float)) and not isinstance(value, bool)
+            if (not rest or number and all(c in NUMBER_CHARS for c in rest)) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_document(path, array_key: str = 'pages', chunk_size: int = CHUNK_SIZE):
+    """
+    Top-level Objekt einer JSON-Datei stückweise lesen
+
+    Yields:
+        ('field', key, value) für jedes top-level Feld außer array_key,
+        ('array', array_key, None) am Anfang von array_key,
+        ('item', index, value) für jedes Element von array_key
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = _Reader(f, chunk_size)
+        reader.expect('{')
+
+        if reader.peek() == '}':
+            return
+
+        while True:
+            key = reader.value()
+            reader.expect(':')
+
+            if key == array_key and reader.peek() == '[':
+                reader.expect('[')
+                yield ('array', key, None)
+                index = 0
+                if reader.peek() != ']':
+                    while True:
+                        yield ('item', index, reader.value())
+                        index += 1
+                        if reader.peek() == ',':
+                            reader.expect(',')
+                            continue
+                        break
+                reader.expect(']')
+            else:
+                yield ('field', key, reader.value())
+
+            if reader.peek() == ',':
+                reader.expect(',')
+                continue
+            reader.expect('}')
+            return
+
+
+class JsonObjectWriter:
+    """Top-level JSON-Objekt inkrementell schreiben (Format wie json.dump(indent=2))"""
+
+    def __init__(self, path, indent: int = 2):
+        self.path = str(path)
+        self.tmp_path = f"{self.path}.tmp"
+        self.indent = indent
+        self.f = open(self.tmp_path, 'w', encoding='utf-8')
+        self.f.write('{')
+        self._fields = 0
+        self._array = None
+        self._items = 0
+
+    def _dumps(self, value, level: int) -> str:
+        text = json.dumps(value, indent=self.indent, ensure_ascii=False)
+        # Strings enthalten keine echten Zeilenumbrüche (escaped) → zeilenweise einrücken
+        return text.replace('\n', '\n' + ' ' * (self.indent * level))
+
+    def _key(self, key):
+        self.f.write(',' if self._fields else '')
+        self.f.write('\n' + ' ' * self.indent + json.dumps(key, ensure_ascii=False) + ': ')
+        self._fields += 1
+
+    def _close_array(self):
+        if self._array is None:
+            return
+        if self._items:
+            self.f.write('\n' + ' ' * self.indent + ']')
+        else:
+            self.f.write('[]')
+        self._array = None
+
+    def field(self, key, value):
+        """Ein top-level Feld"""
+        self._close_array()
+        self._key(key)
+        self.f.write(self._dumps(value, 1))
+
+    def item(self, key, value):
+        """Ein Element des Arrays key (aufeinanderfolgende Aufrufe bilden ein Array)"""
+        if self._array != key:
+            self._close_array()
+            self._key(key)
+            self._array = key
+            self._items = 0
+
+        self.f.write((',' if self._items else '[') + '\n' + ' ' * (self.indent * 2))
+        self.f.write(self._dumps(value, 2))
+        self._items += 1
+
+    def array(self, key):
+        """Leeres Array key anlegen (falls keine Elemente folgen)"""
+        if self._array != key:
+            self._close_array()
+            self._key(key)
+            self._array = key
+            self._items = 0
+
+    def close(self):
+        self._close_array()
+        self.f.write('\n}' if self._fields else '}')
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.f.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        """Abbruch: temporäre Datei löschen, Ziel bleibt unverändert"""
+        self.f.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Merge Shard Results
+===================
+Führt die Ergebnisse mehrerer --pages / --shard Läufe zu einem Dokument zusammen
+
+Features:
+- Akzeptiert Shard-Verzeichnisse oder deren *_ocr.json
+- Sortiert Seiten nach Seitennummer, doppelte Seiten: Erfolg schlägt Fehler
+- Berechnet total_pages / successful / failed neu
+- Meldet Seiten, die in keinem Shard vorkommen
+
+Usage:
+    python merge_shards.py results/pdf_DTS_Flechte_*_shard*of4 --output results/pdf_DTS_Flechte_merged
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+from checkpoint import write_json_atomic, write_fulltext
+
+# Felder, die pro Shard neu berechnet werden und nicht übernommen werden
+SHARD_FIELDS = {'pages', 'total_pages', 'successful', 'failed', 'selection', 'timestamp'}
+
+
+def setup_utf8():
+    """UTF-8 Fix für Windows"""
+    import io
+    if sys.platform == 'win32':
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def find_result_file(path):
+    """Finde *_ocr.json in einem Shard-Verzeichnis (oder nimm die Datei direkt)"""
+    path = Path(path)
+    if path.is_file():
+        return path
+
+    candidates = sorted(path.glob("*_ocr.json"))
+    if len(candidates) != 1:
+        raise FileNotFoundError(f"Expected exactly one *_ocr.json in {path}, found {len(candidates)}")
+
+    return candidates[0]
+
+
+def merge_results(shard_results):
+    """
+    Füge Shard-Ergebnisse zusammen
+
+    Args:
+        shard_results: Liste von geladenen *_ocr.json Dicts
+
+    Returns:
+        (merged_dict, missing_pages)
+    """
+    merged = {key: value for key, value in shard_results[0].items() if key not in SHARD_FIELDS}
+    pages = {}
+
+    for shard in shard_results:
+        for page in shard.get('pages', []):
+            existing = pages.get(page['page'])
+            # Doppelte Seite (überlappende Shards): erfolgreiches Ergebnis behalten
+            if existing is None or ('error' in existing and 'error' not in page):
+                pages[page['page']] = page
+
+    results = [pages[page_num] for page_num in sorted(pages)]
+
+    # Erwartete Seiten: Auswahl aller Shards; reine --shard Läufe decken das ganze Dokument ab
+    expected = set()
+    for shard in shard_results:
+        selection = shard.get('selection')
+        if not selection:
+            continue
+        expected.update(selection.get('page_numbers', []))
+        if selection.get('shard') and not selection.get('pages') and selection.get('document_pages'):
+            expected.update(range(1, selection['document_pages'] + 1))
+
+    missing = sorted(expected - set(pages))
+
+    merged['pages'] = results
+    merged['total_pages'] = len(results)
+    merged['successful'] = sum(1 for r in results if 'text' in r)
+    merged['failed'] = sum(1 for r in results if 'error' in r)
+    merged['timestamp'] = max((s.get('timestamp') or '' for s in shard_results), default='') or None
+    merged['merged_from'] = len(shard_results)
+
+    return merged, missing
+
+
+def main():
+    setup_utf8()
+
+    parser = argparse.ArgumentParser(description='Merge --pages/--shard OCR results into one document')
+    parser.add_argument('shards', nargs='+', help='Shard output directories or *_ocr.json files')
+    parser.add_argument('--output', required=True, help='Output directory for the merged result')
+    parser.add_argument('--name', help='Document name for output files (default: taken from the shard JSON file name)')
+
+    args = parser.parse_args()
+
+    print("="*60)
+    print("MERGING SHARDS")
+    print("="*60)
+
+    shard_results = []
+    result_files = []
+
+    for shard in args.shards:
+        try:
+            result_file = find_result_file(shard)
+        except FileNotFoundError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+
+        with open(result_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        selection = data.get('selection') or {}
+        print(f"  {result_file}: {len(data.get('pages', []))} pages "
+              f"(shard {selection.get('shard') or '-'}, pages {selection.get('pages') or '-'})")
+
+        shard_results.append(data)
+        result_files.append(result_file)
+
+    names = {f.name[:-len("_ocr.json")] for f in result_files}
+    if args.name:
+        name = args.name
+    elif len(names) == 1:
+        name = names.pop()
+    else:
+        print(f"[ERROR] Shards belong to different documents: {sorted(names)} (use --name)")
+        sys.exit(1)
+
+    merged, missing = merge_results(shard_results)
+
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    output_file = output_dir / f"{name}_ocr.json"
+    write_json_atomic(output_file, merged)
+
+    text_file = output_dir / f"{name}_fulltext.txt"
+    write_fulltext(text_file, merged['pages'])
+
+    print(f"\n{'='*60}")
+    print("MERGE COMPLETE")
+    print("="*60)
+    print(f"Pages:   {merged['total_pages']}")
+    print(f"Success: {merged['successful']}")
+    print(f"Failed:  {merged['failed']}")
+    if missing:
+        print(f"[WARNING] {len(missing)} selected pages missing: {missing[:20]}{' ...' if len(missing) > 20 else ''}")
+    print(f"\nResults:")
+    print(f"  JSON: {output_file}")
+    print(f"  Text: {text_file}")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Adaptive Mode Selection
+=======================
+Wählt pro Seite den billigsten Auflösungs-Modus, der voraussichtlich reicht
+
+Arbeitet nur mit billigen Bild-Statistiken auf einer verkleinerten Graustufen-Kopie:
+- Pixelgröße des Originals
+- Tinten-Anteil (Otsu-Schwellwert)
+- Geschätzte Textzeilen (Zeilen-Profil)
+- Geschätzte Spalten (Spalten-Profil)
+
+Regeln (Modi aus knowledge/05-OCR-Optimization.md):
+- Fast leer                          → tiny
+- Wenig Text (Karteikarte, Titel)    → small
+- Normale einspaltige Seite          → base
+- Mehrspaltig oder sehr dicht        → gundam
+
+Usage:
+    from mode_select import select_mode
+
+    mode, stats = select_mode(pil_image)
+
+    # CLI: --mode auto (oder fester Modus: tiny, small, base, large, gundam)
+"""
+
+from PIL import Image
+
+from image_loader import source_size
+
+# Analyse-Auflösung (längere Seite)
+ANALYSIS_SIZE = 512
+
+# Schwellwerte
+BLANK_INK = 0.005           # Tinten-Anteil darunter → fast leer
+LINE_INK = 0.02             # Tinten-Anteil einer Pixelzeile, ab dem sie zu einer Textzeile gehört
+GAP_INK = 0.01              # Tinten-Anteil einer Pixelspalte, darunter → Spaltenzwischenraum
+MIN_GAP_RATIO = 0.02        # Mindestbreite eines Spaltenzwischenraums (Anteil der Breite)
+MIN_COLUMN_RATIO = 0.05     # Mindestbreite einer Spalte (schmalere Blöcke: Ränder, Flecken)
+SPARSE_LINES = 12           # Höchstens so viele Zeilen → small
+DENSE_LINES = 45            # Mehr Zeilen → gundam
+LARGE_PIXELS = 6_000_000    # Größere Scans mit viel Text → gundam
+MIN_CONTRAST = 40           # Tinte muss so viel dunkler sein als das Papier (Median)
+
+
+def otsu_threshold(histogram) -> int:
+    """Otsu-Schwellwert aus einem 256-Bin Graustufen-Histogramm"""
+    total = sum(histogram)
+    if total == 0:
+        return 128
+
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_background = 0.0
+    weight_background = 0
+    best_threshold, best_variance = 128, -1.0
+
+    for i, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+
+        sum_background += i * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+
+        if variance > best_variance:
+            best_variance, best_threshold = variance, i
+
+    return best_threshold
+
+
+def _median(histogram) -> int:
+    half = sum(histogram) / 2
+    seen = 0
+    for i, count in enumerate(histogram):
+        seen += count
+        if seen >= half:
+            return i
+    return 255
+
+
+def _runs(profile, threshold, min_length=1):
+    """Zusammenhängende Bereiche mit Wert >= threshold"""
+    runs, start = [], None
+    for i, value in enumerate(profile):
+        if value >= threshold and start is None:
+            start = i
+        elif value < threshold and start is not None:
+            if i - start >= min_length:
+                runs.append((start, i))
+            start = None
+    if start is not None and len(profile) - start >= min_length:
+        runs.append((start, len(profile)))
+    return runs
+
+
+def image_stats(image: Image.Image) -> dict:
+    """
+    Billige Layout-Statistiken einer Seite
+
+    Returns:
+        dict mit width, height, ink_coverage, text_lines, columns
+    """
+    # Originalgröße, auch wenn das Bild reduziert dekodiert wurde
+    width, height = source_size(image)
+
+    gray = image.convert('L')
+    gray.thumbnail((ANALYSIS_SIZE, ANALYSIS_SIZE))
+
+    histogram = gray.histogram()
+    # Otsu allein teilt auf leeren Seiten das Papierrauschen → Mindestkontrast zum Papier
+    threshold = min(otsu_threshold(histogram), _median(histogram) - MIN_CONTRAST)
+    # Tinte = dunkle Pixel → 255, Hintergrund → 0
+    ink = gray.point(lambda v: 255 if v <= threshold else 0)
+
+    small_w, small_h = ink.size
+    coverage = ink.histogram()[255] / (small_w * small_h)
+
+    # Zeilen-/Spalten-Profile: Mittelwert pro Pixelzeile bzw. -spalte (BOX-Resampling)
+    row_profile = [v / 255 for v in ink.resize((1, small_h), Image.BOX).getdata()]
+    col_profile = [v / 255 for v in ink.resize((small_w, 1), Image.BOX).getdata()]
+
+    text_lines = len(_runs(row_profile, LINE_INK))
+
+    # Spalten = Tinten-Blöcke, getrennt durch ausreichend breite Lücken
+    min_gap = max(2, int(small_w * MIN_GAP_RATIO))
+    blocks = _runs(col_profile, GAP_INK, min_length=max(2, int(small_w * MIN_COLUMN_RATIO)))
+    columns = 0
+    previous_end = None
+    for start, end in blocks:
+        if previous_end is None or start - previous_end >= min_gap:
+            columns += 1
+        previous_end = end
+
+    return {
+        'width': width,
+        'height': height,
+        'ink_coverage': round(coverage, 4),
+        'text_lines': text_lines,
+        'columns': columns,
+    }
+
+
+def choose_mode(stats: dict) -> str:
+    """Billigster Modus für diese Statistiken"""
+    if stats['ink_coverage'] < BLANK_INK:
+        return 'tiny'
+    if stats['columns'] >= 2 or stats['text_lines'] > DENSE_LINES:
+        return 'gundam'
+    if stats['width'] * stats['height'] > LARGE_PIXELS and stats['text_lines'] > SPARSE_LINES:
+        return 'gundam'
+    if stats['text_lines'] <= SPARSE_LINES:
+        return 'small'
+    return 'base'
+
+
+def select_mode(image: Image.Image):
+    """Wähle Modus für ein Bild, liefert (mode, stats)"""
+    stats = image_stats(image)
+    return choose_mode(stats), stats
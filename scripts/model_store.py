@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Lokaler Modell-Speicher (vorbereitete Gewichte)
+===============================================
+Einmaliges "prepare": Modell-Revision festhalten und als bf16-safetensors lokal
+ablegen. Danach lädt load_model() offline aus diesem Verzeichnis:
+
+- Kein Hub-Resolver, kein Netzwerk (local_files_only)
+- Modell-Gerüst wird direkt auf dem Ziel-Device im Ziel-Datentyp angelegt
+  (ohne Zufalls-Initialisierung)
+- Gewichte werden per safetensors (mmap) tensorweise direkt auf das Device kopiert,
+  statt fp32 auf der CPU zu laden und danach .cuda().to(bfloat16) zu kopieren
+- Zeitaufschlüsselung: Tokenizer, Gerüst, Gewichte, gesamt
+
+Usage:
+    python scripts/model_store.py prepare                       # aktuelle Revision → models/DeepSeek-OCR
+    python scripts/model_store.py prepare --revision <commit>   # bestimmte Revision
+    python scripts/model_store.py info
+    python scripts/model_store.py load --device cuda            # Lade-Test mit Zeiten
+
+    # Skripte verwenden models/DeepSeek-OCR automatisch, falls vorhanden,
+    # oder das Verzeichnis aus DEEPSEEK_OCR_MODEL
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+DEFAULT_STORE = str(Path("models") / "DeepSeek-OCR")
+ENV_MODEL = "DEEPSEEK_OCR_MODEL"
+MANIFEST = "prepared.json"
+
+# Kleine Shards: paralleles Lesen, wenig Spitzen-RAM beim Speichern
+MAX_SHARD_SIZE = "2GB"
+
+DTYPES = ('bfloat16', 'float16', 'float32')
+
+
+def setup_utf8():
+    """UTF-8 Fix für Windows"""
+    if sys.platform == 'win32':
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def read_manifest(path) -> dict:
+    with open(Path(path) / MANIFEST, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def is_prepared(path) -> bool:
+    return path is not None and (Path(path) / MANIFEST).is_file()
+
+
+def find_prepared(model_name: str):
+    """
+    Vorbereitetes Verzeichnis für model_name, sonst None (→ Hub)
+
+    Reihenfolge: model_name selbst (falls Verzeichnis), DEEPSEEK_OCR_MODEL, models/DeepSeek-OCR
+    """
+    for candidate in (model_name, os.environ.get(ENV_MODEL), DEFAULT_STORE):
+        if candidate and is_prepared(candidate):
+            manifest = read_manifest(candidate)
+            if candidate == model_name or manifest.get('model_name') == model_name:
+                return str(candidate)
+    return None
+
+
+def prepare_model(model_name: str, output_dir: str = DEFAULT_STORE, revision: str = None,
+                  dtype: str = 'bfloat16') -> dict:
+    """
+    Modell vom Hub holen, in dtype konvertieren und lokal als safetensors speichern
+
+    Returns:
+        Manifest (model_name, revision, dtype, files)
+    """
+    import torch
+    from huggingface_hub import snapshot_download
+    from transformers import AutoModel, AutoTokenizer
+
+    start_time = time.time()
+    snapshot = Path(snapshot_download(model_name, revision=revision))
+    # snapshots/<commit>: die aufgelöste Revision ist der Verzeichnisname
+    commit = snapshot.name
+    print(f"[OK] Snapshot {model_name}@{commit} ({time.time() - start_time:.1f}s)")
+
+    output = Path(output_dir)
+    output.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(snapshot, trust_remote_code=True)
+    tokenizer.save_pretrained(output)
+
+    model = AutoModel.from_pretrained(snapshot, trust_remote_code=True, use_safetensors=True,
+                                      torch_dtype=getattr(torch, dtype))
+    model = model.eval().to(getattr(torch, dtype))
+    model.save_pretrained(output, safe_serialization=True, max_shard_size=MAX_SHARD_SIZE)
+    print(f"[OK] Saved {dtype} safetensors to {output}")
+
+    # Remote-Code (modeling_*.py, ...) und übrige Konfigurationsdateien mitnehmen
+    for file in snapshot.iterdir():
+        if file.suffix in ('.py', '.json', '.txt', '.model') and not (output / file.name).exists():
+            shutil.copy(file, output / file.name)
+
+    files = sorted(p.name for p in output.glob("*.safetensors"))
+    manifest = {
+        'model_name': model_name,
+        'revision': commit,
+        'dtype': dtype,
+        'files': files,
+        'bytes': sum((output / name).stat().st_size for name in files),
+        'prepared': datetime.now().isoformat(timespec='seconds'),
+    }
+    with open(output / MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"[OK] Prepared in {time.time() - start_time:.1f}s")
+    return manifest
+
+
+def load_prepared(path: str, device: str = "cuda", dtype=None):
+    """
+    Offline laden: Gerüst auf dem Device anlegen, Gewichte tensorweise aus safetensors
+
+    Returns:
+        (tokenizer, model, timings) - timings in Sekunden pro Schritt
+    """
+    import torch
+    from safetensors import safe_open
+    from transformers import AutoConfig, AutoModel, AutoTokenizer
+    from transformers.modeling_utils import no_init_weights
+
+    path = Path(path)
+    manifest = read_manifest(path)
+    dtype = dtype or getattr(torch, manifest['dtype'])
+    timings = {}
+    start_time = time.time()
+
+    tokenizer = AutoTokenizer.from_pretrained(path, trust_remote_code=True, local_files_only=True)
+    timings['tokenizer'] = time.time() - start_time
+    print(f"[OK] Tokenizer loaded ({timings['tokenizer']:.1f}s)")
+
+    step = time.time()
+    config = AutoConfig.from_pretrained(path, trust_remote_code=True, local_files_only=True)
+    default_dtype = torch.get_default_dtype()
+    try:
+        # Parameter direkt in dtype auf dem Device, ohne Zufalls-Initialisierung
+        torch.set_default_dtype(dtype)
+        with no_init_weights(), torch.device(device):
+            model = AutoModel.from_config(config, trust_remote_code=True)
+    finally:
+        torch.set_default_dtype(default_dtype)
+    timings['build'] = time.time() - step
+    print(f"[OK] Model built on {device} ({timings['build']:.1f}s)")
+
+    step = time.time()
+    state = model.state_dict()
+    loaded = set()
+    with torch.no_grad():
+        for name in manifest['files']:
+            with safe_open(str(path / name), framework='pt', device=str(device)) as f:
+                for key in f.keys():
+                    if key not in state:
+                        continue
+                    state[key].copy_(f.get_tensor(key))
+                    loaded.add(key)
+    if hasattr(model, 'tie_weights'):
+        model.tie_weights()
+    if device.startswith('cuda'):
+        torch.cuda.synchronize(torch.device(device))
+    timings['weights'] = time.time() - step
+
+    missing = [key for key in state if key not in loaded]
+    gigabytes = manifest.get('bytes', 0) / 1024 ** 3
+    print(f"[OK] Weights: {gigabytes:.2f} GB from {len(manifest['files'])} files "
+          f"({timings['weights']:.1f}s, {gigabytes / max(timings['weights'], 1e-6):.2f} GB/s)")
+    if missing:
+        print(f"[WARNING] {len(missing)} tensors not in the prepared weights (e.g. {missing[0]}), "
+              f"kept as built (tied weights/buffers)")
+
+    model = model.eval()
+    # Revision des Hub-Snapshots, damit Cache-Keys zum Hub-Modell passen
+    model.config._commit_hash = manifest['revision']
+
+    timings['total'] = time.time() - start_time
+    return tokenizer, model, timings
+
+
+def cmd_prepare(args):
+    from ocr_engine import MODEL_NAME
+
+    print("="*60)
+    print("PREPARE MODEL")
+    print("="*60)
+    prepare_model(args.model or MODEL_NAME, args.output, revision=args.revision, dtype=args.dtype)
+    print(f"\nScripts now load from {args.output} (offline)")
+
+
+def cmd_info(args):
+    path = args.output
+    if not is_prepared(path):
+        print(f"[ERROR] No prepared model in {path}, run: python scripts/model_store.py prepare")
+        sys.exit(1)
+
+    manifest = read_manifest(path)
+    print(f"Model:    {manifest['model_name']}")
+    print(f"Revision: {manifest['revision']}")
+    print(f"Dtype:    {manifest['dtype']}")
+    print(f"Files:    {len(manifest['files'])} ({manifest.get('bytes', 0) / 1024 ** 3:.2f} GB)")
+    print(f"Prepared: {manifest.get('prepared')}")
+
+
+def cmd_load(args):
+    from ocr_engine import load_model
+
+    start_time = time.time()
+    load_model(args.output, device=args.device)
+    print(f"Total: {time.time() - start_time:.1f}s")
+
+
+def main():
+    setup_utf8()
+
+    parser = argparse.ArgumentParser(description='Prepare DeepSeek-OCR weights for fast offline loading')
+    parser.add_argument('--output', default=DEFAULT_STORE, help=f'Prepared model directory (default: {DEFAULT_STORE})')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    prepare = commands.add_parser('prepare', help='Download a pinned revision and store it as local safetensors')
+    prepare.add_argument('--model', help='Hub model id (default: deepseek-ai/DeepSeek-OCR)')
+    prepare.add_argument('--revision', help='Branch, tag or commit to pin (default: main)')
+    prepare.add_argument('--dtype', choices=DTYPES, default='bfloat16', help='Stored dtype (default: bfloat16)')
+
+    commands.add_parser('info', help='Show the prepared model')
+
+    load = commands.add_parser('load', help='Load the prepared model once and print the timing breakdown')
+    load.add_argument('--device', default='cuda', help='Target device (default: cuda)')
+
+    args = parser.parse_args()
+    {'prepare': cmd_prepare, 'info': cmd_info, 'load': cmd_load}[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
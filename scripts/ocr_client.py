@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+DeepSeek-OCR Daemon Client
+==========================
+Thin Client für ocr_daemon.py mit derselben Schnittstelle wie OcrEngine
+(ocr() / ocr_many()), damit die test_ocr_*.py Skripte ohne eigenes Modell laufen
+
+Adresse:
+- "127.0.0.1:8765" / "http://127.0.0.1:8765"  → localhost-HTTP
+- "unix:/tmp/deepseek-ocr.sock"                → Unix-Socket
+- Default: Umgebungsvariable DEEPSEEK_OCR_DAEMON, sonst 127.0.0.1:8765
+
+Usage:
+    from engine_args import engine_from_args, engine_settings
+    from ocr_client import connect_daemon
+
+    engine = connect_daemon(args.daemon, engine_settings(args)) or engine_from_args(args)
+"""
+
+import base64
+import http.client
+import io
+import json
+import os
+import socket
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+from ocr_types import BATCH_WINDOW_FACTOR, DEFAULT_PROMPT, PageResult
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+ENV_ADDRESS = "DEEPSEEK_OCR_DAEMON"
+
+# Timeout für den Health-Check: kein Daemon → schnell auf lokales Modell ausweichen
+CONNECT_TIMEOUT = 0.5
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection über einen Unix-Socket"""
+
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def encode_image(image) -> dict:
+    """Pfad (absolut, der Daemon liest selbst) oder PIL-Image (als PNG)"""
+    if isinstance(image, Image.Image):
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        return {'png': base64.b64encode(buffer.getvalue()).decode('ascii')}
+    return {'path': str(Path(image).resolve())}
+
+
+class RemoteEngine:
+    """OcrEngine-kompatibler Client für ocr_daemon.py"""
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, timeout: Optional[float] = None):
+        self.address = address
+        self.timeout = timeout
+        self.info = {}
+
+    def _connection(self, timeout=None):
+        timeout = timeout if timeout is not None else self.timeout
+        if self.address.startswith("unix:"):
+            return UnixHTTPConnection(self.address[len("unix:"):], timeout=timeout)
+
+        host_port = self.address.split("://", 1)[-1].rstrip('/')
+        host, _, port = host_port.rpartition(':')
+        return http.client.HTTPConnection(host or "127.0.0.1", int(port), timeout=timeout)
+
+    def _post(self, path, payload):
+        connection = self._connection()
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        connection.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+        return connection, connection.getresponse()
+
+    def health(self, timeout: float = CONNECT_TIMEOUT) -> dict:
+        connection = self._connection(timeout=timeout)
+        try:
+            connection.request('GET', '/health')
+            response = connection.getresponse()
+            self.info = json.loads(response.read())
+            return self.info
+        finally:
+            connection.close()
+
+    @property
+    def revision(self):
+        return self.info.get('revision')
+
+    def ocr(self, image, base_size: int = 640, image_size: int = 640, crop_mode: bool = True,
+            prompt: str = DEFAULT_PROMPT, name: Optional[str] = None, mode: Optional[str] = None) -> PageResult:
+        """Wie OcrEngine.ocr(), Fehler des Daemons als RuntimeError"""
+        payload = dict(image=encode_image(image), base_size=base_size, image_size=image_size,
+                       crop_mode=crop_mode, prompt=prompt, name=name, mode=mode)
+
+        connection, response = self._post('/ocr', payload)
+        try:
+            data = json.loads(response.read())
+        finally:
+            connection.close()
+
+        if response.status != 200:
+            raise RuntimeError(f"OCR daemon: {data.get('error', response.reason)}")
+
+        return PageResult.from_dict(data)
+
+    def ocr_many(self, images, batch_size: int = 1, base_size: int = 640, image_size: int = 640,
+                 crop_mode: bool = True, prompt: str = DEFAULT_PROMPT, names=None, prefetch: int = 0,
+                 mode: Optional[str] = None):
+        """
+        Wie OcrEngine.ocr_many()
+
+        Seiten werden fensterweise (batch_size * BATCH_WINDOW_FACTOR) an den Daemon
+        geschickt, damit Generatoren (Render-Ahead) lazy bleiben und der Daemon
+        innerhalb eines Fensters batchen kann. prefetch läuft im Daemon nicht.
+        """
+        settings = dict(base_size=base_size, image_size=image_size, crop_mode=crop_mode,
+                        prompt=prompt, mode=mode, batch_size=batch_size)
+        window_size = max(batch_size * BATCH_WINDOW_FACTOR, 1)
+
+        window = []
+        offset = 0
+        for index, image in enumerate(images):
+            window.append(image)
+            if len(window) >= window_size:
+                yield from self._ocr_window(window, offset, names, settings)
+                offset += len(window)
+                window = []
+
+        if window:
+            yield from self._ocr_window(window, offset, names, settings)
+
+    def _ocr_window(self, window, offset, names, settings):
+        payload = dict(settings, images=[encode_image(image) for image in window])
+        if names:
+            payload['names'] = names[offset:offset + len(window)]
+
+        connection, response = self._post('/ocr_many', payload)
+        try:
+            if response.status != 200:
+                error = RuntimeError(f"OCR daemon: HTTP {response.status} {response.reason}")
+                for index in range(len(window)):
+                    yield offset + index, error
+                return
+
+            received = set()
+            try:
+                for line in response:
+                    if not line.strip():
+                        continue
+                    item = json.loads(line)
+                    received.add(item['index'])
+                    if 'error' in item:
+                        yield offset + item['index'], RuntimeError(item['error'])
+                    else:
+                        yield offset + item['index'], PageResult.from_dict(item['result'])
+                failure = "no result"
+            except (OSError, ValueError, http.client.HTTPException) as e:
+                failure = f"connection lost ({e})"
+
+            # Seiten ohne Antwort (Daemon abgestürzt, Verbindung abgerissen) als Fehler melden
+            for index in range(len(window)):
+                if index not in received:
+                    yield offset + index, RuntimeError(f"OCR daemon: {failure} for this page")
+        finally:
+            connection.close()
+
+
+def connect_daemon(address: Optional[str] = None, settings: Optional[dict] = None) -> Optional[RemoteEngine]:
+    """
+    Verbinde mit einem laufenden Daemon
+
+    Args:
+        address: Daemon-Adresse (Default: $DEEPSEEK_OCR_DAEMON oder 127.0.0.1:8765)
+        settings: Eigene Engine-Flags (engine_args.engine_settings); weichen die des
+                  Daemons ab, wird er nicht verwendet
+
+    Returns:
+        RemoteEngine, oder None wenn kein (passender) Daemon erreichbar ist
+    """
+    address = address or os.environ.get(ENV_ADDRESS) or DEFAULT_ADDRESS
+    engine = RemoteEngine(address)
+
+    try:
+        info = engine.health()
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+
+    if info.get('status') != 'ok':
+        return None
+
+    if settings is not None:
+        daemon_settings = info.get('settings') or {}
+        different = [key for key, value in settings.items() if daemon_settings.get(key) != value]
+        if different:
+            print(f"[WARNING] OCR daemon at {address} runs with other engine settings, loading the model in this process")
+            for key in different:
+                print(f"  --{key.replace('_', '-')}: daemon {daemon_settings.get(key)!r}, here {settings[key]!r}")
+            print()
+            return None
+
+    print(f"[OK] Using OCR daemon at {address} (backend: {info.get('backend')})\n")
+    return engine
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+DeepSeek-OCR Daemon
+===================
+Langlebiger Server-Prozess, der das Modell einmal lädt und OCR-Aufträge über
+localhost-HTTP oder einen Unix-Socket annimmt
+
+Die test_ocr_*.py Skripte verwenden den Daemon automatisch, wenn er läuft
+(siehe ocr_client.py), und laden sonst das Modell selbst.
+
+Endpoints:
+    GET  /health      → {"status": "ok", "backend": ..., "revision": ..., "settings": {...}}
+                        settings: ergebnisrelevante Engine-Flags (engine_args.engine_settings),
+                        Clients mit anderen Flags laden das Modell selbst
+    POST /ocr         → eine Seite, Antwort: PageResult als JSON
+    POST /ocr_many    → mehrere Seiten, Antwort: JSON-Lines {"index", "result"|"error"}
+                        in Eingabe-Reihenfolge, jede Zeile sobald die Seite fertig ist
+
+Bilder im Request: {"path": "/abs/pfad.jpg"} oder {"png": "<base64>"} (In-Memory Seiten)
+
+Backends:
+- engine: OcrEngine (GPU, Standard)
+- stub:   Kein Modell, liefert Platzhalter-Text (Tests auf CPU ohne torch)
+
+Usage:
+    python scripts/ocr_daemon.py                              # http://127.0.0.1:8765
+    python scripts/ocr_daemon.py --socket /tmp/deepseek-ocr.sock
+    python scripts/ocr_daemon.py --backend stub --port 8766
+"""
+
+import argparse
+import base64
+import io
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.append(str(Path(__file__).parent))
+from engine_args import add_engine_args, engine_from_args, engine_settings
+from image_loader import read_size
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+def setup_utf8():
+    """UTF-8 Fix für Windows"""
+    if sys.platform == 'win32':
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def decode_image(spec: dict):
+    """Request-Bild → Pfad oder PIL-Image"""
+    if 'path' in spec:
+        return spec['path']
+    if 'png' in spec:
+        with Image.open(io.BytesIO(base64.b64decode(spec['png']))) as img:
+            return img.convert('RGB')
+    raise ValueError("Image needs 'path' or 'png'")
+
+
+class StubBackend:
+    """Backend ohne Modell: liefert Platzhalter-Ergebnisse mit echten Bildgrößen"""
+
+    name = "stub"
+    revision = "stub"
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    def ocr(self, image, base_size=640, image_size=640, crop_mode=True, prompt=None, name=None, mode=None) -> dict:
+        start_time = time.time()
+
+        width, height = read_size(image)
+        time.sleep(self.delay)
+
+        label = name or (Path(image).name if not isinstance(image, Image.Image) else "image")
+        text = f"[stub] {label}"
+        elapsed = time.time() - start_time
+
+        return {
+            'text': text,
+            'time_seconds': elapsed,
+            'preprocess_seconds': 0.0,
+            'generate_seconds': elapsed,
+            'prompt_tokens': 0,
+            'vision_tokens': 0,
+            'output_tokens': len(text.split()),
+            'image_width': width,
+            'image_height': height,
+            'base_size': base_size,
+            'image_size': image_size,
+            'crop_mode': crop_mode,
+            'crop_ratio': [1, 1],
+            'mode': mode,
+        }
+
+    def ocr_many(self, images, batch_size=1, names=None, **settings):
+        for index, image in enumerate(images):
+            try:
+                yield index, self.ocr(image, name=names[index] if names else None, **settings)
+            except Exception as e:
+                yield index, e
+
+
+class EngineBackend:
+    """Backend mit geladener OcrEngine"""
+
+    name = "engine"
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.revision = engine.revision
+
+    def ocr(self, image, **settings) -> dict:
+        return self.engine.ocr(image, **settings).to_dict()
+
+    def ocr_many(self, images, **settings):
+        for index, result in self.engine.ocr_many(images, **settings):
+            yield index, result if isinstance(result, Exception) else result.to_dict()
+
+
+# Erlaubte Einstellungen aus dem Request
+OCR_SETTINGS = ('base_size', 'image_size', 'crop_mode', 'prompt', 'mode')
+
+
+class OcrRequestHandler(BaseHTTPRequestHandler):
+    """HTTP-Handler, das Backend liegt am Server (self.server.backend)"""
+
+    protocol_version = "HTTP/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_GET(self):
+        if self.path != '/health':
+            self._send_json({'error': f"Unknown endpoint {self.path}"}, status=404)
+            return
+
+        backend = self.server.backend
+        self._send_json({'status': 'ok', 'backend': backend.name, 'revision': backend.revision,
+                         'settings': self.server.settings, 'pid': os.getpid()})
+
+    def do_POST(self):
+        try:
+            request = self._read_json()
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_json({'error': f"Invalid JSON: {e}"}, status=400)
+            return
+
+        settings = {key: request[key] for key in OCR_SETTINGS if key in request}
+
+        if self.path == '/ocr':
+            self._handle_ocr(request, settings)
+        elif self.path == '/ocr_many':
+            self._handle_ocr_many(request, settings)
+        else:
+            self._send_json({'error': f"Unknown endpoint {self.path}"}, status=404)
+
+    def _handle_ocr(self, request, settings):
+        try:
+            image = decode_image(request['image'])
+            # Eine GPU: Aufträge laufen nacheinander
+            with self.server.lock:
+                result = self.server.backend.ocr(image, name=request.get('name'), **settings)
+        except Exception as e:
+            self._send_json({'error': str(e)}, status=500)
+            return
+
+        self._send_json(result)
+
+    def _handle_ocr_many(self, request, settings):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+        self.end_headers()
+
+        specs = request.get('images', [])
+        names = request.get('names')
+        sent = set()
+
+        def send(index, result):
+            if isinstance(result, Exception):
+                line = {'index': index, 'error': str(result)}
+            else:
+                line = {'index': index, 'result': result}
+            self.wfile.write((json.dumps(line, ensure_ascii=False) + "\n").encode('utf-8'))
+            self.wfile.flush()
+            sent.add(index)
+
+        # Nicht dekodierbare Bilder sofort als Fehler melden, der Rest geht ans Backend
+        indices, images = [], []
+        for index, spec in enumerate(specs):
+            try:
+                images.append(decode_image(spec))
+                indices.append(index)
+            except Exception as e:
+                send(index, e)
+
+        failure = None
+        with self.server.lock:
+            try:
+                results = self.server.backend.ocr_many(
+                    images,
+                    batch_size=request.get('batch_size', 1),
+                    names=[names[index] for index in indices] if names else None,
+                    **settings
+                )
+                for position, result in results:
+                    send(indices[position], result)
+            except Exception as e:
+                failure = e
+
+        # Jede Seite bekommt eine Antwort, auch wenn das Backend mittendrin abbricht
+        for index in indices:
+            if index not in sent:
+                send(index, failure or RuntimeError("No result from backend"))
+
+
+class OcrHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, backend, settings=None, verbose=False):
+        super().__init__(address, OcrRequestHandler)
+        self.backend = backend
+        self.settings = settings
+        self.lock = threading.Lock()
+        self.verbose = verbose
+
+
+class OcrUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, backend, settings=None, verbose=False):
+        super().__init__(path, OcrRequestHandler)
+        self.backend = backend
+        self.settings = settings
+        self.lock = threading.Lock()
+        self.verbose = verbose
+
+    def get_request(self):
+        # BaseHTTPRequestHandler erwartet eine (host, port) Client-Adresse
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+def build_engine_backend(args):
+    """OcrEngine mit denselben Optionen wie die test_ocr_*.py Skripte"""
+    from vision_cache import VisionCache
+
+    engine = engine_from_args(
+        args,
+        cores=getattr(args, 'cores', None),
+        vision_cache=VisionCache(args.vision_cache) if getattr(args, 'vision_cache', 0) else None
+    )
+    return EngineBackend(engine)
+
+
+def main():
+    setup_utf8()
+
+    parser = argparse.ArgumentParser(description='DeepSeek-OCR daemon: load the model once, serve OCR over HTTP or a Unix socket')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'HTTP host (default: {DEFAULT_HOST}, localhost only)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'HTTP port (default: {DEFAULT_PORT})')
+    parser.add_argument('--socket', help='Listen on this Unix socket instead of HTTP')
+    parser.add_argument('--backend', choices=['engine', 'stub'], default='engine', help='engine (default) or stub (no model, for tests)')
+    parser.add_argument('--stub-delay', type=float, default=0.0, help='Seconds per page for the stub backend')
+    add_engine_args(parser)
+    parser.add_argument('--vision-cache', type=int, default=0, metavar='N',
+                        help='Keep the vision encodings of the last N images/modes, so requests with other prompts skip the encoder (default: 0 = off)')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+
+    args = parser.parse_args()
+
+    if args.backend == 'stub':
+        backend = StubBackend(delay=args.stub_delay)
+    else:
+        backend = build_engine_backend(args)
+
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+        server = OcrUnixServer(args.socket, backend, settings=engine_settings(args), verbose=args.verbose)
+        address = f"unix:{args.socket}"
+    else:
+        server = OcrHTTPServer((args.host, args.port), backend, settings=engine_settings(args), verbose=args.verbose)
+        address = f"{args.host}:{args.port}"
+
+    print("="*60)
+    print(f"OCR DAEMON ({backend.name}) listening on {address}")
+    print("="*60)
+    print(f"Clients: --daemon {address} (or DEEPSEEK_OCR_DAEMON={address})\n")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
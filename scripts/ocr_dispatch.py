@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+Multi-Worker OCR Dispatcher
+===========================
+Datenparallele OCR über mehrere Worker-Prozesse, jeder mit eigener Engine-Replika
+(eine pro GPU, oder Stub-Worker auf CPU für Tests)
+
+Features:
+- Ein Worker-Prozess pro Device ("cuda:0,cuda:1", "auto" = alle GPUs,
+  "cuda:0*2" = zwei Replikas auf einer GPU, "cpu*4" = vier CPU-Worker,
+  "stub*4" = vier Stub-Worker)
+- CPU-Worker bekommen je einen eigenen Block zusammenhängender Kerne (siehe cpu_backend.py)
+- Seiten gehen in kleinen Chunks an die Worker: jeder neue Chunk landet in der
+  Queue des Workers mit den wenigsten offenen Chunks (statt fester Aufteilung,
+  langsame Seiten/GPUs bremsen die anderen nicht); der Dispatcher weiß so immer,
+  welcher Worker welchen Chunk hat
+- Ergebnisse werden in Eingabe-Reihenfolge wieder zusammengesetzt
+  (METS ORDER bzw. PDF-Seitenreihenfolge)
+- Mehrere Dokumente gleichzeitig: ocr_many() darf aus mehreren Threads laufen,
+  die Chunks teilen sich dieselben Worker
+- Stirbt ein Worker (z.B. CUDA-Fehler), werden die offenen Seiten aller seiner
+  Chunks (laufend oder noch in seiner Queue) neu eingeplant
+- DispatchEngine hat dieselbe Schnittstelle wie OcrEngine (ocr() / ocr_many())
+
+Usage:
+    from ocr_dispatch import DispatchEngine
+
+    with DispatchEngine.start("cuda:0,cuda:1", engine_options(args)) as engine:
+        for index, result in engine.ocr_many(image_paths, batch_size=4):
+            ...
+
+    python scripts/test_ocr_pdf.py data/DTS_Flechte.pdf --devices auto
+    python scripts/test_ocr_mets.py data/o_szd.151 --devices stub*4
+"""
+
+import argparse
+import itertools
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+from engine_args import engine_defaults
+from ocr_types import DEFAULT_PROMPT, PageResult
+
+# Seiten pro Chunk = batch_size * CHUNK_FACTOR (klein halten, damit sich die Last gut verteilt)
+CHUNK_FACTOR = 2
+
+# Chunks pro Worker, die gleichzeitig unterwegs sein dürfen (begrenzt Speicher + Reorder-Puffer)
+IN_FLIGHT_PER_WORKER = 2
+
+# Sekunden zwischen zwei Prüfungen, ob alle Worker-Prozesse noch leben
+WORKER_CHECK_INTERVAL = 1.0
+
+# Wie oft die Seiten eines abgestürzten Workers neu eingeplant werden
+MAX_REQUEUE = 2
+
+# Engine-Optionen der test_ocr_*.py Skripte, die an die Worker weitergereicht werden
+ENGINE_OPTIONS = tuple(key for key in engine_defaults() if key != 'device') + ('stub_delay',)
+
+
+def parse_devices(spec: str) -> list:
+    """
+    Device-Liste für die Worker
+
+    "cuda:0,cuda:1" → ['cuda:0', 'cuda:1']
+    "cuda:0*2,stub" → ['cuda:0', 'cuda:0', 'stub']
+    "auto"          → alle sichtbaren GPUs
+    """
+    if spec.strip() == 'auto':
+        import torch
+        count = torch.cuda.device_count()
+        if count == 0:
+            raise ValueError("--devices auto: no CUDA devices found")
+        return [f"cuda:{i}" for i in range(count)]
+
+    devices = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        device, _, count = part.partition('*')
+        try:
+            count = int(count) if count else 1
+        except ValueError:
+            raise ValueError(f"Invalid device {part!r}, expected e.g. cuda:0, cuda:0*2 or stub*4")
+        if count < 1:
+            raise ValueError(f"Invalid device {part!r}, count must be >= 1")
+        devices.extend([device] * count)
+
+    if not devices:
+        raise ValueError(f"No devices in {spec!r}")
+    return devices
+
+
+def engine_options(args) -> dict:
+    """Engine-Optionen aus den argparse-Argumenten eines Skripts"""
+    return {key: getattr(args, key) for key in ENGINE_OPTIONS if hasattr(args, key)}
+
+
+def build_backend(device: str, options: dict):
+    """Backend eines Workers: Stub oder OcrEngine auf dem Device (wie im Daemon)"""
+    from ocr_daemon import StubBackend, build_engine_backend
+
+    if device == 'stub':
+        return StubBackend(delay=options.get('stub_delay') or 0.0)
+
+    return build_engine_backend(argparse.Namespace(**dict(engine_defaults(), **options, device=device)))
+
+
+def worker_main(worker_id: int, device: str, options: dict, tasks, results):
+    """
+    Worker-Prozess: Engine laden, dann Chunks aus der eigenen Queue abarbeiten
+
+    Nachrichten an den Dispatcher:
+        ('ready', worker, info) / ('failed', worker, error)
+        ('result', worker, task_id, index, dict | None, error | None, attempts)
+        ('chunk_error', worker, task_id, error)
+        ('done', worker, task_id)
+    """
+    try:
+        backend = build_backend(device, options)
+    except Exception as e:
+        traceback.print_exc()
+        results.put(('failed', worker_id, f"{type(e).__name__}: {e}"))
+        return
+
+    results.put(('ready', worker_id, {'device': device, 'backend': backend.name, 'revision': backend.revision}))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+
+        task_id, items, settings = task
+
+        indices = [index for index, _, _ in items]
+        try:
+            outputs = backend.ocr_many(
+                [image for _, image, _ in items],
+                names=[name for _, _, name in items],
+                **settings
+            )
+            for local_index, result in outputs:
+                if isinstance(result, Exception):
+                    results.put(('result', worker_id, task_id, indices[local_index], None, str(result),
+                                 getattr(result, 'attempts', None)))
+                else:
+                    results.put(('result', worker_id, task_id, indices[local_index], result, None, None))
+        except Exception as e:
+            # Fehler außerhalb einer Seite: restliche Seiten des Chunks als fehlgeschlagen melden
+            traceback.print_exc()
+            results.put(('chunk_error', worker_id, task_id, f"{type(e).__name__}: {e}"))
+
+        results.put(('done', worker_id, task_id))
+
+
+class _Task:
+    """Ein Chunk im Umlauf"""
+
+    def __init__(self, task_id, request, items, settings):
+        self.task_id = task_id
+        self.request = request
+        self.items = items
+        self.settings = settings
+        self.pending = {index for index, _, _ in items}
+        self.requeued = 0
+
+
+class _Request:
+    """Ein ocr_many()-Aufruf: Ergebnisse landen in dessen Queue"""
+
+    def __init__(self):
+        self.results = queue.Queue()
+        self.cancelled = threading.Event()
+
+
+class WorkerPool:
+    """Worker-Prozesse mit gemeinsamer Task-Queue und geordneter Rückgabe"""
+
+    def __init__(self, devices, options: dict = None, chunk_factor: int = CHUNK_FACTOR):
+        """
+        Args:
+            devices: Liste oder Spezifikation (siehe parse_devices)
+            options: Engine-Optionen für die Worker (siehe engine_options)
+            chunk_factor: Seiten pro Chunk = batch_size * chunk_factor
+        """
+        self.devices = parse_devices(devices) if isinstance(devices, str) else list(devices)
+        self.options = options or {}
+        self.chunk_factor = chunk_factor
+
+        # spawn: CUDA verträgt kein fork nach der Initialisierung
+        context = multiprocessing.get_context('spawn')
+        # Eine Task-Queue pro Worker: jeder Chunk hat ab dem Einplanen einen bekannten Besitzer
+        self._tasks = [context.Queue() for _ in self.devices]
+        self._results = context.Queue()
+        self._processes = [
+            context.Process(target=worker_main, name=f"ocr-worker-{worker_id}",
+                            args=(worker_id, device, options, self._tasks[worker_id], self._results), daemon=True)
+            for worker_id, (device, options) in enumerate(zip(self.devices, self._worker_options()))
+        ]
+
+        self._lock = threading.Lock()
+        self._task_ids = itertools.count()
+        self._inflight = {}
+        self._assigned = {worker_id: set() for worker_id in range(len(self.devices))}
+        self._alive = set()
+        self._failed = {}
+        self._ready = threading.Condition(self._lock)
+        self._ready_count = 0
+        self._slots = threading.Semaphore(IN_FLIGHT_PER_WORKER * len(self.devices))
+        self._closed = threading.Event()
+        self.info = {}
+
+        for process in self._processes:
+            process.start()
+        self._alive = set(range(len(self._processes)))
+
+        self._collector = threading.Thread(target=self._collect, name="ocr-dispatch-collector", daemon=True)
+        self._collector.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _worker_options(self) -> list:
+        """Engine-Optionen pro Worker, CPU-Worker teilen sich die Kerne"""
+        options = [dict(self.options) for _ in self.devices]
+        cpu_workers = [i for i, device in enumerate(self.devices) if device == 'cpu']
+        if cpu_workers:
+            from cpu_backend import split_cores
+            for worker_id, cores in zip(cpu_workers, split_cores(len(cpu_workers))):
+                options[worker_id]['cores'] = cores
+        return options
+
+    @property
+    def size(self) -> int:
+        return len(self._processes)
+
+    def wait_ready(self, timeout: float = None) -> int:
+        """Warte, bis alle Worker ihre Engine geladen haben (oder gescheitert sind)"""
+        with self._ready:
+            self._ready.wait_for(lambda: self._ready_count + len(self._failed) >= self.size, timeout)
+            if self._ready_count == 0 and self._failed:
+                raise RuntimeError(f"All OCR workers failed to start: {next(iter(self._failed.values()))}")
+            return self._ready_count
+
+    # --- Collector ---------------------------------------------------------------
+
+    def _collect(self):
+        """Verteilt Worker-Nachrichten auf die Requests und überwacht die Prozesse"""
+        last_check = time.time()
+        while not self._closed.is_set():
+            if time.time() - last_check >= WORKER_CHECK_INTERVAL:
+                self._check_workers()
+                last_check = time.time()
+
+            try:
+                message = self._results.get(timeout=WORKER_CHECK_INTERVAL)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+
+            kind, worker_id = message[0], message[1]
+
+            with self._lock:
+                if kind == 'ready':
+                    self.info[worker_id] = message[2]
+                    self._ready_count += 1
+                    self._ready.notify_all()
+                elif kind == 'failed':
+                    print(f"[ERROR] OCR worker {worker_id} ({self.devices[worker_id]}): {message[2]}")
+                    self._failed[worker_id] = message[2]
+                    self._ready.notify_all()
+                elif kind == 'result':
+                    _, _, task_id, index, data, error, attempts = message
+                    task = self._inflight.get(task_id)
+                    if task is not None and index in task.pending:
+                        task.pending.discard(index)
+                        task.request.results.put((index, data if error is None else _worker_error(error, attempts)))
+                elif kind == 'chunk_error':
+                    task = self._inflight.get(message[2])
+                    if task is not None:
+                        self._fail_task(task, message[3])
+                elif kind == 'done':
+                    self._assigned[worker_id].discard(message[2])
+                    task = self._inflight.pop(message[2], None)
+                    if task is not None:
+                        # Seiten ohne Ergebnis (sollte nicht vorkommen) nicht verschlucken
+                        self._fail_task(task, "Worker returned no result for this page")
+                        self._slots.release()
+
+    def _fail_task(self, task, error):
+        for index in sorted(task.pending):
+            task.request.results.put((index, RuntimeError(error)))
+        task.pending.clear()
+
+    def _pick_worker(self) -> int:
+        """Lebender, nicht gescheiterter Worker mit den wenigsten offenen Chunks (Lock halten)"""
+        candidates = [worker_id for worker_id in self._alive if worker_id not in self._failed]
+        if not candidates:
+            raise RuntimeError("No OCR workers left")
+        return min(candidates, key=lambda worker_id: (len(self._assigned[worker_id]), worker_id))
+
+    def _send(self, task):
+        """Chunk in die Queue eines Workers legen (Lock halten)"""
+        worker_id = self._pick_worker()
+        self._assigned[worker_id].add(task.task_id)
+        self._tasks[worker_id].put((task.task_id, task.items, task.settings))
+
+    def _check_workers(self):
+        """Abgestürzte Worker erkennen, deren Chunks neu einplanen"""
+        with self._lock:
+            for worker_id in list(self._alive):
+                if self._processes[worker_id].is_alive():
+                    continue
+                self._alive.discard(worker_id)
+                if worker_id not in self._failed:
+                    exitcode = self._processes[worker_id].exitcode
+                    self._failed[worker_id] = f"exited with code {exitcode}"
+                    print(f"[ERROR] OCR worker {worker_id} ({self.devices[worker_id]}) exited with code {exitcode}")
+                    self._ready.notify_all()
+
+                # Alle Chunks des Workers: der laufende und die noch in seiner Queue
+                for task_id in sorted(self._assigned[worker_id]):
+                    task = self._inflight.get(task_id)
+                    if task is None:
+                        continue
+                    if not task.pending:
+                        del self._inflight[task_id]
+                        self._slots.release()
+                        continue
+
+                    try:
+                        if task.requeued >= MAX_REQUEUE:
+                            raise RuntimeError(f"OCR worker {worker_id} ({self.devices[worker_id]}) died")
+                        task.requeued += 1
+                        task.items = [item for item in task.items if item[0] in task.pending]
+                        self._send(task)
+                        print(f"[WARNING] Requeueing {len(task.items)} pages of OCR worker {worker_id}")
+                    except RuntimeError as e:
+                        self._fail_task(task, str(e))
+                        del self._inflight[task_id]
+                        self._slots.release()
+                self._assigned[worker_id].clear()
+
+            if not self._alive:
+                # Keine Worker mehr: alles, was noch unterwegs ist, als Fehler melden
+                for task in self._inflight.values():
+                    self._fail_task(task, "No OCR workers left")
+                    self._slots.release()
+                self._inflight.clear()
+
+    # --- Requests -----------------------------------------------------------------
+
+    def _submit(self, request, items, settings):
+        """Chunk einplanen, blockiert solange zu viele Chunks unterwegs sind"""
+        while not self._slots.acquire(timeout=0.5):
+            if request.cancelled.is_set() or self._closed.is_set():
+                return False
+
+        with self._lock:
+            task = _Task(next(self._task_ids), request, items, settings)
+            try:
+                self._send(task)
+            except RuntimeError:
+                self._slots.release()
+                raise
+            self._inflight[task.task_id] = task
+        return True
+
+    def run(self, images, batch_size: int = 1, names=None, **settings):
+        """
+        OCR für mehrere Seiten über alle Worker
+
+        Yields:
+            (index, dict) oder (index, Exception), in Eingabe-Reihenfolge
+        """
+        request = _Request()
+        settings = dict(settings, batch_size=batch_size)
+        chunk_size = max(batch_size * self.chunk_factor, 1)
+        end = object()
+
+        def feed():
+            count = 0
+            try:
+                chunk = []
+                for index, image in enumerate(images):
+                    chunk.append((index, image, names[index] if names else None))
+                    count += 1
+                    if len(chunk) >= chunk_size:
+                        if not self._submit(request, chunk, settings):
+                            return
+                        chunk = []
+                if chunk and not self._submit(request, chunk, settings):
+                    return
+            except Exception as e:
+                # Fehler in der Bildquelle (z.B. Rendering) an den Consumer weiterreichen
+                request.results.put((None, e))
+            request.results.put((end, count))
+
+        feeder = threading.Thread(target=feed, name="ocr-dispatch-feeder", daemon=True)
+        feeder.start()
+
+        buffered = {}
+        next_index = 0
+        total = None
+        try:
+            while total is None or next_index < total:
+                index, result = request.results.get()
+                if index is None:
+                    raise result
+                if index is end:
+                    total = result
+                else:
+                    buffered[index] = result
+
+                while next_index in buffered:
+                    yield next_index, buffered.pop(next_index)
+                    next_index += 1
+        finally:
+            request.cancelled.set()
+
+    def close(self):
+        """Worker beenden"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self._collector.join(timeout=2)
+
+
+def _worker_error(message, attempts):
+    error = RuntimeError(message)
+    if attempts:
+        error.attempts = attempts
+    return error
+
+
+class DispatchEngine:
+    """OcrEngine-kompatible Schnittstelle über einen WorkerPool"""
+
+    def __init__(self, pool: WorkerPool):
+        self.pool = pool
+
+    @classmethod
+    def start(cls, devices, options: dict = None) -> "DispatchEngine":
+        """Worker starten und warten, bis die Engines geladen sind"""
+        pool = WorkerPool(devices, options)
+        print(f"Starting {pool.size} OCR workers: {', '.join(pool.devices)}")
+        try:
+            ready = pool.wait_ready()
+        except Exception:
+            pool.close()
+            raise
+        print(f"[OK] {ready}/{pool.size} OCR workers ready\n")
+        return cls(pool)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        self.pool.close()
+
+    @property
+    def revision(self):
+        revisions = {info.get('revision') for info in self.pool.info.values()}
+        return revisions.pop() if len(revisions) == 1 else None
+
+    def ocr(self, image, base_size: int = 640, image_size: int = 640, crop_mode: bool = True,
+            prompt: str = None, name=None, mode=None):
+        """Wie OcrEngine.ocr(), läuft auf dem nächsten freien Worker"""
+        for _, result in self.ocr_many([image], base_size=base_size, image_size=image_size, crop_mode=crop_mode,
+                                       prompt=prompt, names=[name], mode=mode):
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+    def ocr_many(self, images, batch_size: int = 1, base_size: int = 640, image_size: int = 640,
+                 crop_mode: bool = True, prompt: str = None, names=None, prefetch: int = 0, mode=None):
+        """
+        Wie OcrEngine.ocr_many(), verteilt auf alle Worker
+
+        prefetch wird ignoriert: die Worker bereiten ihre Chunks selbst vor,
+        während andere Worker rechnen.
+        """
+        results = self.pool.run(images, batch_size=batch_size, names=names, base_size=base_size,
+                                image_size=image_size, crop_mode=crop_mode, prompt=prompt or DEFAULT_PROMPT, mode=mode)
+        for index, result in results:
+            yield index, result if isinstance(result, Exception) else PageResult.from_dict(result)
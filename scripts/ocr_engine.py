@@ -0,0 +1,1193 @@
+#!/usr/bin/env python3
+"""
+DeepSeek-OCR Engine
+===================
+Gemeinsame In-Process OCR-Engine für alle test_ocr_*.py Skripte
+
+Features:
+- Lädt Tokenizer + Modell einmal
+- Bereitet Bilder (Pfad oder PIL-Image) im Speicher vor
+- Ruft model.generate() direkt auf und liefert den Text zurück
+- Kein result.mmd / temp-Verzeichnis pro Seite (optional weiterhin möglich)
+- Token-Zählung und Timings pro Seite
+- Batch-Inferenz: Seiten mit gleichem Modus und Crop-Raster werden gemeinsam generiert
+- Prefetch: nächste Seiten werden im Hintergrund dekodiert, während die GPU rechnet
+- JPEGs werden nur so groß dekodiert, wie der Modus braucht (image_loader.py)
+- Repetition-Detector: Schleifen werden während der Generierung abgebrochen
+  (status "truncated_repetition", Teiltext bleibt erhalten)
+- Budgets pro Seite (Sekunden, Tokens) mit Retry über eine Modus-Leiter
+  (z.B. gundam → base → small), jeder Versuch wird im Ergebnis protokolliert
+- Modus pro Seite: fest (tiny, small, base, large, gundam) oder "auto"
+  (billigster passender Modus anhand von Bild-Statistiken, siehe mode_select.py)
+- Optionaler Ergebnis-Cache (result_cache.py): gleiche Seite + gleiche Einstellungen
+  werden nicht erneut gerechnet
+- CPU-Backend (cpu_backend.py): device="cpu" mit optionaler int8-Quantisierung
+- VRAM-Budget (vram_budget.py): Batches werden nach geschätztem Speicherbedarf
+  geschnitten, zu große Seiten vorab kleiner gerechnet, nach OOM wird der
+  Speicher freigegeben und die Seite in einem kleineren Modus wiederholt
+- Optionaler Vision-Cache (vision_cache.py): mehrere Prompts auf derselben Seite
+  brauchen nur einen Vision-Encoder-Durchlauf
+- Optional werden Farbkarten, Graukeile und Lineale vor der OCR abgeschnitten
+  (crop_targets=True, siehe calibration_targets.py)
+- Optional werden leere Seiten ohne Inferenz mit "[EMPTY PAGE - FILTERED]"
+  beantwortet (skip_blank=True, siehe blank_page.py)
+
+Usage:
+    from ocr_engine import OcrEngine
+
+    engine = OcrEngine.load()
+    result = engine.ocr("data/anno/annoshow.jpg", base_size=1024)
+    print(result.text, result.time_seconds)
+
+    for index, result in engine.ocr_many(image_paths, batch_size=4):
+        ...
+"""
+
+import contextlib
+import gc
+import math
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+import torch
+from PIL import Image, ImageOps
+from torchvision import transforms
+from transformers import MaxTimeCriteria, StoppingCriteriaList
+
+from blank_page import ANALYSIS_SIZE as BLANK_ANALYSIS_SIZE, classify_page
+from calibration_targets import TARGETS_INFO, crop_box, crop_targets
+from cpu_backend import configure_threads, cuda_calls_to_cpu, quantize_int8
+from filter_artifacts import EMPTY_PAGE
+from image_loader import load_image, read_size, source_size
+from mode_select import select_mode
+from model_store import find_prepared, load_prepared
+from ocr_types import (BATCH_WINDOW_FACTOR, DEFAULT_PROMPT, MODES, PageBudget, PageResult,
+                       mode_name, parse_ladder)
+from repetition import RepetitionConfig, RepetitionDetector
+from result_cache import IN_FLIGHT
+from vram_budget import (DEFAULT_HEADROOM, GB, OOM_LADDER, MemoryBudget, estimate_page_bytes,
+                         is_oom_error, kv_bytes_per_token)
+
+MODEL_NAME = "deepseek-ai/DeepSeek-OCR"
+
+# Konstanten aus modeling_deepseekocr.py (model.infer)
+IMAGE_TOKEN = "<image>"
+IMAGE_TOKEN_ID = 128815
+BOS_ID = 0
+STOP_STR = "<｜end▁of▁sentence｜>"
+PATCH_SIZE = 16
+DOWNSAMPLE_RATIO = 4
+MIN_CROPS = 2
+MAX_CROPS = 9
+MAX_NEW_TOKENS = 8192
+NO_REPEAT_NGRAM_SIZE = 20
+# Grounding-Ausgabe (<|grounding|>-Prompts): <|ref|>Label<|/ref|><|det|>[[Box]]<|/det|>
+GROUNDING_PATTERN = re.compile(r'(<\|ref\|>(.*?)<\|/ref\|><\|det\|>(.*?)<\|/det\|>)', re.DOTALL)
+
+# Status, bei denen eine Seite im nächsten Modus der Leiter wiederholt wird
+RETRY_STATUSES = ('timeout', 'token_budget')
+
+ImageInput = Union[str, Path, Image.Image]
+
+
+def load_model(model_name: str = MODEL_NAME, device: str = "cuda", dtype=torch.bfloat16):
+    """
+    Lade DeepSeek-OCR Modell
+
+    Gibt es ein vorbereitetes Verzeichnis (model_store.py prepare), wird offline
+    und direkt auf das Device geladen, sonst über den Hub.
+    """
+    from transformers import AutoModel, AutoTokenizer
+
+    prepared = find_prepared(model_name)
+
+    print("="*60)
+    print(f"LOADING MODEL{f' (prepared: {prepared})' if prepared else ''}")
+    print("="*60)
+
+    if prepared:
+        tokenizer, model, timings = load_prepared(prepared, device=device, dtype=dtype)
+        print(f"[OK] Model loaded to {device.upper()} in {timings['total']:.1f}s\n")
+        return tokenizer, model
+
+    start_time = time.time()
+    tokenizer = AutoTokenizer.from_pretrained(
+        model_name,
+        trust_remote_code=True
+    )
+    print(f"[OK] Tokenizer loaded ({time.time() - start_time:.1f}s)")
+
+    step = time.time()
+    model = AutoModel.from_pretrained(
+        model_name,
+        trust_remote_code=True,
+        use_safetensors=True,
+        torch_dtype=dtype
+    )
+    model = model.eval().to(device).to(dtype)
+    print(f"[OK] Model loaded to {device.upper()} ({time.time() - step:.1f}s, total {time.time() - start_time:.1f}s)")
+    print("     Tip: python scripts/model_store.py prepare → offline, faster startup\n")
+
+    return tokenizer, model
+
+
+def find_closest_aspect_ratio(aspect_ratio, target_ratios, width, height, image_size):
+    """Wähle das Crop-Raster, das dem Seitenverhältnis am nächsten kommt (wie im Modell-Code)"""
+    best_ratio_diff = float('inf')
+    best_ratio = (1, 1)
+    area = width * height
+
+    for ratio in target_ratios:
+        target_aspect_ratio = ratio[0] / ratio[1]
+        ratio_diff = abs(aspect_ratio - target_aspect_ratio)
+        if ratio_diff < best_ratio_diff:
+            best_ratio_diff = ratio_diff
+            best_ratio = ratio
+        elif ratio_diff == best_ratio_diff:
+            if area > 0.5 * image_size * image_size * ratio[0] * ratio[1]:
+                best_ratio = ratio
+
+    return best_ratio
+
+
+def crop_grid(width: int, height: int, image_size: int = 640, crop_mode: bool = True) -> Tuple[int, int]:
+    """
+    Berechne das Crop-Raster (Spalten, Zeilen) für eine Bildgröße
+
+    Entspricht dynamic_preprocess() aus dem Modell-Code, ohne Pixel anzufassen.
+    """
+    if not crop_mode or (width <= 640 and height <= 640):
+        return (1, 1)
+
+    target_ratios = sorted(
+        {(i, j)
+         for n in range(MIN_CROPS, MAX_CROPS + 1)
+         for i in range(1, n + 1)
+         for j in range(1, n + 1)
+         if MIN_CROPS <= i * j <= MAX_CROPS},
+        key=lambda x: x[0] * x[1]
+    )
+
+    return find_closest_aspect_ratio(width / height, target_ratios, width, height, image_size)
+
+
+def strip_grounding(text: str) -> str:
+    """
+    Nachbearbeitung wie model.infer() vor dem Schreiben von result.mmd
+
+    Bild-Referenzen werden zu Markdown-Bildlinks (images/<n>.jpg, die Ausschnitte
+    schreibt nur der Artefakt-Pfad), alle anderen Grounding-Tags entfallen.
+    """
+    image_index = 0
+    for match, label, _ in GROUNDING_PATTERN.findall(text):
+        if label == 'image':
+            text = text.replace(match, f'![](images/{image_index}.jpg)\n')
+            image_index += 1
+        else:
+            text = text.replace(match, '').replace('\\coloneqq', ':=').replace('\\eqqcolon', '=:')
+    return text
+
+
+def decode_size(width: int, height: int, base_size: int = 640, image_size: int = 640,
+                crop_mode: bool = True) -> Tuple[int, int]:
+    """
+    Mindestgröße (Breite, Höhe), in der ein Bild dekodiert werden muss, damit
+    prepare() nicht hochskaliert: globale Ansicht (längere Seite → base_size bzw.
+    image_size) und Crop-Raster (Spalten x Zeilen Tiles à image_size)
+    """
+    if crop_mode:
+        fit = base_size / max(width, height)
+        cols, rows = crop_grid(width, height, image_size, crop_mode=True)
+        if cols * rows > 1:
+            return (max(math.ceil(width * fit), cols * image_size), max(math.ceil(height * fit), rows * image_size))
+        return (math.ceil(width * fit), math.ceil(height * fit))
+
+    if image_size <= 640:
+        # prepare() zieht das Bild auf image_size x image_size
+        return (image_size, image_size)
+
+    fit = image_size / max(width, height)
+    return (math.ceil(width * fit), math.ceil(height * fit))
+
+
+def split_crops(image: Image.Image, grid: Tuple[int, int], image_size: int) -> List[Image.Image]:
+    """Zerlege ein Bild in grid[0] x grid[1] Tiles der Größe image_size"""
+    cols, rows = grid
+    resized = image.resize((image_size * cols, image_size * rows))
+
+    crops = []
+    for i in range(cols * rows):
+        x, y = (i % cols) * image_size, (i // cols) * image_size
+        crops.append(resized.crop((x, y, x + image_size, y + image_size)))
+
+    return crops
+
+
+class OcrEngine:
+    """
+    In-Process DeepSeek-OCR Engine
+
+    Ersetzt model.infer(..., save_results=True) + Lesen von result.mmd.
+    Die Vorverarbeitung entspricht model.infer(), der Text wird direkt
+    aus den generierten Token-IDs dekodiert.
+    """
+
+    def __init__(self, tokenizer, model, device: str = "cuda", dtype=torch.bfloat16,
+                 artifacts_dir: Optional[str] = None,
+                 repetition: Optional[RepetitionConfig] = RepetitionConfig(),
+                 budget: Optional[PageBudget] = None, ladder: Optional[List[str]] = None,
+                 cache=None, revision: Optional[str] = None, vram_budget: Optional[float] = None,
+                 vision_cache=None, crop_targets: bool = False, skip_blank: bool = False):
+        """
+        Args:
+            tokenizer: DeepSeek Tokenizer
+            model: DeepSeek Model (bereits auf device)
+            device: Torch-Device ("cuda", "cuda:1", ...)
+            dtype: Rechen-Datentyp für Bild-Tensoren
+            artifacts_dir: Falls gesetzt, werden Debug-Artefakte (result.mmd,
+                Bounding-Box-Bilder) wie bisher über model.infer() geschrieben
+            repetition: Schwellwerte für den Repetition-Detector (None = aus)
+            budget: Zeit-/Token-Budget pro Seite (bzw. pro Batch)
+            ladder: Modi, in denen eine Seite nach Fehler, OOM oder
+                Budget-Überschreitung nacheinander wiederholt wird
+            cache: Optional ResultCache (nicht zusammen mit artifacts_dir)
+            revision: Modell-Revision für den Cache-Key (Default: Commit-Hash aus der Config)
+            vram_budget: Speicher für Aktivierungen in GB (None = freier GPU-Speicher
+                nach dem Laden, 0 = keine Zulassungskontrolle)
+            vision_cache: Optional VisionCache, Encoder-Ausgaben pro Bild und Modus
+                werden über Prompts hinweg wiederverwendet
+            crop_targets: Kalibrier-Targets (Farbkarte, Graukeil, Lineal) vor der
+                OCR abschneiden, Fundstellen in PageResult.targets
+            skip_blank: Seiten vorab klassifizieren (PageResult.page_class), leere
+                Seiten ohne Inferenz als EMPTY_PAGE zurückgeben
+        """
+        self.tokenizer = tokenizer
+        self.model = model
+        self.device = device
+        self.dtype = dtype
+        self.artifacts_dir = artifacts_dir
+        self.repetition = repetition
+        self.budget = budget or PageBudget()
+        self.ladder = ladder or []
+        self.cache = cache if not artifacts_dir else None
+        self.crop_targets = crop_targets
+        self.skip_blank = skip_blank
+
+        config = getattr(model, 'config', None)
+        self.revision = (revision or getattr(config, '_commit_hash', None)
+                         or getattr(config, '_name_or_path', None) or MODEL_NAME)
+
+        self.kv_bytes_per_token = kv_bytes_per_token(config, dtype_bytes=torch.finfo(dtype).bits // 8)
+        self.memory = MemoryBudget(self._memory_limit(vram_budget))
+
+        self.vision_cache = vision_cache if not artifacts_dir else None
+        if self.vision_cache and not self.vision_cache.attach(model):
+            print("[WARNING] Vision cache: no sam_model/vision_model modules found, disabled")
+            self.vision_cache = None
+
+        self.image_transform = transforms.Compose([
+            transforms.ToTensor(),
+            transforms.Normalize(mean=(0.5, 0.5, 0.5), std=(0.5, 0.5, 0.5)),
+        ])
+        self.pad_color = (127, 127, 127)
+
+    @classmethod
+    def load(cls, model_name: str = MODEL_NAME, device: str = "cuda", quantize: bool = False,
+             threads: Optional[int] = None, cores: Optional[List[int]] = None, **kwargs) -> "OcrEngine":
+        """
+        Lade Modell und erzeuge Engine
+
+        Args:
+            device: "cuda", "cuda:1", ... oder "cpu" (float32)
+            quantize: Dynamische int8-Quantisierung der Linear-Layer (nur CPU)
+            threads: Intra-Op-Threads auf der CPU (Default: alle erlaubten Kerne)
+            cores: CPU-Kerne, auf die der Prozess gepinnt wird
+        """
+        on_cpu = torch.device(device).type == 'cpu'
+        if quantize and not on_cpu:
+            raise ValueError("int8 quantization is only available on the CPU backend (--device cpu)")
+
+        dtype = kwargs.pop('dtype', torch.float32 if on_cpu else torch.bfloat16)
+        if on_cpu:
+            threads = configure_threads(threads, cores)
+            print(f"CPU backend: {threads} threads, {'int8' if quantize else str(dtype).replace('torch.', '')}\n")
+
+        tokenizer, model = load_model(model_name, device=device, dtype=dtype)
+        if quantize:
+            model = quantize_int8(model)
+        engine = cls(tokenizer, model, device=device, dtype=dtype, **kwargs)
+        print(f"VRAM budget: {engine.memory.describe()}\n")
+        return engine
+
+    @property
+    def device_type(self) -> str:
+        return torch.device(self.device).type
+
+    def _memory_limit(self, vram_budget: Optional[float]) -> Optional[int]:
+        """Budget in Bytes: explizit, sonst freier GPU-Speicher (Gewichte sind schon geladen)"""
+        if vram_budget is not None:
+            return int(vram_budget * GB) if vram_budget > 0 else None
+        if self.device_type != 'cuda':
+            return None
+        free, _ = torch.cuda.mem_get_info(torch.device(self.device))
+        return int(free * DEFAULT_HEADROOM)
+
+    def _to_tensor(self, image: Image.Image) -> torch.Tensor:
+        return self.image_transform(image).to(self.dtype)
+
+    def prepare(self, image: Image.Image, prompt: str = DEFAULT_PROMPT, base_size: int = 640,
+                image_size: int = 640, crop_mode: bool = True) -> dict:
+        """
+        Bereite Prompt-Tokens und Bild-Tensoren vor (wie model.infer)
+
+        Returns:
+            dict mit input_ids, images_seq_mask, images_ori, images_crop,
+            images_spatial_crop, crop_ratio und den verwendeten Einstellungen
+        """
+        text_splits = prompt.split(IMAGE_TOKEN)
+        if len(text_splits) != 2:
+            raise ValueError(f"Prompt must contain exactly one {IMAGE_TOKEN} token")
+
+        tokenized = self.tokenizer.encode(text_splits[0], add_special_tokens=False)
+        seq_mask = [False] * len(tokenized)
+
+        if crop_mode:
+            # Raster aus der Originalgröße, auch wenn reduziert dekodiert wurde
+            grid = crop_grid(*source_size(image), image_size, crop_mode=True)
+            global_view = ImageOps.pad(image, (base_size, base_size), color=self.pad_color)
+            images_ori = self._to_tensor(global_view).unsqueeze(0)
+
+            num_queries = math.ceil((image_size // PATCH_SIZE) / DOWNSAMPLE_RATIO)
+            num_queries_base = math.ceil((base_size // PATCH_SIZE) / DOWNSAMPLE_RATIO)
+
+            image_tokens = ([IMAGE_TOKEN_ID] * num_queries_base + [IMAGE_TOKEN_ID]) * num_queries_base
+            image_tokens += [IMAGE_TOKEN_ID]
+
+            if grid[0] > 1 or grid[1] > 1:
+                crops = split_crops(image, grid, image_size)
+                images_crop = torch.stack([self._to_tensor(c) for c in crops], dim=0)
+                image_tokens += ([IMAGE_TOKEN_ID] * (num_queries * grid[0]) + [IMAGE_TOKEN_ID]) * (num_queries * grid[1])
+            else:
+                images_crop = torch.zeros((1, 3, base_size, base_size), dtype=self.dtype)
+        else:
+            grid = (1, 1)
+            if image_size <= 640:
+                image = image.resize((image_size, image_size))
+            global_view = ImageOps.pad(image, (image_size, image_size), color=self.pad_color)
+            images_ori = self._to_tensor(global_view).unsqueeze(0)
+            images_crop = torch.zeros((1, 3, base_size, base_size), dtype=self.dtype)
+
+            num_queries = math.ceil((image_size // PATCH_SIZE) / DOWNSAMPLE_RATIO)
+            image_tokens = ([IMAGE_TOKEN_ID] * num_queries + [IMAGE_TOKEN_ID]) * num_queries
+            image_tokens += [IMAGE_TOKEN_ID]
+
+        tokenized += image_tokens
+        seq_mask += [True] * len(image_tokens)
+
+        tail = self.tokenizer.encode(text_splits[1], add_special_tokens=False)
+        tokenized += tail
+        seq_mask += [False] * len(tail)
+
+        tokenized = [BOS_ID] + tokenized
+        seq_mask = [False] + seq_mask
+
+        return {
+            'input_ids': torch.LongTensor(tokenized),
+            'images_seq_mask': torch.tensor(seq_mask, dtype=torch.bool),
+            'images_ori': images_ori,
+            'images_crop': images_crop,
+            'images_spatial_crop': torch.tensor([list(grid)], dtype=torch.long),
+            'crop_ratio': tuple(grid),
+            'base_size': base_size,
+            'image_size': image_size,
+            'crop_mode': crop_mode,
+        }
+
+    def decode(self, token_ids) -> Tuple[str, int]:
+        """Dekodiere generierte Token bis EOS (Grounding-Tags entfernt), liefert (Text, Anzahl Tokens)"""
+        token_ids = token_ids.tolist()
+        eos_id = self.tokenizer.eos_token_id
+        if eos_id in token_ids:
+            token_ids = token_ids[:token_ids.index(eos_id)]
+
+        # Vorzeitig gestoppte Zeilen eines Batches werden mit Padding aufgefüllt
+        pad_id = self.tokenizer.pad_token_id
+        while token_ids and token_ids[-1] == pad_id:
+            token_ids.pop()
+
+        text = self.tokenizer.decode(token_ids, skip_special_tokens=False)
+        if text.endswith(STOP_STR):
+            text = text[:-len(STOP_STR)]
+
+        return strip_grounding(text.strip()), len(token_ids)
+
+    def generate(self, inputs: dict):
+        """Führe model.generate() für vorbereitete Inputs aus"""
+        return self.generate_batch([inputs])
+
+    def generate_batch(self, batch: List[dict]):
+        """
+        Führe model.generate() für mehrere Seiten gemeinsam aus
+
+        Alle Inputs müssen dieselbe Sequenzlänge haben (gleicher batch_key),
+        damit kein Padding nötig ist.
+
+        Returns:
+            (output_ids, stops) - stops: {Zeile: (status, Grund)} für Seiten ohne
+            regulären Abschluss (truncated_repetition, timeout, token_budget)
+        """
+        device = self.device
+        input_ids = torch.stack([inputs['input_ids'] for inputs in batch], dim=0)
+        images_seq_mask = torch.stack([inputs['images_seq_mask'] for inputs in batch], dim=0)
+        images = [self._image_tensors(inputs) for inputs in batch]
+        images_spatial_crop = torch.cat([inputs['images_spatial_crop'] for inputs in batch], dim=0)
+
+        prompt_len = input_ids.shape[1]
+        max_new_tokens = self.budget.max_tokens or MAX_NEW_TOKENS
+
+        stopping_criteria = StoppingCriteriaList()
+        detector = None
+        if self.repetition:
+            detector = RepetitionDetector(self.tokenizer, prompt_len, self.repetition,
+                                          stop_ids=[self.tokenizer.eos_token_id, self.tokenizer.pad_token_id])
+            stopping_criteria.append(detector)
+        if self.budget.max_seconds:
+            stopping_criteria.append(MaxTimeCriteria(self.budget.max_seconds))
+
+        start_time = time.time()
+
+        # CPU: float32 ohne Autocast, .cuda() im Modell-Code wird zum No-Op
+        on_cpu = self.device_type == 'cpu'
+        with cuda_calls_to_cpu() if on_cpu else contextlib.nullcontext(), \
+                torch.autocast(self.device_type, dtype=self.dtype, enabled=self.dtype != torch.float32):
+            with torch.no_grad():
+                output_ids = self.model.generate(
+                    input_ids.to(device),
+                    images=images,
+                    images_seq_mask=images_seq_mask.to(device),
+                    images_spatial_crop=images_spatial_crop,
+                    temperature=0.0,
+                    eos_token_id=self.tokenizer.eos_token_id,
+                    pad_token_id=self.tokenizer.pad_token_id or self.tokenizer.eos_token_id,
+                    max_new_tokens=max_new_tokens,
+                    no_repeat_ngram_size=NO_REPEAT_NGRAM_SIZE,
+                    stopping_criteria=stopping_criteria,
+                    use_cache=True
+                )
+
+        elapsed = time.time() - start_time
+
+        stops = {}
+        eos_id = self.tokenizer.eos_token_id
+
+        for row in range(len(batch)):
+            generated = output_ids[row, prompt_len:].tolist()
+            # EOS vor dem Abbruch hat Vorrang (Padding kann auch EOS sein)
+            eos_at = generated.index(eos_id) if eos_id in generated else None
+            if detector and row in detector.triggered and (eos_at is None or eos_at >= detector.stopped_at[row]):
+                stops[row] = ('truncated_repetition', detector.triggered[row])
+                continue
+            if eos_at is not None:
+                continue
+            if len(generated) >= max_new_tokens:
+                stops[row] = ('token_budget', f"max_tokens={max_new_tokens}")
+            elif self.budget.max_seconds and elapsed >= self.budget.max_seconds:
+                stops[row] = ('timeout', f"max_seconds={self.budget.max_seconds:g}")
+
+        return output_ids, stops
+
+    def _image_tensors(self, inputs: dict):
+        """(images_crop, images_ori) auf dem Device, über den Vision-Cache falls aktiv"""
+        if self.vision_cache and inputs.get('vision_key'):
+            return self.vision_cache.tensors(inputs['vision_key'], inputs, self.device)
+        return inputs['images_crop'].to(self.device), inputs['images_ori'].to(self.device)
+
+    def _vision_key(self, image: ImageInput, inputs: dict) -> Optional[str]:
+        if not self.vision_cache:
+            return None
+        return self.vision_cache.key(image, inputs['base_size'], inputs['image_size'], inputs['crop_mode'])
+
+    @staticmethod
+    def batch_key(inputs: dict, prompt: str) -> tuple:
+        """Seiten mit gleichem Key haben identische Token-Layouts und lassen sich batchen"""
+        return (prompt, inputs['base_size'], inputs['image_size'], inputs['crop_mode'], inputs['crop_ratio'])
+
+    @staticmethod
+    def min_size(width: int, height: int, mode: Optional[str] = None, base_size: int = 640,
+                 image_size: int = 640, crop_mode: bool = True) -> Tuple[int, int]:
+        """decode_size() für einen Modus; bei "auto" groß genug für jeden Modus"""
+        if mode == 'auto':
+            candidates = list(MODES.values())
+        elif mode in MODES:
+            candidates = [MODES[mode]]
+        else:
+            candidates = [dict(base_size=base_size, image_size=image_size, crop_mode=crop_mode)]
+
+        sizes = [decode_size(width, height, **settings) for settings in candidates]
+        return (max(w for w, _ in sizes), max(h for _, h in sizes))
+
+    @staticmethod
+    def open_image(image: ImageInput, mode: Optional[str] = None, base_size: int = 640, image_size: int = 640,
+                   crop_mode: bool = True, min_side: int = 0) -> Image.Image:
+        """
+        Dekodiere eine Seite nur so groß, wie die Vorverarbeitung sie braucht
+
+        Die Größe kommt aus dem Datei-Header; bei "auto" reicht sie für jeden Modus.
+        min_side: Breite und Höhe mindestens so groß (z.B. für die Leer-Erkennung)
+        """
+        if isinstance(image, Image.Image):
+            return load_image(image)
+
+        width, height = OcrEngine.min_size(*read_size(image), mode, base_size, image_size, crop_mode)
+        return load_image(image, (max(width, min_side), max(height, min_side)))
+
+    def open_page(self, image: ImageInput, mode: Optional[str] = None, base_size: int = 640,
+                  image_size: int = 640, crop_mode: bool = True) -> Tuple[Image.Image, Optional[dict]]:
+        """
+        open_image() plus optionaler Zuschnitt der Kalibrier-Targets
+
+        Die Draft-Größe ist für die ganze Seite berechnet; braucht der Ausschnitt
+        mehr Pixel, wird die Datei in der dafür nötigen Skalierung neu dekodiert.
+
+        Returns:
+            (Bild, Targets-Info oder None)
+        """
+        pil_image = self.open_image(image, mode, base_size, image_size, crop_mode,
+                                    min_side=BLANK_ANALYSIS_SIZE if self.skip_blank else 0)
+        if not self.crop_targets:
+            return pil_image, None
+
+        cropped, targets = crop_targets(pil_image)
+        if targets and not isinstance(image, Image.Image) and cropped.size != source_size(cropped):
+            box_width, box_height = source_size(cropped)
+            need = self.min_size(box_width, box_height, mode, base_size, image_size, crop_mode)
+            if cropped.size[0] < need[0] or cropped.size[1] < need[1]:
+                scale = max(need[0] / box_width, need[1] / box_height)
+                width, height = source_size(pil_image)
+                full = load_image(image, (math.ceil(width * scale), math.ceil(height * scale)))
+                cropped = crop_box(full, targets['crop_box'])
+                cropped.info[TARGETS_INFO] = targets
+        return cropped, targets
+
+    @staticmethod
+    def resolve_mode(pil_image: Image.Image, mode: Optional[str], base_size: int, image_size: int,
+                     crop_mode: bool) -> Tuple[dict, Optional[dict]]:
+        """
+        Einstellungen für eine Seite
+
+        Args:
+            mode: None (base_size/image_size/crop_mode verwenden), Name aus MODES oder "auto"
+
+        Returns:
+            (dict mit base_size, image_size, crop_mode; Bild-Statistiken bei "auto")
+        """
+        if mode is None:
+            return dict(base_size=base_size, image_size=image_size, crop_mode=crop_mode), None
+        if mode == 'auto':
+            mode, stats = select_mode(pil_image)
+            return dict(MODES[mode]), stats
+        if mode in MODES:
+            return dict(MODES[mode]), None
+
+        raise ValueError(f"Unknown mode {mode!r}, choose from auto, {', '.join(MODES)}")
+
+    def estimate(self, inputs: dict) -> int:
+        """Geschätzter Speicherbedarf einer vorbereiteten Seite in Bytes"""
+        seq_len = inputs['input_ids'].shape[0] + (self.budget.max_tokens or MAX_NEW_TOKENS)
+        return estimate_page_bytes(inputs['base_size'], inputs['image_size'], inputs['crop_mode'],
+                                   inputs['crop_ratio'], seq_len, self.kv_bytes_per_token,
+                                   dtype_bytes=torch.finfo(self.dtype).bits // 8)
+
+    def _admit(self, pil_image: Image.Image, inputs: dict, prompt: str) -> dict:
+        """
+        Zulassung einer Seite: passt sie allein nicht ins VRAM-Budget, wird sie
+        im nächstkleineren passenden Modus vorbereitet (Eintrag in inputs['admission'])
+        """
+        inputs['memory_estimate'] = self.estimate(inputs)
+        if self.memory.fits(inputs['memory_estimate']):
+            return inputs
+
+        current = mode_name(inputs['base_size'], inputs['image_size'], inputs['crop_mode'])
+        admission = {'mode': current, 'status': 'over_memory_budget',
+                     'estimate_gb': round(self.memory.cost([inputs['memory_estimate']]) / GB, 2)}
+
+        candidate = inputs
+        for mode in self.memory_fallbacks(inputs['base_size'], inputs['image_size'], inputs['crop_mode']):
+            candidate = self.prepare(pil_image, prompt, **MODES[mode])
+            candidate['memory_estimate'] = self.estimate(candidate)
+            if self.memory.fits(candidate['memory_estimate']):
+                break
+
+        new_mode = mode_name(candidate['base_size'], candidate['image_size'], candidate['crop_mode'])
+        print(f"[MEMORY] Page needs ~{admission['estimate_gb']} GB in mode {current}, "
+              f"budget {self.memory.describe()}, using mode {new_mode}")
+        candidate['admission'] = admission
+        return candidate
+
+    def memory_fallbacks(self, base_size: int, image_size: int, crop_mode: bool) -> List[str]:
+        """Kleinere Modi nach OOM/Budget: Leiter unterhalb des Modus, sonst OOM_LADDER"""
+        modes = self.retry_modes(base_size, image_size, crop_mode)
+        if modes:
+            return modes
+
+        current = mode_name(base_size, image_size, crop_mode)
+        if current in OOM_LADDER:
+            return list(OOM_LADDER[OOM_LADDER.index(current) + 1:])
+        return list(OOM_LADDER)
+
+    def ocr(self, image: ImageInput, base_size: int = 640, image_size: int = 640,
+            crop_mode: bool = True, prompt: str = DEFAULT_PROMPT, name: Optional[str] = None,
+            mode: Optional[str] = None) -> PageResult:
+        """
+        Führt OCR auf einem Bild durch
+
+        Args:
+            image: Pfad zum Bild oder PIL-Image
+            base_size: Base size for vision encoder
+            image_size: Image size for local crops
+            crop_mode: Enable multi-crop processing
+            prompt: OCR prompt
+            name: Name für Debug-Artefakte (Default: Dateiname)
+            mode: Fester Modus oder "auto", überschreibt base_size/image_size/crop_mode
+
+        Returns:
+            PageResult (bei Retry über die Modus-Leiter mit attempts)
+        """
+        settings = dict(base_size=base_size, image_size=image_size, crop_mode=crop_mode)
+
+        if not self.cache:
+            return self._ocr_with_retry(image, prompt, name, mode, **settings)
+
+        start_time = time.time()
+        key = self.cache_key(image, prompt, mode, **settings)
+        cached = self._cached_result(key, start_time)
+        if cached:
+            return cached
+
+        result = None
+        try:
+            result = self._ocr_with_retry(image, prompt, name, mode, **settings)
+        finally:
+            self._store(key, result)
+
+        return result
+
+    def cache_key(self, image: ImageInput, prompt: str, mode: Optional[str], base_size: int,
+                  image_size: int, crop_mode: bool) -> str:
+        preprocess = [name for name, enabled in (('crop_targets', self.crop_targets),
+                                                 ('skip_blank', self.skip_blank)) if enabled]
+        return self.cache.key(image, base_size, image_size, crop_mode, prompt, mode=mode, revision=self.revision,
+                              preprocess='+'.join(preprocess) or None)
+
+    def _cached_result(self, key: str, start_time: float, wait: bool = True):
+        """
+        Treffer als PageResult (time_seconds = Lookup-Zeit), sonst None und der Key
+        ist beansprucht; bei wait=False ggf. IN_FLIGHT (Key gehört einem anderen Thread)
+        """
+        data = self.cache.lookup(key, wait=wait)
+        if data is None or data is IN_FLIGHT:
+            return data
+
+        result = PageResult.from_dict(data)
+        result.cached = True
+        result.time_seconds = time.time() - start_time
+        return result
+
+    def _store(self, key: str, result):
+        """
+        Vollständige Ergebnisse speichern, sonst den Key freigeben
+
+        Ergebnisse mit attempts (Retry-Leiter, nach OOM oder vorab verkleinert) liefen
+        in einem anderen Modus als angefragt und werden nicht unter diesem Key gespeichert.
+        """
+        if isinstance(result, PageResult) and result.status == "ok" and not result.attempts:
+            self.cache.put(key, result.to_dict())
+        else:
+            self.cache.release(key)
+
+    def _release_claim(self, prepared):
+        """Cache-Key einer vorbereiteten, aber nicht gerechneten Seite freigeben"""
+        if self.cache and isinstance(prepared, tuple) and len(prepared) == 4 and prepared[2].get('cache_key'):
+            self.cache.release(prepared[2]['cache_key'])
+
+    def _ocr_with_retry(self, image, prompt, name, mode, base_size, image_size, crop_mode) -> PageResult:
+        settings = dict(base_size=base_size, image_size=image_size, crop_mode=crop_mode)
+
+        try:
+            result = self._ocr_once(image, prompt=prompt, name=name, mode=mode, **settings)
+        except Exception as e:
+            if not self.needs_retry(e):
+                raise
+            result = e
+
+        if self.needs_retry(result):
+            if isinstance(result, PageResult):
+                settings = dict(base_size=result.base_size, image_size=result.image_size,
+                                crop_mode=result.crop_mode)
+            result = self._retry(image, result, prompt=prompt, name=name, **settings)
+
+        if isinstance(result, Exception):
+            raise result
+
+        return result
+
+    def _ocr_once(self, image: ImageInput, base_size: int, image_size: int, crop_mode: bool,
+                  prompt: str, name: Optional[str] = None, mode: Optional[str] = None) -> PageResult:
+        """Ein OCR-Versuch in genau einem Modus"""
+        start_time = time.time()
+
+        pil_image, targets = self.open_page(image, mode, base_size, image_size, crop_mode)
+        page_class, page_stats = self.classify(pil_image)
+        if page_class == 'blank':
+            return self._blank_result(pil_image, base_size, image_size, crop_mode, time.time() - start_time,
+                                      targets=targets, page_stats=page_stats)
+
+        settings, stats = self.resolve_mode(pil_image, mode, base_size, image_size, crop_mode)
+        inputs = self._admit(pil_image, self.prepare(pil_image, prompt, **settings), prompt)
+        base_size, image_size, crop_mode = inputs['base_size'], inputs['image_size'], inputs['crop_mode']
+        inputs['mode_stats'] = stats
+        inputs['targets'] = targets
+        inputs['page_class'], inputs['page_stats'] = page_class, page_stats
+        inputs['vision_key'] = self._vision_key(image, inputs)
+        preprocess_time = time.time() - start_time
+
+        stop = None
+        if self.artifacts_dir:
+            text, output_tokens = self._infer_with_artifacts(image, pil_image, name, prompt,
+                                                             base_size, image_size, crop_mode)
+        else:
+            output_ids, stops = self._generate_measured([inputs])
+            input_len = inputs['input_ids'].shape[0]
+            text, output_tokens = self.decode(output_ids[0, input_len:])
+            stop = stops.get(0)
+
+        elapsed = time.time() - start_time
+
+        return self._result(pil_image, inputs, text, output_tokens, elapsed, preprocess_time, stop=stop)
+
+    def needs_retry(self, result: Union[PageResult, Exception]) -> bool:
+        """OOM (immer), sonst Fehler oder Budget überschritten, wenn die Leiter konfiguriert ist"""
+        if isinstance(result, Exception) and is_oom_error(result):
+            return True
+        if not self.ladder:
+            return False
+        return isinstance(result, Exception) or result.status in RETRY_STATUSES
+
+    def retry_modes(self, base_size: int, image_size: int, crop_mode: bool) -> List[str]:
+        """Modi der Leiter unterhalb des aktuellen Modus"""
+        current = mode_name(base_size, image_size, crop_mode)
+        if current in self.ladder:
+            return self.ladder[self.ladder.index(current) + 1:]
+        return list(self.ladder)
+
+    def _release_memory(self):
+        """Gecachte Allokationen freigeben (nach OOM, bevor es kleiner weitergeht)"""
+        gc.collect()
+        if self.device_type == 'cuda':
+            torch.cuda.empty_cache()
+
+    @staticmethod
+    def _attempt(result: Union[PageResult, Exception], base_size: int, image_size: int, crop_mode: bool) -> dict:
+        """Protokoll-Eintrag für einen Versuch"""
+        attempt = {'mode': mode_name(base_size, image_size, crop_mode)}
+        if isinstance(result, Exception):
+            attempt.update(status='error', error=str(result))
+        else:
+            attempt.update(status=result.status, time_seconds=round(result.time_seconds, 2),
+                           output_tokens=result.output_tokens)
+            if result.stop_reason:
+                attempt['stop_reason'] = result.stop_reason
+        return attempt
+
+    def _retry(self, image, result, base_size, image_size, crop_mode, prompt, name=None):
+        """Wiederhole eine Seite in den nächsten Modi der Leiter, bis ein Versuch durchläuft"""
+        if isinstance(result, PageResult) and result.attempts:
+            attempts = list(result.attempts)
+        else:
+            attempts = [self._attempt(result, base_size, image_size, crop_mode)]
+        total_time = 0.0 if isinstance(result, Exception) else result.time_seconds
+
+        if isinstance(result, Exception) and is_oom_error(result):
+            modes = self.memory_fallbacks(base_size, image_size, crop_mode)
+        else:
+            modes = self.retry_modes(base_size, image_size, crop_mode)
+
+        for mode in modes:
+            if isinstance(result, Exception):
+                # Nach OOM den Cache freigeben, bevor der kleinere Modus startet
+                self._release_memory()
+
+            print(f"[RETRY] {attempts[-1]['status']} in mode {attempts[-1]['mode']}, retrying in mode {mode}")
+            settings = MODES[mode]
+
+            try:
+                result = self._ocr_once(image, prompt=prompt, name=name, **settings)
+                total_time += result.time_seconds
+            except Exception as e:
+                result = e
+
+            attempts.append(self._attempt(result, **settings))
+            if not self.needs_retry(result):
+                break
+
+        if isinstance(result, Exception):
+            result.attempts = attempts
+        else:
+            result.time_seconds = total_time
+            result.attempts = attempts
+
+        return result
+
+    def _result(self, pil_image, inputs, text, output_tokens, elapsed, preprocess_time,
+                batch_size=1, stop=None) -> PageResult:
+        status, stop_reason = stop or ("ok", None)
+        result = PageResult(
+            text=text,
+            time_seconds=elapsed,
+            preprocess_seconds=preprocess_time,
+            generate_seconds=elapsed - preprocess_time,
+            prompt_tokens=int(inputs['input_ids'].shape[0]),
+            vision_tokens=int(inputs['images_seq_mask'].sum()),
+            output_tokens=output_tokens,
+            image_width=source_size(pil_image)[0],
+            image_height=source_size(pil_image)[1],
+            base_size=inputs['base_size'],
+            image_size=inputs['image_size'],
+            crop_mode=inputs['crop_mode'],
+            crop_ratio=inputs['crop_ratio'],
+            status=status,
+            batch_size=batch_size,
+            stop_reason=stop_reason,
+            mode=mode_name(inputs['base_size'], inputs['image_size'], inputs['crop_mode']),
+            mode_stats=inputs.get('mode_stats'),
+            targets=inputs.get('targets'),
+            page_class=inputs.get('page_class'),
+            page_stats=inputs.get('page_stats'),
+        )
+
+        if inputs.get('admission'):
+            # Vorab verkleinert: Budget-Entscheidung + tatsächlicher Lauf protokollieren
+            result.attempts = [inputs['admission'],
+                               self._attempt(result, inputs['base_size'], inputs['image_size'], inputs['crop_mode'])]
+
+        return result
+
+    def classify(self, pil_image: Image.Image) -> Tuple[Optional[str], Optional[dict]]:
+        """Vorab-Klasse der Seite (blank, nearly_blank, content), ohne skip_blank (None, None)"""
+        if not self.skip_blank:
+            return None, None
+        return classify_page(pil_image)
+
+    @staticmethod
+    def _blank_result(pil_image, base_size, image_size, crop_mode, elapsed, targets=None,
+                      page_stats=None) -> PageResult:
+        """Ergebnis einer leeren Seite ohne Inferenz (derselbe Marker wie clean_ocr_text())"""
+        width, height = source_size(pil_image)
+        return PageResult(
+            text=EMPTY_PAGE,
+            time_seconds=elapsed,
+            preprocess_seconds=elapsed,
+            generate_seconds=0.0,
+            prompt_tokens=0,
+            vision_tokens=0,
+            output_tokens=0,
+            image_width=width,
+            image_height=height,
+            base_size=base_size,
+            image_size=image_size,
+            crop_mode=crop_mode,
+            crop_ratio=(1, 1),
+            targets=targets,
+            page_class='blank',
+            page_stats=page_stats,
+        )
+
+    def ocr_many(self, images: Iterable[ImageInput], batch_size: int = 1, base_size: int = 640,
+                 image_size: int = 640, crop_mode: bool = True, prompt: str = DEFAULT_PROMPT,
+                 names: Optional[List[str]] = None, prefetch: int = 0,
+                 mode: Optional[str] = None) -> Iterator[Tuple[int, Union[PageResult, Exception]]]:
+        """
+        OCR für mehrere Seiten, optional gebatcht
+
+        Seiten werden fensterweise (batch_size * BATCH_WINDOW_FACTOR) vorbereitet,
+        nach batch_key gruppiert (gleicher Modus + gleiches Crop-Raster; bei
+        mode="auto" wird der Modus pro Seite gewählt) und
+        gruppenweise generiert. Ergebnisse kommen in Eingabe-Reihenfolge zurück.
+
+        Args:
+            images: Pfade oder PIL-Images (darf ein Generator sein)
+            batch_size: Max. Seiten pro model.generate() Aufruf (1 = kein Batching)
+            names: Optional Namen für Debug-Artefakte
+            prefetch: Anzahl Seiten, die ein Hintergrund-Thread vorab dekodiert
+                und vorbereitet, während die GPU rechnet (0 = aus)
+            mode: Fester Modus oder "auto", überschreibt base_size/image_size/crop_mode
+
+        Yields:
+            (index, PageResult) oder (index, Exception) bei Fehlern
+        """
+        settings = dict(base_size=base_size, image_size=image_size, crop_mode=crop_mode, prompt=prompt, mode=mode)
+
+        if self.artifacts_dir:
+            for index, image in enumerate(images):
+                try:
+                    yield index, self.ocr(image, name=names[index] if names else None, **settings)
+                except Exception as e:
+                    yield index, e
+            return
+
+        window_size = batch_size * BATCH_WINDOW_FACTOR if batch_size > 1 else 1
+        window = []
+
+        try:
+            for item in self._prepare_stream(images, prefetch, **settings):
+                window.append(item)
+                if len(window) >= window_size:
+                    batch, window = window, []
+                    yield from self._ocr_window(batch, batch_size, prompt)
+
+            if window:
+                batch, window = window, []
+                yield from self._ocr_window(batch, batch_size, prompt)
+        finally:
+            # Fehler in der Bildquelle oder abgebrochener Generator: beanspruchte
+            # Cache-Keys freigeben, sonst warten andere Aufrufer bis COALESCE_TIMEOUT
+            for prepared in window:
+                self._release_claim(prepared)
+
+    def _prepare_one(self, index, image, base_size, image_size, crop_mode, prompt, mode=None):
+        """
+        Dekodiere + bereite eine Seite vor
+
+        Returns:
+            (index, pil_image, inputs, sekunden), (index, Exception) oder
+            (index, PageResult) bei einem Cache-Treffer
+        """
+        key = None
+        try:
+            start_time = time.time()
+            if self.cache:
+                key = self.cache_key(image, prompt, mode, base_size, image_size, crop_mode)
+                # Nicht warten: dieselbe Seite kann im selben Fenster noch ausstehen
+                cached = self._cached_result(key, start_time, wait=False)
+                if cached is IN_FLIGHT:
+                    # Nicht beansprucht: ohne put()/release(), sonst würde der Key
+                    # des anderen Threads freigegeben und dessen Wartende geweckt
+                    key = None
+                elif cached:
+                    return (index, cached)
+
+            pil_image, targets = self.open_page(image, mode, base_size, image_size, crop_mode)
+            page_class, page_stats = self.classify(pil_image)
+            if page_class == 'blank':
+                result = self._blank_result(pil_image, base_size, image_size, crop_mode, time.time() - start_time,
+                                            targets=targets, page_stats=page_stats)
+                if key:
+                    self._store(key, result)
+                return (index, result)
+
+            settings, stats = self.resolve_mode(pil_image, mode, base_size, image_size, crop_mode)
+            inputs = self._admit(pil_image, self.prepare(pil_image, prompt, **settings), prompt)
+            inputs['mode_stats'] = stats
+            inputs['targets'] = targets
+            inputs['page_class'], inputs['page_stats'] = page_class, page_stats
+            inputs['vision_key'] = self._vision_key(image, inputs)
+            inputs['cache_key'] = key
+            return (index, pil_image, inputs, time.time() - start_time)
+        except Exception as e:
+            if key:
+                self.cache.release(key)
+            return (index, e)
+
+    def _prepare_stream(self, images, prefetch, **settings):
+        """Vorbereitete Seiten in Reihenfolge, optional per Producer-Thread mit begrenzter Queue"""
+        if prefetch <= 0:
+            for index, image in enumerate(images):
+                yield self._prepare_one(index, image, **settings)
+            return
+
+        prepared = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    prepared.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def drain():
+            # Vorbereitete Seiten, die der Consumer nicht mehr abholt
+            while True:
+                try:
+                    self._release_claim(prepared.get_nowait())
+                except queue.Empty:
+                    return
+
+        def producer():
+            try:
+                for index, image in enumerate(images):
+                    item = self._prepare_one(index, image, **settings)
+                    if not put(item):
+                        self._release_claim(item)
+                        break
+                else:
+                    put(done)
+            except Exception as e:
+                # Fehler in der Bildquelle selbst (z.B. Rendering) an den Consumer weiterreichen
+                put(e)
+            if stop.is_set():
+                drain()
+
+        thread = threading.Thread(target=producer, name="ocr-prefetch", daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                item = prepared.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            drain()
+
+    def _ocr_window(self, window, batch_size, prompt):
+        """Generiere ein vorbereitetes Fenster gruppenweise, liefere in Reihenfolge"""
+        # Beanspruchte Cache-Keys: werden gespeichert oder (bei einem Fehler) wieder freigegeben
+        pending = [prepared for prepared in window if len(prepared) == 4 and prepared[2]['cache_key']]
+        try:
+            done = self._generate_window(window, batch_size, prompt)
+            while pending:
+                self._store(pending[0][2]['cache_key'], done[pending[0][0]])
+                pending.pop(0)
+        finally:
+            for prepared in pending:
+                self._release_claim(prepared)
+
+        for prepared in window:
+            yield prepared[0], done[prepared[0]]
+
+    def _generate_window(self, window, batch_size, prompt) -> dict:
+        """Ergebnisse eines Fensters nach Index (Cache-Treffer, Fehler, generierte Seiten)"""
+        done = {}
+        groups = OrderedDict()
+
+        for prepared in window:
+            if len(prepared) == 2:
+                done[prepared[0]] = prepared[1]
+                continue
+            key = self.batch_key(prepared[2], prompt)
+            groups.setdefault(key, []).append(prepared)
+
+        for group in groups.values():
+            # Batches nach Seitenzahl und VRAM-Budget schneiden
+            for positions in self.memory.plan([prepared[2]['memory_estimate'] for prepared in group], batch_size):
+                chunk = [group[position] for position in positions]
+                try:
+                    done.update(self._generate_chunk(chunk))
+                except Exception as e:
+                    if len(chunk) == 1:
+                        done[chunk[0][0]] = e
+                        continue
+                    # Batch fehlgeschlagen (z.B. OOM) → Seiten einzeln versuchen
+                    print(f"[WARNING] Batch of {len(chunk)} failed ({e}), retrying pages one by one")
+                    for prepared in chunk:
+                        try:
+                            done.update(self._generate_chunk([prepared]))
+                        except Exception as page_error:
+                            done[prepared[0]] = page_error
+
+        for prepared in window:
+            if len(prepared) == 4 and self.needs_retry(done[prepared[0]]):
+                inputs = prepared[2]
+                done[prepared[0]] = self._retry(prepared[1], done[prepared[0]], inputs['base_size'],
+                                                inputs['image_size'], inputs['crop_mode'], prompt)
+
+        return done
+
+    def _generate_chunk(self, chunk) -> dict:
+        """Generiere einen Batch und teile das Ergebnis pro Seite auf"""
+        start_time = time.time()
+        output_ids, stops = self._generate_measured([inputs for _, _, inputs, _ in chunk])
+        generate_time = time.time() - start_time
+
+        # GPU-Zeit wird gleichmäßig auf die Seiten des Batches verteilt
+        share = generate_time / len(chunk)
+        results = {}
+
+        for row, (index, pil_image, inputs, preprocess_time) in enumerate(chunk):
+            input_len = inputs['input_ids'].shape[0]
+            text, output_tokens = self.decode(output_ids[row, input_len:])
+            results[index] = self._result(pil_image, inputs, text, output_tokens,
+                                          preprocess_time + share, preprocess_time,
+                                          batch_size=len(chunk), stop=stops.get(row))
+
+        return results
+
+    def _generate_measured(self, batch: List[dict]):
+        """generate_batch() mit Spitzenspeicher-Messung für das VRAM-Budget, OOM gibt den Speicher frei"""
+        estimates = [inputs.get('memory_estimate') or self.estimate(inputs) for inputs in batch]
+        measure = self.device_type == 'cuda' and self.memory.enabled
+        if measure:
+            device = torch.device(self.device)
+            torch.cuda.reset_peak_memory_stats(device)
+            baseline = torch.cuda.memory_allocated(device)
+
+        try:
+            output_ids, stops = self.generate_batch(batch)
+        except Exception as e:
+            if is_oom_error(e):
+                self.memory.record_oom(estimates)
+                self._release_memory()
+                print(f"[MEMORY] Out of memory with {len(batch)} page(s), budget now {self.memory.describe()}")
+            raise
+
+        if measure:
+            self.memory.observe(estimates, torch.cuda.max_memory_allocated(device) - baseline)
+
+        return output_ids, stops
+
+    def _infer_with_artifacts(self, image, pil_image, name, prompt, base_size, image_size, crop_mode):
+        """Alter Pfad: model.infer(save_results=True) in artifacts_dir/<name>"""
+        if name is None:
+            name = Path(image).stem if not isinstance(image, Image.Image) else "image"
+
+        temp_dir = Path(self.artifacts_dir) / name
+        temp_dir.mkdir(parents=True, exist_ok=True)
+
+        if isinstance(image, Image.Image) or TARGETS_INFO in pil_image.info:
+            # In-Memory Seite oder zugeschnitten → das vorbereitete Bild übergeben
+            image_file = temp_dir / "input.png"
+            pil_image.save(image_file)
+        else:
+            image_file = image
+
+        self.model.infer(
+            self.tokenizer,
+            prompt=prompt,
+            image_file=str(image_file),
+            output_path=str(temp_dir),
+            base_size=base_size,
+            image_size=image_size,
+            crop_mode=crop_mode,
+            save_results=True,
+            test_compress=True
+        )
+
+        result_file = temp_dir / "result.mmd"
+        text = ""
+        if result_file.exists():
+            with open(result_file, 'r', encoding='utf-8') as f:
+                text = f.read()
+
+        return text, len(self.tokenizer.encode(text, add_special_tokens=False))
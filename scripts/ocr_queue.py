@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+OCR Job Queue CLI
+=================
+Ganze PDFs, METS-Verzeichnisse und Bildordner als Jobs einreihen und unbeaufsichtigt
+abarbeiten lassen (Queue: job_queue.py, SQLite)
+
+Commands:
+    submit PATH      Job anlegen (Typ wird erkannt: .pdf, Verzeichnis mit mets.xml, Bildordner)
+    status [JOB_ID]  Übersicht aller Jobs bzw. Seiten-Status eines Jobs
+    cancel JOB_ID    Offene Seiten eines Jobs abbrechen
+    work             Worker: Seiten in Reihenfolge abarbeiten (Daemon oder eigenes Modell)
+    export JOB_ID    *_ocr.json / *_fulltext.txt eines Jobs (neu) schreiben
+
+Usage:
+    python scripts/ocr_queue.py submit data/DTS_Flechte.pdf --mode auto
+    python scripts/ocr_queue.py submit data/o_szd.151/ --batch-size 4
+    python scripts/ocr_queue.py submit data/karteikarten/
+    python scripts/ocr_queue.py work
+    python scripts/ocr_queue.py status
+"""
+
+import sys
+import time
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+from engine_args import add_daemon_args, add_engine_args, engine_from_args, engine_settings
+from job_queue import DEFAULT_DB, MAX_ATTEMPTS, JobQueue, LeaseKeeper
+from ocr_types import MODES
+from checkpoint import write_json_atomic, write_fulltext
+from sharding import select_pages
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.webp')
+
+
+def setup_utf8():
+    """UTF-8 Fix für Windows"""
+    import io
+    if sys.platform == 'win32':
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def detect_kind(path: Path) -> str:
+    if path.is_file() and path.suffix.lower() == '.pdf':
+        return 'pdf'
+    if path.is_dir() and (path / "mets.xml").exists():
+        return 'mets'
+    if path.is_dir():
+        return 'images'
+    raise ValueError(f"Cannot detect job type of {path} (expected .pdf, METS directory or image folder)")
+
+
+def enumerate_pages(kind: str, path: Path, pages_spec=None):
+    """Seiten eines Dokuments, liefert (pages, meta)"""
+    if kind == 'pdf':
+        from pdf_render import pdf_page_count
+        numbers = select_pages(range(1, pdf_page_count(path) + 1), pages_spec)
+        return [{'page': n, 'ref': None} for n in numbers], {}
+
+    if kind == 'mets':
+        from test_ocr_mets import parse_mets, find_page_image
+        mets_data = parse_mets(path / "mets.xml")
+        orders = set(select_pages([page['order'] for page in mets_data['pages']], pages_spec))
+
+        pages = []
+        for page in mets_data['pages']:
+            if page['order'] not in orders:
+                continue
+            image_file = find_page_image(path / "images", page['file_id'])
+            if not image_file:
+                print(f"[WARNING] Image not found for {page['file_id']}")
+                continue
+            pages.append({'page': page['order'], 'ref': str(image_file.resolve())})
+
+        meta = {'mets_metadata': mets_data['metadata'], 'logical_structure': mets_data['logical_structure']}
+        return pages, meta
+
+    images = sorted(p for p in path.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    numbers = set(select_pages(range(1, len(images) + 1), pages_spec))
+    pages = [{'page': i, 'ref': str(image.resolve())} for i, image in enumerate(images, 1) if i in numbers]
+    return pages, {}
+
+
+def queue_entry(page_num, ref, result):
+    """JSON-Eintrag einer fertigen Seite (wie test_ocr_*.py)"""
+    entry = {'page': page_num}
+    if ref:
+        entry['image_file'] = Path(ref).name
+    entry.update({
+        'text': result.text,
+        'characters': result.characters,
+        'time_seconds': round(result.time_seconds, 2),
+        'vision_tokens': result.vision_tokens,
+        'output_tokens': result.output_tokens,
+        'status': result.status,
+        'mode': result.mode
+    })
+    if result.attempts:
+        entry['attempts'] = result.attempts
+    if result.cached:
+        entry['cached'] = True
+    if result.page_class:
+        entry['page_class'] = result.page_class
+    return entry
+
+
+def export_job(queue: JobQueue, job_id: int) -> Path:
+    """Schreibe <name>_ocr.json und <name>_fulltext.txt eines Jobs"""
+    job = queue.job(job_id)
+    results = queue.entries(job_id)
+
+    output_dir = Path(job['output_dir'] or Path("results") / f"job_{job_id}_{job['name']}")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    output_data = dict(job['meta'])
+    output_data.update({
+        'source': job['source'],
+        'job_id': job_id,
+        'job_status': queue.job_status(job_id),
+        'timestamp': datetime.fromtimestamp(job['created']).strftime("%Y%m%d_%H%M%S"),
+        'total_pages': len(results),
+        'successful': sum(1 for r in results if 'text' in r),
+        'failed': sum(1 for r in results if 'error' in r),
+        'pages': results
+    })
+
+    output_file = output_dir / f"{job['name']}_ocr.json"
+    write_json_atomic(output_file, output_data)
+    write_fulltext(output_dir / f"{job['name']}_fulltext.txt", results)
+
+    return output_file
+
+
+def load_engine(args):
+    """Daemon verwenden, falls erreichbar, sonst Modell laden"""
+    from ocr_client import connect_daemon
+
+    engine = None
+    if not args.no_daemon:
+        engine = connect_daemon(args.daemon, engine_settings(args))
+    if engine is None:
+        engine = engine_from_args(args)
+    return engine
+
+
+def process_claim(queue: JobQueue, engine, claimed):
+    """OCR für geholte Seiten (alle aus einem Job), Ergebnisse in die Queue schreiben"""
+    job = queue.job(claimed[0]['job_id'])
+    settings = job['settings']
+
+    if job['kind'] == 'pdf':
+        from pdf_render import iter_page_images
+        images = iter_page_images(job['source'], dpi=settings.get('dpi', 300), pages=[p['page'] for p in claimed])
+    else:
+        images = [p['ref'] for p in claimed]
+
+    results = engine.ocr_many(
+        images,
+        batch_size=settings.get('batch_size', 1),
+        base_size=settings.get('base_size', 640),
+        mode=settings.get('mode'),
+        names=[f"job{job['id']}_page_{p['page']:03d}" for p in claimed]
+    )
+
+    answered = set()
+    for index, result in results:
+        answered.add(index)
+        page = claimed[index]
+        label = f"Job {job['id']} page {page['page']} (attempt {page['attempts']})"
+
+        if isinstance(result, Exception):
+            status = queue.fail(page['job_id'], page['page'], str(result))
+            print(f"[ERROR] {label}: {result} → {status}")
+        else:
+            queue.complete(page['job_id'], page['page'], queue_entry(page['page'], page['ref'], result))
+            print(f"[OK] {label}: {result.characters} characters in {result.time_seconds:.1f}s")
+
+    # Seiten ohne Ergebnis (z.B. Bildquelle vorzeitig zu Ende) nicht "running" stehen lassen
+    for index, page in enumerate(claimed):
+        if index not in answered:
+            status = queue.fail(page['job_id'], page['page'], "No result from the OCR engine")
+            print(f"[ERROR] Job {job['id']} page {page['page']} (attempt {page['attempts']}): no result → {status}")
+
+
+def finish_jobs(queue: JobQueue):
+    """Jobs ohne offene Seiten exportieren und abschließen"""
+    for job in queue.jobs():
+        if job['finished']:
+            continue
+        counts = queue.counts(job['id'])
+        if counts['pending'] or counts['running']:
+            continue
+
+        output_file = export_job(queue, job['id'])
+        queue.mark_finished(job['id'])
+        print(f"\n[DONE] Job {job['id']} ({job['name']}): {counts['done']} done, "
+              f"{counts['failed']} failed, {counts['cancelled']} cancelled → {output_file}\n")
+
+
+def cmd_submit(queue, args):
+    path = Path(args.path)
+    try:
+        kind = args.kind or detect_kind(path)
+        pages, meta = enumerate_pages(kind, path, args.pages)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    if not pages:
+        print("[ERROR] No pages to process")
+        sys.exit(1)
+
+    settings = {'batch_size': args.batch_size, 'dpi': args.dpi}
+    if args.mode:
+        settings['mode'] = args.mode
+    if args.base_size:
+        settings['base_size'] = args.base_size
+
+    job_id = queue.submit(kind, str(path.resolve()), pages, name=args.name or path.stem,
+                          settings=settings, meta=meta, output_dir=args.output)
+    print(f"[OK] Job {job_id}: {kind} {path} ({len(pages)} pages)")
+
+
+def cmd_status(queue, args):
+    if args.job_id:
+        job = queue.job(args.job_id)
+        print(f"Job {job['id']}: {job['kind']} {job['source']}")
+        print(f"Status: {queue.job_status(job['id'])}  {queue.counts(job['id'])}")
+        for page in queue.pages(job['id']):
+            if page['status'] != 'done' or args.all:
+                error = f"  {page['error']}" if page['error'] else ""
+                print(f"  page {page['page']:4d}  {page['status']:9s}  attempts={page['attempts']}{error}")
+        return
+
+    jobs = queue.jobs()
+    if not jobs:
+        print("No jobs")
+        return
+
+    print(f"{'ID':>4}  {'Status':9}  {'Done':>5} {'Fail':>5} {'Open':>5}  Source")
+    for job in jobs:
+        counts = queue.counts(job['id'])
+        open_pages = counts['pending'] + counts['running']
+        print(f"{job['id']:>4}  {queue.job_status(job['id']):9}  {counts['done']:>5} {counts['failed']:>5} "
+              f"{open_pages:>5}  {job['source']}")
+
+
+def cmd_cancel(queue, args):
+    cancelled = queue.cancel(args.job_id)
+    print(f"[OK] Job {args.job_id} cancelled ({cancelled} pending pages)")
+
+
+def cmd_export(queue, args):
+    print(f"[OK] {export_job(queue, args.job_id)}")
+
+
+def cmd_work(queue, args):
+    recovered = queue.recover()
+    if recovered:
+        print(f"Recovered {recovered} pages of crashed workers (lease expired)\n")
+
+    engine = None
+
+    while True:
+        claimed = queue.claim(limit=max(args.claim, 1))
+        if not claimed:
+            finish_jobs(queue)
+            if args.once:
+                break
+            time.sleep(args.poll)
+            continue
+
+        # Modell erst laden, wenn es Arbeit gibt
+        if engine is None:
+            engine = load_engine(args)
+
+        try:
+            # Leases verlängern, solange die Seiten gerechnet werden
+            with LeaseKeeper(queue):
+                process_claim(queue, engine, claimed)
+        except Exception as e:
+            # z.B. PDF nicht lesbar: noch laufende Seiten zurück in die Queue bzw. failed
+            print(f"[ERROR] {e}")
+            for page in claimed:
+                queue.fail(page['job_id'], page['page'], str(e))
+
+        finish_jobs(queue)
+
+
+def main():
+    setup_utf8()
+
+    parser = argparse.ArgumentParser(description='Persistent OCR job queue (SQLite)')
+    parser.add_argument('--db', default=DEFAULT_DB, help=f'Queue database (default: {DEFAULT_DB})')
+    parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS, help=f'Attempts per page before it counts as failed (default: {MAX_ATTEMPTS})')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    submit = commands.add_parser('submit', help='Queue a PDF, METS directory or image folder')
+    submit.add_argument('path', help='PDF file, METS directory (mets.xml + images/) or image folder')
+    submit.add_argument('--kind', choices=['pdf', 'mets', 'images'], help='Job type (default: detected)')
+    submit.add_argument('--name', help='Document name for output files (default: file/directory name)')
+    submit.add_argument('--output', help='Output directory (default: results/job_<id>_<name>)')
+    submit.add_argument('--pages', help='Only these pages, e.g. 1-10,20')
+    submit.add_argument('--mode', choices=['auto'] + list(MODES), help='Resolution mode or auto (see test_ocr_pdf.py --mode)')
+    submit.add_argument('--base-size', type=int, help='Base size when no --mode is given (default: 640)')
+    submit.add_argument('--batch-size', type=int, default=1, help='Pages per generate() call (default: 1)')
+    submit.add_argument('--dpi', type=int, default=300, help='PDF render resolution (default: 300)')
+
+    status = commands.add_parser('status', help='Show jobs or the pages of one job')
+    status.add_argument('job_id', type=int, nargs='?')
+    status.add_argument('--all', action='store_true', help='Also list finished pages')
+
+    cancel = commands.add_parser('cancel', help='Cancel the pending pages of a job')
+    cancel.add_argument('job_id', type=int)
+
+    export = commands.add_parser('export', help='Write *_ocr.json / *_fulltext.txt for a job')
+    export.add_argument('job_id', type=int)
+
+    work = commands.add_parser('work', help='Process queued pages in order')
+    work.add_argument('--once', action='store_true', help='Exit when the queue is empty instead of polling')
+    work.add_argument('--poll', type=float, default=5.0, help='Seconds between polls of an empty queue (default: 5)')
+    work.add_argument('--claim', type=int, default=8, help='Pages claimed at once (default: 8)')
+    add_engine_args(work)
+    add_daemon_args(work)
+
+    args = parser.parse_args()
+
+    queue = JobQueue(args.db, max_attempts=args.max_attempts)
+    try:
+        {
+            'submit': cmd_submit,
+            'status': cmd_status,
+            'cancel': cmd_cancel,
+            'export': cmd_export,
+            'work': cmd_work,
+        }[args.command](queue, args)
+    except KeyError as e:
+        if args.command == 'work':
+            raise
+        # Unbekannte Job-ID
+        print(f"[ERROR] {e.args[0]}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        released = queue.release()
+        print(f"\nInterrupted, {released} running pages returned to the queue")
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
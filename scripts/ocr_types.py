@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+OCR-Typen ohne torch
+====================
+Ergebnis-Typ, Modi und Defaults der OCR-Engine, die auch Prozesse ohne Modell
+brauchen (ocr_client.py, ocr_dispatch.py, engine_args.py). ocr_engine.py
+importiert sie von hier.
+
+Usage:
+    from ocr_types import DEFAULT_PROMPT, MODES, PageResult
+
+    result = PageResult.from_dict(data)
+"""
+
+from dataclasses import dataclass, asdict, fields
+from typing import List, Optional, Tuple
+
+DEFAULT_PROMPT = "<image>\nExtract all text from this document."
+
+# Wie viele Batches gleichzeitig vorbereitet werden, um passende Gruppen zu finden
+BATCH_WINDOW_FACTOR = 4
+
+# Auflösungs-Modi (knowledge/05-OCR-Optimization.md)
+MODES = {
+    'tiny':   dict(base_size=512, image_size=512, crop_mode=False),
+    'small':  dict(base_size=640, image_size=640, crop_mode=False),
+    'base':   dict(base_size=1024, image_size=1024, crop_mode=False),
+    'large':  dict(base_size=1280, image_size=1280, crop_mode=False),
+    'gundam': dict(base_size=1024, image_size=640, crop_mode=True),
+}
+
+
+@dataclass
+class PageResult:
+    """Ergebnis einer einzelnen OCR-Seite"""
+    text: str
+    time_seconds: float
+    preprocess_seconds: float
+    generate_seconds: float
+    prompt_tokens: int
+    vision_tokens: int
+    output_tokens: int
+    image_width: int
+    image_height: int
+    base_size: int
+    image_size: int
+    crop_mode: bool
+    crop_ratio: Tuple[int, int]
+    status: str = "ok"
+    batch_size: int = 1
+    stop_reason: Optional[str] = None
+    attempts: Optional[List[dict]] = None
+    mode: Optional[str] = None
+    mode_stats: Optional[dict] = None
+    cached: bool = False
+    targets: Optional[dict] = None
+    page_class: Optional[str] = None
+    page_stats: Optional[dict] = None
+
+    @property
+    def characters(self) -> int:
+        return len(self.text.strip())
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data['crop_ratio'] = list(self.crop_ratio)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PageResult":
+        # Unbekannte Felder (Cache oder Daemon einer neueren Version) ignorieren
+        names = {field.name for field in fields(cls)}
+        data = {key: value for key, value in data.items() if key in names}
+        data['crop_ratio'] = tuple(data['crop_ratio'])
+        return cls(**data)
+
+
+@dataclass
+class PageBudget:
+    """Budget pro model.generate() Aufruf (None = unbegrenzt)"""
+    max_seconds: Optional[float] = None
+    max_tokens: Optional[int] = None
+
+
+def mode_name(base_size: int, image_size: int, crop_mode: bool) -> str:
+    """Name des Modus für diese Einstellungen, sonst z.B. '640/640+crop'"""
+    for name, settings in MODES.items():
+        if settings == dict(base_size=base_size, image_size=image_size, crop_mode=crop_mode):
+            return name
+    return f"{base_size}/{image_size}{'+crop' if crop_mode else ''}"
+
+
+def parse_ladder(spec: Optional[str]) -> List[str]:
+    """Parse "gundam,base,small" in eine Liste von Modus-Namen"""
+    if not spec:
+        return []
+
+    ladder = [name.strip().lower() for name in spec.split(',') if name.strip()]
+    unknown = [name for name in ladder if name not in MODES]
+    if unknown:
+        raise ValueError(f"Unknown mode(s) {unknown}, choose from {list(MODES)}")
+
+    return ladder
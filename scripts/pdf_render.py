@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+PDF Render-Ahead
+================
+Rastert PDF-Seiten in Hintergrund-Prozessen, während die GPU rechnet
+
+Features:
+- Worker-Prozesse öffnen das PDF je einmal (PyMuPDF ist nicht thread-safe)
+- Begrenzte Anzahl Seiten "in flight" → RAM/Disk bleiben beschränkt
+- Seiten kommen in PDF-Reihenfolge zurück
+- start() vor dem Laden des Modells → Modell-Laden überlappt mit den ersten Renders
+- In-Memory Modus: Pixmap-Samples direkt als PIL-Image, kein PNG-Umweg über die Disk
+- ImageSaver: optionales, asynchrones Speichern der Seitenbilder (PNG/JPEG/WebP)
+
+Usage:
+    from pdf_render import PageRenderer
+
+    renderer = PageRenderer("data/DTS_Flechte.pdf", "results/.../images", dpi=300)
+    renderer.start()
+    engine = OcrEngine.load()
+    for index, result in engine.ocr_many(renderer, prefetch=2):
+        ...
+    renderer.close()
+"""
+
+import os
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+# Dateiendung + PIL-Format pro --save-images Option
+IMAGE_FORMATS = {
+    'png': ('.png', 'PNG'),
+    'jpeg': ('.jpg', 'JPEG'),
+    'webp': ('.webp', 'WEBP'),
+}
+
+# Pro Worker-Prozess geöffnetes Dokument
+_worker_document = None
+
+
+def _init_worker(pdf_path):
+    global _worker_document
+    _worker_document = fitz.open(pdf_path)
+
+
+def page_filename(page_num, image_format='png'):
+    """Dateiname eines Seitenbilds, z.B. page_001.png"""
+    return f"page_{page_num:03d}{IMAGE_FORMATS[image_format][0]}"
+
+
+def pdf_page_count(pdf_path):
+    """Anzahl Seiten eines PDFs"""
+    with fitz.open(pdf_path) as pdf_document:
+        return len(pdf_document)
+
+
+def render_pixmap(page, dpi):
+    """Rastere eine Seite als RGB-Pixmap ohne Alpha-Kanal"""
+    zoom = dpi / 72
+    return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+
+
+def pixmap_to_image(pix, samples=None):
+    """
+    Wandle eine RGB-Pixmap in ein PIL-Image ohne Kopie
+
+    Image.frombuffer() teilt den Speicher mit samples. Ohne samples wird
+    pix.samples_mv verwendet; die Pixmap lebt dann so lange wie das Bild,
+    damit der Puffer gültig bleibt. Sie hängt nicht in image.info: info wird
+    mit dem Bild gepickelt (Multiprocessing-Queues), eine Pixmap nicht.
+    """
+    if samples is not None:
+        return Image.frombuffer("RGB", (pix.width, pix.height), samples, "raw", "RGB", pix.stride, 1)
+
+    image = Image.frombuffer("RGB", (pix.width, pix.height), pix.samples_mv, "raw", "RGB", pix.stride, 1)
+    weakref.finalize(image, _release_pixmap, pix)
+    return image
+
+
+def _release_pixmap(pix):
+    """Finalizer von pixmap_to_image(): hält pix bis zum Freigeben des Bilds"""
+
+
+def iter_page_images(pdf_path, dpi=300, pages=None):
+    """
+    Rendere Seiten im aktuellen Prozess direkt in den Speicher
+
+    Args:
+        pages: Optional Liste von Seitennummern (1-basiert), sonst alle
+    """
+    with fitz.open(pdf_path) as pdf_document:
+        if pages is None:
+            pages = range(1, len(pdf_document) + 1)
+
+        for page_num in pages:
+            pix = render_pixmap(pdf_document[page_num - 1], dpi)
+            image = pixmap_to_image(pix)
+            image.filename = page_filename(page_num)
+
+            print(f"  Page {page_num}: {pix.width}x{pix.height}px (in memory)")
+            yield image
+
+
+class _PixmapData:
+    """Picklebare Pixmap-Daten für den Transport aus dem Worker-Prozess"""
+
+    def __init__(self, pix):
+        self.width = pix.width
+        self.height = pix.height
+        self.stride = pix.stride
+        self.samples = pix.samples
+
+
+def _render_worker(page_index, dpi, output_dir):
+    """Rendere eine Seite als PNG oder in den Speicher (läuft im Worker-Prozess)"""
+    pix = render_pixmap(_worker_document[page_index], dpi)
+
+    if output_dir is None:
+        return _PixmapData(pix)
+
+    image_path = os.path.join(output_dir, page_filename(page_index + 1))
+    pix.save(image_path)
+
+    return image_path, pix.width, pix.height
+
+
+class ImageSaver:
+    """
+    Speichert Seitenbilder asynchron in einem Hintergrund-Thread
+
+    Höchstens max_pending Bilder warten gleichzeitig aufs Speichern,
+    danach blockiert submit() (begrenzter RAM).
+    """
+
+    def __init__(self, output_dir, image_format='jpeg', quality=90, workers=1, max_pending=8):
+        """
+        Args:
+            output_dir: Zielverzeichnis
+            image_format: png, jpeg oder webp
+            quality: JPEG/WebP Qualität (1-100)
+        """
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown image format: {image_format}")
+
+        self.output_dir = output_dir
+        self.image_format = image_format
+        self.quality = quality
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-saver")
+        self._futures = []
+
+        os.makedirs(output_dir, exist_ok=True)
+
+    def filename(self, page_num):
+        return page_filename(page_num, self.image_format)
+
+    def submit(self, image, page_num):
+        """Plane das Speichern eines Bilds, liefert den Dateinamen"""
+        filename = self.filename(page_num)
+        self._slots.acquire()
+        self._futures.append(self._executor.submit(self._save, image, filename))
+        return filename
+
+    def _save(self, image, filename):
+        try:
+            pil_format = IMAGE_FORMATS[self.image_format][1]
+            options = {'optimize': True} if pil_format == 'PNG' else {'quality': self.quality}
+            image.save(os.path.join(self.output_dir, filename), pil_format, **options)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Warte auf alle ausstehenden Speichervorgänge"""
+        self._executor.shutdown(wait=True)
+        errors = [f.exception() for f in self._futures if f.exception() is not None]
+        self._futures = []
+        for error in errors:
+            print(f"[WARNING] Saving page image failed: {error}")
+
+
+class PageRenderer:
+    """
+    Producer für gerenderte PDF-Seiten
+
+    Iteration liefert Bild-Pfade (bzw. PIL-Images bei in_memory) in
+    Seitenreihenfolge. Es sind höchstens `prefetch` Seiten gleichzeitig
+    beauftragt bzw. fertig, aber noch nicht abgeholt.
+    """
+
+    def __init__(self, pdf_path, output_dir, dpi=300, workers=2, prefetch=4, in_memory=False, pages=None):
+        """
+        Args:
+            pdf_path: Pfad zum PDF
+            output_dir: Output-Verzeichnis für Bilder (ignoriert bei in_memory)
+            dpi: Auflösung (300 DPI empfohlen)
+            workers: Anzahl Render-Prozesse
+            prefetch: Max. Seiten im Voraus
+            in_memory: Seiten als PIL-Image statt PNG-Pfad liefern
+            pages: Optional Liste von Seitennummern (1-basiert), sonst alle
+        """
+        self.pdf_path = str(pdf_path)
+        self.output_dir = None if in_memory else str(output_dir)
+        self.dpi = dpi
+        self.workers = max(1, workers)
+        self.prefetch = max(1, prefetch)
+
+        if pages is None:
+            pages = range(1, pdf_page_count(self.pdf_path) + 1)
+        self.pages = list(pages)
+
+        self._executor = None
+        self._futures = deque()
+        self._next_page = 0
+
+    def __len__(self):
+        return len(self.pages)
+
+    def start(self):
+        """Starte Worker und beauftrage die ersten Seiten"""
+        if self._executor is not None:
+            return self
+
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.pdf_path,)
+        )
+        self._fill()
+        return self
+
+    def _fill(self):
+        while len(self._futures) < self.prefetch and self._next_page < len(self.pages):
+            page_index = self.pages[self._next_page] - 1
+            future = self._executor.submit(_render_worker, page_index, self.dpi, self.output_dir)
+            self._futures.append(future)
+            self._next_page += 1
+
+    def __iter__(self):
+        self.start()
+
+        try:
+            for page_num in self.pages:
+                future = self._futures.popleft()
+                rendered = future.result()
+                self._fill()
+
+                if self.output_dir is None:
+                    image = pixmap_to_image(rendered, rendered.samples)
+                    image.filename = page_filename(page_num)
+                    print(f"  Page {page_num}: {rendered.width}x{rendered.height}px (in memory)")
+                    yield image
+                else:
+                    image_path, width, height = rendered
+                    print(f"  Page {page_num}: {width}x{height}px → {Path(image_path).name}")
+                    yield image_path
+        finally:
+            self.close()
+
+    def close(self):
+        """Beende Worker, offene Aufträge werden verworfen"""
+        if self._executor is not None:
+            for future in self._futures:
+                future.cancel()
+            self._futures.clear()
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Repetition Detector
+===================
+Bricht "Repetition-Bug" Generierungen ab, während sie laufen
+
+Beobachtet die generierten Tokens (transformers StoppingCriteria) und stoppt
+eine Sequenz, wenn im letzten Fenster
+- zu wenige verschiedene n-Gramme vorkommen (Schleife), oder
+- ein einzelnes Zeichen den Text dominiert (z.B. "0 0 0 0"); Läufe desselben
+  Satzzeichens (Punktlinien im Inhaltsverzeichnis, Tabellenlinien) zählen nicht
+
+Die Seite wird dann als truncated_repetition markiert, der bisherige Text bleibt erhalten.
+Zeilen, die bereits mit EOS abgeschlossen sind (danach nur noch Padding), werden
+nicht mehr geprüft.
+
+Usage:
+    from repetition import RepetitionConfig, RepetitionDetector
+
+    detector = RepetitionDetector(tokenizer, prompt_len, RepetitionConfig(),
+                                  stop_ids=[tokenizer.eos_token_id, tokenizer.pad_token_id])
+    model.generate(..., stopping_criteria=StoppingCriteriaList([detector]))
+    detector.triggered   # {row: reason}
+    detector.stopped_at  # {row: Anzahl generierter Tokens beim Abbruch}
+
+    # CLI: --repetition-threshold 0.2 (Anteil verschiedener 4-Gramme, 0 = aus)
+    #      --char-share-threshold 0.6 (Anteil des häufigsten Zeichens, 0 = aus)
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+import torch
+from transformers import StoppingCriteria
+
+
+@dataclass
+class RepetitionConfig:
+    """Schwellwerte für den Repetition-Detector"""
+    window: int = 256               # Betrachtete letzte Tokens
+    ngram: int = 4                  # n-Gramm-Länge für den Schleifen-Check
+    min_unique_ratio: float = 0.2   # Anteil verschiedener n-Gramme, darunter → Schleife (0 = aus)
+    max_char_share: float = 0.6     # Anteil des häufigsten Zeichens, darüber → degeneriert (0 = aus)
+    min_tokens: int = 128           # Erst ab so vielen generierten Tokens prüfen
+    check_every: int = 32           # Nur alle N Schritte prüfen (billig halten)
+
+
+# Läufe desselben Satzzeichens, auch mit Leerraum dazwischen: Punktlinien
+# ("Kapitel I ........ 5", ". . . ."), Tabellenlinien
+LEADER_RUN = re.compile(r'([.\-_|])(?:\s*\1)+')
+
+
+def unique_ngram_ratio(tokens, n):
+    """Anteil verschiedener n-Gramme in einer Token-Liste"""
+    total = len(tokens) - n + 1
+    if total <= 0:
+        return 1.0
+    return len({tuple(tokens[i:i + n]) for i in range(total)}) / total
+
+
+def dominant_char_share(text):
+    """Anteil des häufigsten Nicht-Whitespace-Zeichens ohne Satzzeichen-Läufe (leerer Text → 0)"""
+    chars = [c for c in LEADER_RUN.sub('', text) if not c.isspace()]
+    if not chars:
+        return 0.0
+    return Counter(chars).most_common(1)[0][1] / len(chars)
+
+
+class RepetitionDetector(StoppingCriteria):
+    """Stoppt einzelne Sequenzen eines Batches bei Wiederholungs-Schleifen"""
+
+    def __init__(self, tokenizer, prompt_len, config=None, stop_ids=()):
+        """
+        Args:
+            tokenizer: Zum Dekodieren des Fensters (Zeichen-Check)
+            prompt_len: Länge des Prompts (gleich für alle Zeilen des Batches)
+            config: RepetitionConfig
+            stop_ids: EOS/Padding-IDs; Zeilen, die eine davon enthalten, sind fertig
+        """
+        self.tokenizer = tokenizer
+        self.prompt_len = prompt_len
+        self.config = config or RepetitionConfig()
+        self.stop_ids = [token_id for token_id in set(stop_ids) if token_id is not None]
+        self.triggered = {}
+        self.stopped_at = {}
+
+    def check(self, tokens):
+        """Prüfe eine Token-Liste, liefert Grund oder None"""
+        config = self.config
+        window = tokens[-config.window:]
+
+        ratio = unique_ngram_ratio(window, config.ngram)
+        if ratio < config.min_unique_ratio:
+            return f"ngram_ratio={ratio:.2f}"
+
+        if config.max_char_share > 0:
+            share = dominant_char_share(self.tokenizer.decode(window, skip_special_tokens=True))
+            if share > config.max_char_share:
+                return f"char_share={share:.2f}"
+
+        return None
+
+    def __call__(self, input_ids, scores, **kwargs):
+        batch_size, length = input_ids.shape
+        generated = length - self.prompt_len
+        stop = torch.zeros(batch_size, dtype=torch.bool, device=input_ids.device)
+
+        if generated < self.config.min_tokens or generated % self.config.check_every:
+            for row in self.triggered:
+                stop[row] = True
+            return stop
+
+        # Abgeschlossene Zeilen wachsen nur noch um Padding → nicht als Schleife werten
+        finished = torch.zeros(batch_size, dtype=torch.bool, device=input_ids.device)
+        for token_id in self.stop_ids:
+            finished |= (input_ids[:, self.prompt_len:] == token_id).any(dim=1)
+        finished = finished.tolist()
+
+        rows = input_ids[:, max(self.prompt_len, length - self.config.window):].tolist()
+        for row, tokens in enumerate(rows):
+            if row not in self.triggered and not finished[row]:
+                reason = self.check(tokens)
+                if reason:
+                    self.triggered[row] = reason
+                    self.stopped_at[row] = generated
+            if row in self.triggered:
+                stop[row] = True
+
+        return stop
+
+
+def config_from_threshold(threshold: float, char_share_threshold: float = RepetitionConfig.max_char_share):
+    """RepetitionConfig für --repetition-threshold und --char-share-threshold (beide 0 = Detector aus)"""
+    if threshold <= 0 and char_share_threshold <= 0:
+        return None
+    return RepetitionConfig(min_unique_ratio=max(threshold, 0.0), max_char_share=max(char_share_threshold, 0.0))
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+OCR Result Cache
+================
+Persistenter, inhaltsadressierter Cache für OCR-Ergebnisse
+
+Features:
+- Key = SHA-256 über Bildinhalt + base_size, image_size, crop_mode, Modus, Prompt, Modell-Revision
+- Ein JSON pro Eintrag unter <cache_dir>/<key[:2]>/<key>.json (atomar geschrieben)
+- LRU-Größenlimit: Zugriffe aktualisieren die mtime, älteste Einträge werden verdrängt
+- Gleichzeitige Anfragen für denselben Key (Threads) werden zusammengefasst:
+  nur eine rechnet, die anderen warten auf deren Ergebnis
+- Gespeichert werden nur vollständige Seiten (status "ok")
+
+Usage:
+    from result_cache import ResultCache
+
+    cache = ResultCache("results/.cache", max_bytes=2 * 1024**3)
+    engine = OcrEngine.load(cache=cache)
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from PIL import Image
+
+# Wie lange auf eine laufende Berechnung desselben Keys gewartet wird
+COALESCE_TIMEOUT = 600
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# lookup(wait=False): ein anderer Thread hat den Key beansprucht
+IN_FLIGHT = object()
+
+
+def image_digest(image) -> str:
+    """SHA-256 über Dateiinhalt (Pfad) bzw. Pixel (PIL-Image)"""
+    digest = hashlib.sha256()
+
+    if isinstance(image, Image.Image):
+        digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode())
+        digest.update(image.tobytes())
+    else:
+        with open(image, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Inhaltsadressierter JSON-Cache mit LRU-Größenlimit"""
+
+    def __init__(self, cache_dir, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            cache_dir: Verzeichnis des Caches (wird angelegt)
+            max_bytes: Größenlimit, darüber werden die am längsten nicht genutzten Einträge gelöscht
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._index = OrderedDict()
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+
+        # Index nach letzter Nutzung (mtime) aufbauen
+        entries = []
+        for path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total += size
+
+    @staticmethod
+    def key(image, base_size: int, image_size: int, crop_mode: bool, prompt: str,
+            mode=None, revision: str = "", preprocess=None) -> str:
+        """
+        Cache-Key für ein Bild und seine OCR-Einstellungen
+
+        preprocess: Marker für Vorverarbeitung, die das Bild verändert (z.B.
+        "crop_targets"); None lässt bestehende Keys unverändert
+        """
+        settings = [base_size, image_size, crop_mode, mode, prompt, revision]
+        if preprocess:
+            settings.append(preprocess)
+        settings = json.dumps(settings, ensure_ascii=False)
+        return hashlib.sha256(f"{image_digest(image)}\n{settings}".encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _read(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            os.utime(path)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+        return data
+
+    def lookup(self, key: str, wait: bool = True):
+        """
+        Gespeichertes Ergebnis, None oder IN_FLIGHT
+
+        None bedeutet: der Aufrufer hat den Key beansprucht, rechnet und muss
+        danach put() oder release() aufrufen. Läuft die Berechnung bereits in
+        einem anderen Thread, wird auf deren Ergebnis gewartet. wait=False (z.B.
+        dieselbe Seite doppelt im selben Batch-Fenster) liefert dann sofort
+        IN_FLIGHT: der Aufrufer rechnet selbst, ruft aber weder put() noch
+        release() auf - der Key gehört dem anderen Thread.
+        """
+        while True:
+            with self._lock:
+                event = self._inflight.get(key)
+                if event is None:
+                    self._inflight[key] = threading.Event()
+
+            if event is not None and not wait:
+                data = self._read(key)
+                if data is not None:
+                    self.hits += 1
+                    return data
+                self.misses += 1
+                return IN_FLIGHT
+
+            if event is None:
+                data = self._read(key)
+                if data is not None:
+                    self.release(key)
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                return data
+
+            if not event.wait(COALESCE_TIMEOUT):
+                # Hängende Berechnung → selbst rechnen
+                self.misses += 1
+                return None
+
+            data = self._read(key)
+            if data is not None:
+                self.hits += 1
+                return data
+            # Berechnung des anderen Threads fehlgeschlagen → erneut beanspruchen
+
+    def release(self, key: str):
+        """Beanspruchten Key ohne Ergebnis freigeben (Fehler, unvollständige Seite)"""
+        with self._lock:
+            event = self._inflight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def put(self, key: str, data: dict):
+        """Ergebnis speichern, wartende Threads wecken, ggf. verdrängen"""
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        size = path.stat().st_size
+
+        with self._lock:
+            self._total += size - self._index.pop(key, 0)
+            self._index[key] = size
+
+        self.release(key)
+        self._evict()
+
+    def _evict(self):
+        while True:
+            with self._lock:
+                if self._total <= self.max_bytes or len(self._index) <= 1:
+                    return
+                key, size = self._index.popitem(last=False)
+                self._total -= size
+
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._index),
+            'bytes': self._total,
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Page-Range Sharding
+===================
+Auswahl von Seitenbereichen und statische Aufteilung eines Dokuments auf
+mehrere Maschinen/GPUs
+
+Usage:
+    --pages 100-199          Nur Seiten 100 bis 199
+    --pages 1-10,20,30-35    Mehrere Bereiche
+    --shard 2/4              Zweites von vier zusammenhängenden Stücken
+
+    from sharding import select_pages
+
+    pages = select_pages(range(1, 596), pages_spec="100-199", shard_spec="1/2")
+"""
+
+from typing import Iterable, List, Optional, Tuple
+
+
+def parse_page_ranges(spec: str) -> List[Tuple[int, int]]:
+    """
+    Parse "100-199" / "5" / "1-10,20-30" in Liste von (start, end), inklusive
+
+    Raises:
+        ValueError bei ungültiger Angabe
+    """
+    ranges = []
+
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+
+        if '-' in part:
+            start, end = part.split('-', 1)
+            start, end = int(start), int(end)
+        else:
+            start = end = int(part)
+
+        if start < 1 or end < start:
+            raise ValueError(f"Invalid page range: {part}")
+
+        ranges.append((start, end))
+
+    if not ranges:
+        raise ValueError(f"Empty page range: {spec!r}")
+
+    return ranges
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Parse "i/N" (1-basiert) in (i, N)
+
+    Raises:
+        ValueError bei ungültiger Angabe
+    """
+    try:
+        index, count = (int(x) for x in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard: {spec!r} (expected i/N, e.g. 2/4)")
+
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard: {spec!r} (i must be between 1 and N)")
+
+    return index, count
+
+
+def shard_slice(items: List, index: int, count: int) -> List:
+    """
+    Zusammenhängendes Stück index/count einer Liste
+
+    Die ersten len(items) % count Stücke bekommen je ein Element mehr.
+    """
+    size, remainder = divmod(len(items), count)
+    start = (index - 1) * size + min(index - 1, remainder)
+    end = start + size + (1 if index <= remainder else 0)
+    return items[start:end]
+
+
+def select_pages(pages: Iterable[int], pages_spec: Optional[str] = None,
+                 shard_spec: Optional[str] = None) -> List[int]:
+    """
+    Wähle Seiten per --pages und/oder --shard aus
+
+    Args:
+        pages: Alle verfügbaren Seitennummern in Reihenfolge
+        pages_spec: z.B. "100-199"
+        shard_spec: z.B. "2/4", wird auf die --pages Auswahl angewendet
+
+    Returns:
+        Ausgewählte Seitennummern in Reihenfolge
+    """
+    selected = list(pages)
+
+    if pages_spec:
+        ranges = parse_page_ranges(pages_spec)
+        selected = [page for page in selected if any(start <= page <= end for start, end in ranges)]
+
+    if shard_spec:
+        index, count = parse_shard(shard_spec)
+        selected = shard_slice(selected, index, count)
+
+    return selected
+
+
+def shard_suffix(pages_spec: Optional[str] = None, shard_spec: Optional[str] = None) -> str:
+    """Suffix für Output-Verzeichnisse, z.B. _p100-199_shard2of4"""
+    suffix = ""
+    if pages_spec:
+        suffix += "_p" + pages_spec.replace(',', '+')
+    if shard_spec:
+        index, count = parse_shard(shard_spec)
+        suffix += f"_shard{index}of{count}"
+    return suffix
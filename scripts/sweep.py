@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Parameter-Sweep für DeepSeek-OCR
+================================
+Ein Datensatz, ein Raster aus base_size/image_size/crop_mode (oder Modus-Namen)
+und Prompts, ein geladenes Modell → Tabelle mit CER, WER, Sekunden/Seite und
+Tokens/Seite pro Einstellung
+
+Features:
+- Modell wird einmal geladen (ein laufender Daemon nur mit --daemon, und nur wenn
+  er ohne Retry-Leiter, VRAM-Budget und Vorverarbeitung läuft)
+- Jede Einstellung wird so gemessen, wie sie ist: keine Retry-Leiter, kein
+  VRAM-Budget; Seiten, die trotzdem in einem anderen Modus liefen (OOM), zählen
+  als Fehler ("mode_mismatch")
+- Reihenfolge für Cache-Wiederverwendung: Bild → Einstellung → Prompt, so
+  laufen alle Prompts einer Einstellung auf demselben Vision-Encoding (vision_cache.py)
+- Ground Truth: --ground-truth (ein Bild), <bild>.txt / <bild>.gt.txt neben dem Bild,
+  oder die einzige ground-tru*th*.txt im Ordner eines Einzelbild-Datensatzes
+- Mit --cache-dir werden Ergebnisse früherer Sweeps wiederverwendet; als Zeit zählt
+  dann die ursprüngliche Rechenzeit der Seite
+- Ergebnisse: sweep.json (alle Seiten), sweep.csv und sweep.md (Tabelle)
+
+Usage:
+    python scripts/sweep.py data/o_hsa_letter_2261 --modes tiny,small,base,gundam
+    python scripts/sweep.py data/o_hsa_letter_2261/image.1.jpg \\
+        --ground-truth data/o_hsa_letter_2261/ground-trurth-transcription.txt \\
+        --base-size 640,1024 --image-size 640 --crop-mode on,off \\
+        --prompt "<image>\\nExtract all text from this document." --prompt "<image>\\nFree OCR."
+"""
+
+import argparse
+import csv
+import io
+import itertools
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+from filter_artifacts import clean_ocr_text
+from ocr_types import DEFAULT_PROMPT, MODES, PageBudget, mode_name
+from result_cache import ResultCache
+from ocr_client import connect_daemon
+from vision_cache import VisionCache
+from checkpoint import write_json_atomic
+from test_ocr_image import EVAL_AVAILABLE, calculate_cer, calculate_wer, normalize_text
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.webp')
+
+
+def setup_utf8():
+    """UTF-8 Fix für Windows"""
+    if sys.platform == 'win32':
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+
+def parse_list(spec, convert=str):
+    return [convert(item.strip()) for item in spec.split(',') if item.strip()] if spec else []
+
+
+def parse_crop(value: str) -> bool:
+    value = value.lower()
+    if value in ('on', 'true', '1', 'yes'):
+        return True
+    if value in ('off', 'false', '0', 'no'):
+        return False
+    raise ValueError(f"Invalid crop mode {value!r}, use on/off")
+
+
+def build_grid(modes=None, base_sizes=None, image_sizes=None, crop_modes=None) -> list:
+    """
+    Einstellungen des Sweeps (ohne Duplikate, in Angabe-Reihenfolge)
+
+    Returns:
+        Liste von dicts (base_size, image_size, crop_mode)
+    """
+    grid = []
+    for mode in modes or []:
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode {mode!r}, choose from {list(MODES)}")
+        grid.append(dict(MODES[mode]))
+
+    if base_sizes or image_sizes or crop_modes:
+        for base_size, image_size, crop_mode in itertools.product(base_sizes or [640], image_sizes or [640],
+                                                                  crop_modes or [True]):
+            grid.append(dict(base_size=base_size, image_size=image_size, crop_mode=crop_mode))
+
+    if not grid:
+        grid = [dict(settings) for settings in MODES.values()]
+
+    unique = []
+    for settings in grid:
+        if settings not in unique:
+            unique.append(settings)
+    return unique
+
+
+def find_images(dataset: Path) -> list:
+    if dataset.is_file():
+        return [dataset]
+    images_dir = dataset / "images" if (dataset / "images").is_dir() else dataset
+    return sorted(p for p in images_dir.iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+
+
+def find_ground_truth(image: Path, images: list, explicit: str = None):
+    """Ground-Truth-Datei für ein Bild oder None"""
+    if explicit:
+        return Path(explicit)
+
+    for candidate in (image.with_suffix('.txt'), image.with_suffix('.gt.txt')):
+        if candidate.is_file():
+            return candidate
+
+    if len(images) == 1:
+        matches = [p for p in image.parent.glob("ground-tru*th*.txt")]
+        if len(matches) == 1:
+            return matches[0]
+    return None
+
+
+def page_time(result) -> float:
+    """Rechenzeit der Seite (bei Cache-Treffern die ursprüngliche statt der Lookup-Zeit)"""
+    if result.cached:
+        return result.preprocess_seconds + result.generate_seconds
+    return result.time_seconds
+
+
+def score(text: str, ground_truth: str, use_filter: bool = True) -> dict:
+    """CER/WER (in %) wie test_ocr_image.py: gefilterter, normalisierter Text"""
+    if use_filter:
+        text = clean_ocr_text(text, preserve_structure=True)
+    hypothesis = normalize_text(text)
+    reference = normalize_text(ground_truth)
+    return {'cer': calculate_cer(reference, hypothesis), 'wer': calculate_wer(reference, hypothesis)}
+
+
+def mean(values):
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+
+def summarize(runs: list, grid: list, prompts: list) -> list:
+    """Eine Zeile pro (Einstellung, Prompt)"""
+    rows = []
+    for settings, (prompt_index, prompt) in itertools.product(grid, enumerate(prompts)):
+        name = mode_name(**settings)
+        pages = [r for r in runs if r['setting'] == name and r['prompt_index'] == prompt_index]
+        ok = [r for r in pages if 'error' not in r]
+        rows.append({
+            'setting': name,
+            'base_size': settings['base_size'],
+            'image_size': settings['image_size'],
+            'crop_mode': settings['crop_mode'],
+            'prompt': f"P{prompt_index + 1}",
+            'pages': len(pages),
+            'errors': len(pages) - len(ok),
+            'cer_percent': mean([r.get('cer') for r in ok]),
+            'wer_percent': mean([r.get('wer') for r in ok]),
+            'seconds_per_page': mean([r['time_seconds'] for r in ok]),
+            'tokens_per_page': mean([r['output_tokens'] for r in ok]),
+            'vision_tokens_per_page': mean([r['vision_tokens'] for r in ok]),
+        })
+    return rows
+
+
+def format_value(value, digits=2):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.{digits}f}"
+    return str(value)
+
+
+def format_table(rows: list) -> str:
+    """Markdown-Tabelle der Zusammenfassung"""
+    header = "| Setting | Prompt | Pages | CER % | WER % | s/page | tokens/page | vision tokens | Errors |"
+    lines = [header, "|---" * (header.count("|") - 1) + "|"]
+    for row in rows:
+        lines.append(
+            f"| {row['setting']} | {row['prompt']} | {row['pages']} | {format_value(row['cer_percent'])} | "
+            f"{format_value(row['wer_percent'])} | {format_value(row['seconds_per_page'])} | "
+            f"{format_value(row['tokens_per_page'], 0)} | {format_value(row['vision_tokens_per_page'], 0)} | "
+            f"{row['errors']} |"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    setup_utf8()
+
+    parser = argparse.ArgumentParser(description='Sweep OCR settings on one loaded model and compare CER/WER/speed')
+    parser.add_argument('dataset', help='Image, image folder or METS directory (images/)')
+    parser.add_argument('--ground-truth', help='Ground-truth text (for a single image)')
+    parser.add_argument('--modes', help=f'Named modes to include, e.g. tiny,small,gundam ({", ".join(MODES)})')
+    parser.add_argument('--base-size', help='Comma-separated base sizes, e.g. 640,1024')
+    parser.add_argument('--image-size', help='Comma-separated crop tile sizes, e.g. 640')
+    parser.add_argument('--crop-mode', help='Comma-separated crop modes: on,off')
+    parser.add_argument('--prompt', action='append', help=f'Prompt to test (repeatable, default: {DEFAULT_PROMPT!r})')
+    parser.add_argument('--limit', type=int, help='Only the first N images')
+    parser.add_argument('--no-filter', action='store_true', help='Score the raw text instead of the artifact-filtered text')
+    parser.add_argument('--output', help='Output directory (default: results/sweep_<name>_<timestamp>)')
+    parser.add_argument('--cache-dir', help='Reuse/store page results in this OCR result cache (default: no result cache)')
+    parser.add_argument('--daemon', metavar='ADDRESS', nargs='?', const='',
+                        help='Use a running OCR daemon (default address: $DEEPSEEK_OCR_DAEMON or 127.0.0.1:8765) '
+                             'if it runs without retry ladder, VRAM budget or preprocessing; default: load the model here')
+    parser.add_argument('--device', default='cuda', help='Torch device for the engine (default: cuda)')
+    parser.add_argument('--repetition-threshold', type=float, default=0.2, help='See test_ocr_pdf.py (default: 0.2, 0 = off)')
+    parser.add_argument('--char-share-threshold', type=float, default=0.6, help='See test_ocr_pdf.py (default: 0.6, 0 = off)')
+    parser.add_argument('--max-tokens', type=int, help='Output token budget per page')
+
+    args = parser.parse_args()
+
+    try:
+        grid = build_grid(parse_list(args.modes), parse_list(args.base_size, int),
+                          parse_list(args.image_size, int), parse_list(args.crop_mode, parse_crop))
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+    prompts = args.prompt or [DEFAULT_PROMPT]
+    dataset = Path(args.dataset)
+    if not dataset.exists():
+        print(f"[ERROR] Dataset not found: {dataset}")
+        sys.exit(1)
+
+    images = find_images(dataset)
+    if args.limit:
+        images = images[:args.limit]
+    if not images:
+        print(f"[ERROR] No images in {dataset}")
+        sys.exit(1)
+
+    ground_truths = {}
+    for image in images:
+        gt_path = find_ground_truth(image, images, args.ground_truth)
+        if gt_path is not None:
+            with open(gt_path, 'r', encoding='utf-8') as f:
+                ground_truths[image] = f.read()
+
+    if ground_truths and not EVAL_AVAILABLE:
+        print("[WARNING] Levenshtein/jiwer not installed, CER/WER columns stay empty")
+
+    name = dataset.stem if dataset.is_file() else dataset.name
+    output_dir = Path(args.output or Path("results") / f"sweep_{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    print("="*60)
+    print("PARAMETER SWEEP")
+    print("="*60)
+    print(f"Images:   {len(images)} ({len(ground_truths)} with ground truth)")
+    print(f"Settings: {', '.join(mode_name(**s) for s in grid)}")
+    for index, prompt in enumerate(prompts):
+        print(f"P{index + 1}:       {prompt!r}")
+    print(f"Runs:     {len(images) * len(grid) * len(prompts)} pages\n")
+
+    engine = None
+    if args.daemon is not None:
+        # Nur ein Daemon, der jede Einstellung so rechnet, wie sie angefragt wird
+        engine = connect_daemon(args.daemon or None, {
+            'repetition_threshold': args.repetition_threshold, 'char_share_threshold': args.char_share_threshold,
+            'max_seconds': None, 'max_tokens': args.max_tokens,
+            'retry_modes': [], 'vram_budget_gb': 0, 'crop_targets': False, 'skip_blank': False
+        })
+    if engine is None:
+        from ocr_engine import OcrEngine
+        from repetition import config_from_threshold
+
+        # Keine Retry-Leiter, kein VRAM-Budget: jede Einstellung wird so gemessen, wie sie ist
+        engine = OcrEngine.load(device=args.device,
+                                repetition=config_from_threshold(args.repetition_threshold, args.char_share_threshold),
+                                budget=PageBudget(max_tokens=args.max_tokens),
+                                ladder=[],
+                                vram_budget=0,
+                                cache=ResultCache(args.cache_dir) if args.cache_dir else None,
+                                vision_cache=VisionCache(max_entries=2))
+
+    runs = []
+    start_time = time.time()
+
+    # Bild → Einstellung → Prompt: aufeinanderfolgende Prompts teilen sich das Vision-Encoding
+    for image in images:
+        for settings in grid:
+            setting = mode_name(**settings)
+            for prompt_index, prompt in enumerate(prompts):
+                label = f"{image.name} | {setting} | P{prompt_index + 1}"
+                run = {'image': str(image), 'setting': setting, 'prompt_index': prompt_index, **settings}
+
+                try:
+                    result = engine.ocr(str(image), prompt=prompt, **settings)
+                except Exception as e:
+                    print(f"[ERROR] {label}: {e}")
+                    run['error'] = str(e)
+                    runs.append(run)
+                    continue
+
+                run.update(text=result.text, time_seconds=round(page_time(result), 3),
+                           output_tokens=result.output_tokens, vision_tokens=result.vision_tokens,
+                           status=result.status, cached=result.cached,
+                           mode=mode_name(result.base_size, result.image_size, result.crop_mode))
+                if run['mode'] != setting or result.attempts:
+                    # z.B. nach OOM in einem kleineren Modus wiederholt: misst nicht diese Einstellung
+                    run.update(error="mode_mismatch", attempts=result.attempts)
+                    print(f"[WARNING] {label}: ran in mode {run['mode']}, not counted")
+                    runs.append(run)
+                    continue
+                if image in ground_truths:
+                    run.update(score(result.text, ground_truths[image], use_filter=not args.no_filter))
+
+                cer = f", CER {run['cer']:.2f}%" if run.get('cer') is not None else ""
+                print(f"[OK] {label}: {run['time_seconds']:.1f}s, {result.output_tokens} tokens{cer}")
+                runs.append(run)
+
+    rows = summarize(runs, grid, prompts)
+    table = format_table(rows)
+
+    write_json_atomic(output_dir / "sweep.json", {
+        'dataset': str(dataset),
+        'prompts': {f"P{i + 1}": prompt for i, prompt in enumerate(prompts)},
+        'settings': grid,
+        'summary': rows,
+        'runs': runs,
+        'total_seconds': round(time.time() - start_time, 1),
+        'timestamp': datetime.now().strftime("%Y%m%d_%H%M%S")
+    })
+
+    with open(output_dir / "sweep.csv", 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    with open(output_dir / "sweep.md", 'w', encoding='utf-8') as f:
+        f.write(f"# Sweep: {dataset}\n\n")
+        for index, prompt in enumerate(prompts):
+            f.write(f"- P{index + 1}: `{prompt!r}`\n")
+        f.write(f"\n{table}\n")
+
+    print("\n" + "="*60)
+    print("SWEEP RESULTS")
+    print("="*60)
+    print(table)
+    if getattr(engine, 'vision_cache', None):
+        print(f"\nVision encoder calls reused: {engine.vision_cache.hits}")
+    print(f"\nResults: {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
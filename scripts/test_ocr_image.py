@@ -10,17 +10,15 @@ Usage:
 
     # OCR mit Ground-Truth Evaluation
     python test_ocr_image.py data/o_hsa_letter_2261/image.1.jpg --ground-truth data/o_hsa_letter_2261/ground-trurth-transcription.txt
+
+    # Zusätzlich Markdown, mit demselben Vision-Encoding
+    python test_ocr_image.py data/anno/annoshow.jpg --also-prompt "<image>\n<|grounding|>Convert the document to markdown."
 """
 
-import torch
-from transformers import AutoModel, AutoTokenizer
-from PIL import Image
 import sys
 import os
-import json
 from pathlib import Path
 from datetime import datetime
-import time
 import argparse
 
 # Evaluation libraries
@@ -35,6 +33,11 @@ except ImportError:
 # Import artifact filter
 sys.path.append(str(Path(__file__).parent))
 from filter_artifacts import clean_ocr_text
+from ocr_types import DEFAULT_PROMPT, MODES, parse_ladder
+from engine_args import add_daemon_args, add_engine_args, engine_from_args, engine_settings
+from ocr_client import connect_daemon
+from vision_cache import VisionCache
+from checkpoint import PageJournal, write_json_atomic
 
 def setup_utf8():
     """UTF-8 Fix für Windows"""
@@ -42,86 +45,48 @@ def setup_utf8():
     if sys.platform == 'win32':
         sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-def load_model():
-    """Lade DeepSeek-OCR Modell"""
-    print("="*60)
-    print("LOADING MODEL")
-    print("="*60)
-
-    model_name = "deepseek-ai/DeepSeek-OCR"
-
-    tokenizer = AutoTokenizer.from_pretrained(
-        model_name,
-        trust_remote_code=True
-    )
-    print("[OK] Tokenizer loaded")
-
-    model = AutoModel.from_pretrained(
-        model_name,
-        trust_remote_code=True,
-        use_safetensors=True
-    )
-    model = model.eval().cuda().to(torch.bfloat16)
-    print("[OK] Model loaded to GPU\n")
-
-    return tokenizer, model
-
-def perform_ocr(image_path, tokenizer, model, base_size=640, image_size=640, crop_mode=True, prompt='<image>\nExtract all text from this document.'):
+def perform_ocr(image_path, engine, base_size=640, image_size=640, crop_mode=True, prompt=DEFAULT_PROMPT, mode=None):
     """
     Führt OCR auf einem Bild durch
 
     Args:
         image_path: Pfad zum Bild
-        tokenizer: DeepSeek Tokenizer
-        model: DeepSeek Model
+        engine: OcrEngine
         base_size: Base size for vision encoder
         image_size: Image size for local crops
         crop_mode: Enable multi-crop processing
         prompt: OCR prompt
+        mode: Fester Modus oder "auto", überschreibt base_size/image_size/crop_mode
 
     Returns:
-        tuple: (ocr_text, time_seconds)
+        PageResult
     """
     print(f"Processing: {Path(image_path).name}")
-    print(f"Settings: base_size={base_size}, image_size={image_size}, crop_mode={crop_mode}")
-
-    # Lade Bild
-    image = Image.open(image_path).convert('RGB')
-    print(f"  Size: {image.size[0]}x{image.size[1]}px")
-
-    # OCR
-    start_time = time.time()
-
-    # Temporäres Output-Verzeichnis
-    temp_dir = Path("results") / "temp" / Path(image_path).stem
-    temp_dir.mkdir(parents=True, exist_ok=True)
+    if mode:
+        print(f"Settings: mode={mode}")
+    else:
+        print(f"Settings: base_size={base_size}, image_size={image_size}, crop_mode={crop_mode}")
 
-    model.infer(
-        tokenizer,
-        prompt=prompt,
-        image_file=str(image_path),
-        output_path=str(temp_dir),
+    result = engine.ocr(
+        image_path,
         base_size=base_size,
         image_size=image_size,
         crop_mode=crop_mode,
-        save_results=True,
-        test_compress=True
+        prompt=prompt,
+        mode=mode
     )
 
-    elapsed = time.time() - start_time
+    print(f"  Size: {result.image_width}x{result.image_height}px")
+    print(f"  Mode: {result.mode} (base_size={result.base_size}, image_size={result.image_size}, crop_mode={result.crop_mode})")
+    print(f"  Time: {result.time_seconds:.2f}s{' (cached)' if result.cached else ''}")
+    print(f"  Tokens: {result.vision_tokens} vision, {result.output_tokens} output")
+    print(f"  Characters: {len(result.text)}")
+    if result.status != 'ok':
+        print(f"  [WARNING] {result.status} ({result.stop_reason}), partial text kept")
+    if result.attempts:
+        print(f"  Attempts: {' -> '.join(a['mode'] + ':' + a['status'] for a in result.attempts)}")
 
-    # Lese Ergebnis
-    result_file = temp_dir / "result.mmd"
-    ocr_result = ""
-
-    if result_file.exists():
-        with open(result_file, 'r', encoding='utf-8') as f:
-            ocr_result = f.read()
-
-    print(f"  Time: {elapsed:.2f}s")
-    print(f"  Characters: {len(ocr_result)}")
-
-    return ocr_result, elapsed
+    return result
 
 def normalize_text(text):
     """
@@ -231,11 +196,25 @@ def main():
     parser.add_argument('--base-size', type=int, default=640, help='Base size for vision encoder (default: 640, recommended: 1024)')
     parser.add_argument('--image-size', type=int, default=640, help='Image size for local crops (default: 640)')
     parser.add_argument('--no-crop', action='store_true', help='Disable crop mode (multi-tile processing)')
-    parser.add_argument('--prompt', default='<image>\nExtract all text from this document.', help='Custom prompt for OCR')
+    parser.add_argument('--prompt', default=DEFAULT_PROMPT, help='Custom prompt for OCR')
+    parser.add_argument('--also-prompt', action='append', metavar='PROMPT',
+                        help='Run another prompt on the same image (repeatable); the vision encoding is computed once and reused')
+    parser.add_argument('--resume', metavar='OUTPUT_DIR', help='Reuse the OCR result journaled in an earlier (interrupted) run')
+    parser.add_argument('--save-artifacts', action='store_true', help='Write model debug artifacts (result.mmd, images) to results/temp/')
+    parser.add_argument('--mode', choices=['auto'] + list(MODES),
+                        help='Resolution mode for all pages, or auto: cheapest mode per page from image statistics ; overrides --base-size/--image-size/--no-crop')
+    add_engine_args(parser)
+    add_daemon_args(parser)
 
     args = parser.parse_args()
 
     # Validiere Input
+    try:
+        parse_ladder(args.retry_modes)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+
     if not os.path.exists(args.image_path):
         print(f"ERROR: Image not found: {args.image_path}")
         sys.exit(1)
@@ -251,23 +230,90 @@ def main():
 
         print(f"Ground-Truth loaded: {len(ground_truth)} characters\n")
 
-    # Lade Model
-    tokenizer, model = load_model()
+    # Output-Verzeichnis + Journal
+    image_name = Path(args.image_path).stem
+
+    if args.resume:
+        output_dir = Path(args.resume)
+        if not output_dir.is_dir():
+            print(f"ERROR: Resume directory not found: {args.resume}")
+            sys.exit(1)
+    else:
+        output_dir = Path("results") / f"image_{image_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    journal = PageJournal(output_dir, image_name)
+    timestamp = journal.start_run(timestamp=datetime.now().strftime("%Y%m%d_%H%M%S"),
+                                  image_path=str(args.image_path))['timestamp']
 
     # OCR
     print("="*60)
     print("OCR PROCESSING")
     print("="*60)
 
-    ocr_text, elapsed = perform_ocr(
-        args.image_path,
-        tokenizer,
-        model,
-        base_size=args.base_size,
-        image_size=args.image_size,
-        crop_mode=not args.no_crop,
-        prompt=args.prompt
-    )
+    entry = journal.pages.get(1)
+    if entry and 'error' not in entry:
+        print(f"Resume: OCR result found in {journal.path.name}, skipping inference")
+    else:
+        # Lade Model
+        # Laufender Daemon (ocr_daemon.py) spart das Laden des Modells
+        engine = None
+        if not args.no_daemon and not args.save_artifacts:
+            engine = connect_daemon(args.daemon, engine_settings(args))
+        if engine is None:
+            engine = engine_from_args(args,
+                                      artifacts_dir=str(Path("results") / "temp") if args.save_artifacts else None,
+                                      vision_cache=VisionCache() if args.also_prompt else None)
+
+        page_result = perform_ocr(
+            args.image_path,
+            engine,
+            base_size=args.base_size,
+            image_size=args.image_size,
+            crop_mode=not args.no_crop,
+            prompt=args.prompt,
+            mode=args.mode
+        )
+
+        entry = {
+            'page': 1,
+            'image_path': str(args.image_path),
+            'text': page_result.text,
+            'time_seconds': round(page_result.time_seconds, 2),
+            'vision_tokens': page_result.vision_tokens,
+            'output_tokens': page_result.output_tokens,
+            'status': page_result.status,
+            'mode': page_result.mode
+        }
+        if page_result.attempts:
+            entry['attempts'] = page_result.attempts
+        if page_result.cached:
+            entry['cached'] = True
+        if page_result.page_class:
+            entry['page_class'] = page_result.page_class
+
+        # Weitere Prompts auf demselben Bild (Vision-Encoder aus dem Cache)
+        if args.also_prompt:
+            entry['extra_outputs'] = []
+            for prompt in args.also_prompt:
+                print(f"\nPrompt: {prompt!r}")
+                extra = engine.ocr(args.image_path, base_size=page_result.base_size, image_size=page_result.image_size,
+                                   crop_mode=page_result.crop_mode, prompt=prompt)
+                print(f"  Time: {extra.time_seconds:.2f}s, {extra.output_tokens} output tokens")
+                entry['extra_outputs'].append({
+                    'prompt': prompt,
+                    'text': extra.text,
+                    'time_seconds': round(extra.time_seconds, 2),
+                    'output_tokens': extra.output_tokens,
+                    'status': extra.status
+                })
+            if getattr(engine, 'vision_cache', None):
+                print(f"  Vision encoder calls reused: {engine.vision_cache.hits}")
+
+        journal.append(entry)
+
+    ocr_text = entry['text']
+    elapsed = entry['time_seconds']
 
     # Artifact Filtering
     filtered_text = ocr_text
@@ -292,12 +338,6 @@ def main():
         metrics = evaluate_ocr(filtered_text, ground_truth)
 
     # Speichere Ergebnisse
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    image_name = Path(args.image_path).stem
-
-    output_dir = Path("results") / f"image_{image_name}_{timestamp}"
-    output_dir.mkdir(parents=True, exist_ok=True)
-
     # JSON Output
     result = {
         "image_path": str(args.image_path),
@@ -305,15 +345,19 @@ def main():
         "ocr_text": ocr_text,
         "filtered_text": filtered_text,
         "processing_time_seconds": round(elapsed, 2),
+        "vision_tokens": entry['vision_tokens'],
+        "output_tokens": entry['output_tokens'],
+        "mode": entry.get('mode'),
         "original_characters": len(ocr_text),
         "filtered_characters": len(filtered_text),
         "ground_truth_path": args.ground_truth if args.ground_truth else None,
         "evaluation_metrics": metrics
     }
+    if entry.get('extra_outputs'):
+        result["extra_outputs"] = entry['extra_outputs']
 
     json_path = output_dir / "result.json"
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    write_json_atomic(json_path, result)
 
     # Text Output
     txt_path = output_dir / "ocr_text.txt"
@@ -12,19 +12,26 @@ Features:
 
 Usage:
     python test_ocr_mets.py data/o_szd.151/
+    python test_ocr_mets.py data/o_szd.151/ --batch-size 4
+    python test_ocr_mets.py data/o_szd.151/ --shard 1/2
+    python test_ocr_mets.py data/o_szd.151/ --resume results/mets_o_szd.151_20251029_120000
 """
 
-import torch
-from transformers import AutoModel, AutoTokenizer
-from PIL import Image
 import sys
 import os
-import json
 from pathlib import Path
 from datetime import datetime
-import time
+import argparse
 import xml.etree.ElementTree as ET
 
+sys.path.append(str(Path(__file__).parent))
+from ocr_types import MODES, parse_ladder
+from engine_args import add_daemon_args, add_engine_args, engine_from_args, engine_settings
+from ocr_client import connect_daemon
+from ocr_dispatch import DispatchEngine, engine_options
+from checkpoint import PageJournal, write_json_atomic, write_fulltext
+from sharding import select_pages, parse_page_ranges, shard_suffix
+
 def setup_utf8():
     """UTF-8 Fix für Windows"""
     import io
@@ -132,32 +139,30 @@ def parse_mets(mets_file):
         'logical_to_physical': logical_to_physical
     }
 
-def load_model():
-    """Lade DeepSeek-OCR Modell"""
-    print("="*60)
-    print("LOADING MODEL")
-    print("="*60)
+def find_page_image(images_dir, file_id):
+    """Finde passendes Bild zu einer METS File-ID"""
+    for ext in ['.jpg', '.jpeg', '.png', '.tif', '.tiff']:
+        candidate = images_dir / f"{file_id}{ext}"
+        if candidate.exists():
+            return candidate
 
-    model_name = "deepseek-ai/DeepSeek-OCR"
-
-    tokenizer = AutoTokenizer.from_pretrained(
-        model_name,
-        trust_remote_code=True
-    )
-    print("[OK] Tokenizer loaded")
+        # Versuche auch ohne Punkt
+        candidate = images_dir / f"{file_id.replace('.', '_')}{ext}"
+        if candidate.exists():
+            return candidate
 
-    model = AutoModel.from_pretrained(
-        model_name,
-        trust_remote_code=True,
-        use_safetensors=True
-    )
-    model = model.eval().cuda().to(torch.bfloat16)
-    print("[OK] Model loaded to GPU\n")
+    return None
 
-    return tokenizer, model
+def process_document(input_dir, engine, base_size=640, batch_size=1, journal=None,
+                     pages_spec=None, shard_spec=None, mode=None):
+    """
+    Verarbeite METS-Dokument
 
-def process_document(input_dir, tokenizer, model, output_dir, base_size=640):
-    """Verarbeite METS-Dokument"""
+    Mit journal wird jede Seite sofort gespeichert; bereits fertige Seiten
+    aus einem früheren Lauf werden übersprungen, fehlgeschlagene wiederholt.
+    pages_spec / shard_spec wählen Seiten nach METS ORDER aus (siehe sharding.py).
+    mode: Fester Modus oder "auto" (siehe mode_select.py), sonst base_size/640 mit Crops.
+    """
 
     input_path = Path(input_dir)
 
@@ -186,90 +191,102 @@ def process_document(input_dir, tokenizer, model, output_dir, base_size=640):
         print(f"[ERROR] Images directory not found: {images_dir}")
         return None
 
-    # Verarbeite alle Seiten
-    results = []
+    # Seitenauswahl (--pages / --shard)
+    all_pages = mets_data['pages']
+    selected_orders = set(select_pages([page['order'] for page in all_pages], pages_spec, shard_spec))
+    selected = [page for page in all_pages if page['order'] in selected_orders]
 
-    for page in mets_data['pages']:
-        file_id = page['file_id']
-        order = page['order']
+    if pages_spec or shard_spec:
+        print(f"Selection: {len(selected)} of {len(all_pages)} pages\n")
 
-        # Finde passendes Bild
-        image_file = None
-        for ext in ['.jpg', '.jpeg', '.png', '.tif', '.tiff']:
-            candidate = images_dir / f"{file_id}{ext}"
-            if candidate.exists():
-                image_file = candidate
-                break
+    # Finde Bild pro Seite
+    page_images = []
+    done_pages = journal.done_pages() if journal else set()
 
-            # Versuche auch ohne Punkt
-            candidate = images_dir / f"{file_id.replace('.', '_')}{ext}"
-            if candidate.exists():
-                image_file = candidate
-                break
+    if done_pages:
+        print(f"Resume: {len(done_pages)} pages already done\n")
 
-        if not image_file:
-            print(f"[WARNING] Image not found for {file_id}")
+    for page in selected:
+        if page['order'] in done_pages:
             continue
 
-        print("="*60)
-        print(f"PAGE {order}: {file_id}")
-        print("="*60)
-
-        try:
-            image = Image.open(image_file)
-            print(f"Size: {image.size[0]}x{image.size[1]}px")
+        image_file = find_page_image(images_dir, page['file_id'])
 
-            start_time = time.time()
-
-            prompt = "<image>\nExtract all text from this document."
-
-            # Temporäres Output
-            temp_output = os.path.join(output_dir, "temp", file_id)
-            os.makedirs(temp_output, exist_ok=True)
+        if not image_file:
+            print(f"[WARNING] Image not found for {page['file_id']}")
+            continue
 
-            model.infer(
-                tokenizer,
-                prompt=prompt,
-                image_file=str(image_file),
-                output_path=temp_output,
-                base_size=base_size,
-                image_size=640,
-                crop_mode=True,
-                save_results=True,
-                test_compress=True
-            )
+        page_images.append((page, image_file))
 
-            elapsed = time.time() - start_time
+    # Verarbeite alle Seiten
+    results = []
 
-            # Lese Ergebnis
-            result_file = os.path.join(temp_output, "result.mmd")
-            text = ""
+    ocr_results = engine.ocr_many(
+        [image_file for _, image_file in page_images],
+        batch_size=batch_size,
+        base_size=base_size,
+        image_size=640,
+        crop_mode=True,
+        names=[page['file_id'] for page, _ in page_images],
+        mode=mode
+    )
 
-            if os.path.exists(result_file):
-                with open(result_file, 'r', encoding='utf-8') as f:
-                    text = f.read()
+    for index, result in ocr_results:
+        page, image_file = page_images[index]
+        file_id = page['file_id']
+        order = page['order']
 
-            char_count = len(text.strip())
-            print(f"[OK] {char_count} characters in {elapsed:.1f}s\n")
+        print("="*60)
+        print(f"PAGE {order}: {file_id}")
+        print("="*60)
 
-            results.append({
+        if isinstance(result, Exception):
+            print(f"[ERROR] {result}\n")
+            entry = {
                 'page': order,
                 'file_id': file_id,
-                'image_file': str(image_file.name),
-                'text': text,
-                'characters': char_count,
-                'time_seconds': round(elapsed, 2)
-            })
-
-        except Exception as e:
-            print(f"[ERROR] {e}\n")
-            results.append({
+                'error': str(result)
+            }
+            if getattr(result, 'attempts', None):
+                entry['attempts'] = result.attempts
+        else:
+            print(f"Size: {result.image_width}x{result.image_height}px, mode: {result.mode}")
+            if result.page_class == 'blank':
+                print(f"[SKIPPED] Blank page, no inference ({result.time_seconds:.1f}s)\n")
+            else:
+                print(f"[OK] {result.characters} characters in {result.time_seconds:.1f}s{' (cached)' if result.cached else ''}\n")
+            if result.status != 'ok':
+                print(f"[WARNING] {result.status} ({result.stop_reason}), partial text kept\n")
+
+            entry = {
                 'page': order,
                 'file_id': file_id,
-                'error': str(e)
-            })
-
-    return {
+                'image_file': str(image_file.name),
+                'text': result.text,
+                'characters': result.characters,
+                'time_seconds': round(result.time_seconds, 2),
+                'vision_tokens': result.vision_tokens,
+                'output_tokens': result.output_tokens,
+                'status': result.status,
+                'mode': result.mode
+            }
+            if result.attempts:
+                entry['attempts'] = result.attempts
+            if result.cached:
+                entry['cached'] = True
+            if result.page_class:
+                entry['page_class'] = result.page_class
+
+        results.append(entry)
+        if journal:
+            journal.append(entry)
+
+    if journal:
+        results = journal.entries(selected_orders)
+        if len(results) < len(journal.pages):
+            print(f"[WARNING] {len(journal.pages) - len(results)} journal pages outside the selection are not included\n")
+
+    output = {
         'mets_metadata': mets_data['metadata'],
         'logical_structure': mets_data['logical_structure'],
         'pages': results,
@@ -278,17 +295,49 @@ def process_document(input_dir, tokenizer, model, output_dir, base_size=640):
         'failed': sum(1 for r in results if 'error' in r)
     }
 
+    if pages_spec or shard_spec:
+        output['selection'] = {
+            'pages': pages_spec,
+            'shard': shard_spec,
+            'document_pages': len(all_pages),
+            'page_numbers': sorted(selected_orders)
+        }
+
+    return output
+
 def main():
     """Hauptprogramm"""
     setup_utf8()
 
-    if len(sys.argv) < 2:
-        print("Usage: python test_ocr_mets.py <mets_directory>")
-        print("Example: python test_ocr_mets.py data/o_szd.151/")
+    parser = argparse.ArgumentParser(description='DeepSeek-OCR METS Processing')
+    parser.add_argument('input_dir', help='METS directory (mets.xml + images/)')
+    parser.add_argument('--batch-size', type=int, default=1, help='Pages per generate() call; pages are grouped by mode and crop grid (default: 1)')
+    parser.add_argument('--pages', help='Only process these pages (METS ORDER), e.g. 100-199 or 1-10,20-30')
+    parser.add_argument('--shard', help='Process contiguous shard i of N (1-based, e.g. 2/4); merge shards with merge_shards.py')
+    parser.add_argument('--resume', metavar='OUTPUT_DIR', help='Continue an interrupted run: skip finished pages, retry failed ones')
+    parser.add_argument('--save-artifacts', action='store_true', help='Write model debug artifacts (result.mmd, images) to <output>/temp/')
+    parser.add_argument('--mode', choices=['auto'] + list(MODES),
+                        help='Resolution mode for all pages, or auto: cheapest mode per page from image statistics (default: 640/640 with crops)')
+    parser.add_argument('--devices', help='Run one engine replica per device in worker processes, e.g. cuda:0,cuda:1, cuda:0*2 or auto (all GPUs); pages are reassembled in order')
+    add_engine_args(parser)
+    add_daemon_args(parser)
+
+    args = parser.parse_args()
+
+    if args.devices and args.save_artifacts:
+        parser.error("--save-artifacts needs a single in-process engine, it cannot be combined with --devices")
+
+    input_dir = args.input_dir
+
+    try:
+        suffix = shard_suffix(args.pages, args.shard)
+        if args.pages:
+            parse_page_ranges(args.pages)
+        parse_ladder(args.retry_modes)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
         sys.exit(1)
 
-    input_dir = sys.argv[1]
-
     if not os.path.exists(input_dir):
         print(f"[ERROR] Directory not found: {input_dir}")
         sys.exit(1)
@@ -299,18 +348,40 @@ def main():
     print(f"Input: {input_dir}\n")
 
     # Output
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     object_id = Path(input_dir).name
-    output_dir = f"results/mets_{object_id}_{timestamp}"
+    if args.resume:
+        output_dir = args.resume
+        if not os.path.isdir(output_dir):
+            print(f"[ERROR] Resume directory not found: {output_dir}")
+            sys.exit(1)
+    else:
+        output_dir = f"results/mets_{object_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{suffix}"
     os.makedirs(output_dir, exist_ok=True)
 
     print(f"Output: {output_dir}\n")
 
+    # Journal: jede fertige Seite wird sofort gespeichert
+    journal = PageJournal(output_dir, object_id)
+    journal.start_run(timestamp=datetime.now().strftime("%Y%m%d_%H%M%S"), source=str(input_dir))
+
     # Model laden
-    tokenizer, model = load_model()
+    # Laufender Daemon (ocr_daemon.py) spart das Laden des Modells
+    engine = None
+    if args.devices:
+        # Eine Engine-Replika pro Device, Seiten werden verteilt und in Reihenfolge zurückgegeben
+        engine = DispatchEngine.start(args.devices, engine_options(args))
+    elif not args.no_daemon and not args.save_artifacts:
+        engine = connect_daemon(args.daemon, engine_settings(args))
+    if engine is None:
+        engine = engine_from_args(args, artifacts_dir=os.path.join(output_dir, "temp") if args.save_artifacts else None)
 
     # Verarbeiten
-    result = process_document(input_dir, tokenizer, model, output_dir)
+    try:
+        result = process_document(input_dir, engine, batch_size=args.batch_size, journal=journal,
+                                  pages_spec=args.pages, shard_spec=args.shard, mode=args.mode)
+    finally:
+        if args.devices:
+            engine.close()
 
     if not result:
         print("[ERROR] Processing failed")
@@ -318,17 +389,11 @@ def main():
 
     # Speichere strukturiertes Ergebnis
     output_file = os.path.join(output_dir, f"{object_id}_ocr.json")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
+    write_json_atomic(output_file, result)
 
     # Speichere auch als Plain Text (alle Seiten)
     text_file = os.path.join(output_dir, f"{object_id}_fulltext.txt")
-    with open(text_file, 'w', encoding='utf-8') as f:
-        for page_result in result['pages']:
-            if 'text' in page_result:
-                f.write(f"--- PAGE {page_result['page']} ---\n\n")
-                f.write(page_result['text'])
-                f.write("\n\n")
+    write_fulltext(text_file, result['pages'])
 
     # Summary
     print("="*60)
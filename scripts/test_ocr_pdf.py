@@ -6,18 +6,32 @@ Konvertiert PDF zu Bildern und führt OCR durch
 
 Usage:
     python test_ocr_pdf.py data/DTS_Flechte.pdf
+    python test_ocr_pdf.py data/DTS_Flechte.pdf --batch-size 4
+    python test_ocr_pdf.py data/DTS_Flechte.pdf --pipeline --render-workers 2 --prefetch 4
+    python test_ocr_pdf.py data/DTS_Flechte.pdf --in-memory --save-images jpeg --image-quality 85
+    python test_ocr_pdf.py data/DTS_Flechte.pdf --text-policy prefer-text-layer
+    python test_ocr_pdf.py data/DTS_Flechte.pdf --pages 100-199
+    python test_ocr_pdf.py data/DTS_Flechte.pdf --shard 2/4
+    python test_ocr_pdf.py data/DTS_Flechte.pdf --resume results/pdf_DTS_Flechte_20251029_120000
+    python test_ocr_pdf.py data/DTS_Flechte.pdf --save-artifacts
 """
 
-import torch
-from transformers import AutoModel, AutoTokenizer
-from PIL import Image
 import fitz  # PyMuPDF
 import sys
 import os
-import json
 from pathlib import Path
 from datetime import datetime
-import time
+import argparse
+
+sys.path.append(str(Path(__file__).parent))
+from ocr_types import MODES, parse_ladder
+from engine_args import add_daemon_args, add_engine_args, engine_from_args, engine_settings
+from ocr_client import connect_daemon
+from ocr_dispatch import DispatchEngine, engine_options
+from pdf_render import PageRenderer, ImageSaver, iter_page_images, pdf_page_count
+from text_layer import POLICIES, classify_pdf, use_text_layer
+from checkpoint import PageJournal, write_json_atomic, write_fulltext
+from sharding import select_pages, parse_page_ranges, shard_suffix
 
 def setup_utf8():
     """UTF-8 Fix für Windows"""
@@ -25,31 +39,7 @@ def setup_utf8():
     if sys.platform == 'win32':
         sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-def load_model():
-    """Lade DeepSeek-OCR Modell"""
-    print("="*60)
-    print("LOADING MODEL")
-    print("="*60)
-
-    model_name = "deepseek-ai/DeepSeek-OCR"
-
-    tokenizer = AutoTokenizer.from_pretrained(
-        model_name,
-        trust_remote_code=True
-    )
-    print("[OK] Tokenizer loaded")
-
-    model = AutoModel.from_pretrained(
-        model_name,
-        trust_remote_code=True,
-        use_safetensors=True
-    )
-    model = model.eval().cuda().to(torch.bfloat16)
-    print("[OK] Model loaded to GPU\n")
-
-    return tokenizer, model
-
-def pdf_to_images(pdf_path, output_dir, dpi=300):
+def pdf_to_images(pdf_path, output_dir, dpi=300, pages=None):
     """
     Konvertiert PDF zu Bildern mit PyMuPDF
 
@@ -57,6 +47,7 @@ def pdf_to_images(pdf_path, output_dir, dpi=300):
         pdf_path: Pfad zum PDF
         output_dir: Output-Verzeichnis für Bilder
         dpi: Auflösung (300 DPI empfohlen)
+        pages: Optional Liste von Seitennummern (1-basiert), sonst alle
 
     Returns:
         Liste von Bild-Pfaden
@@ -83,15 +74,18 @@ def pdf_to_images(pdf_path, output_dir, dpi=300):
         # Konvertiere jede Seite
         image_paths = []
 
-        for page_num in range(page_count):
-            page = pdf_document[page_num]
+        if pages is None:
+            pages = range(1, page_count + 1)
+
+        for page_num in pages:
+            page = pdf_document[page_num - 1]
             pix = page.get_pixmap(matrix=mat)
 
-            image_path = os.path.join(output_dir, f"page_{page_num + 1:03d}.png")
+            image_path = os.path.join(output_dir, f"page_{page_num:03d}.png")
             pix.save(image_path)
 
             image_paths.append(image_path)
-            print(f"  Page {page_num + 1}: {pix.width}x{pix.height}px → {Path(image_path).name}")
+            print(f"  Page {page_num}: {pix.width}x{pix.height}px → {Path(image_path).name}")
 
         pdf_document.close()
 
@@ -103,76 +97,146 @@ def pdf_to_images(pdf_path, output_dir, dpi=300):
         traceback.print_exc()
         sys.exit(1)
 
-def process_image(image_path, page_num, tokenizer, model, output_dir, base_size=640):
-    """Verarbeite ein Bild"""
-    print("="*60)
-    print(f"PAGE {page_num}")
-    print("="*60)
-    print(f"Image: {Path(image_path).name}")
+def page_entry(page_num, image_path, result):
+    """Baue den JSON-Eintrag für eine Seite"""
+    if isinstance(result, Exception):
+        print(f"[ERROR] {result}\n")
+        entry = {'page': page_num}
+        if image_path:
+            entry['image_file'] = Path(image_path).name
+        entry['error'] = str(result)
+        if getattr(result, 'attempts', None):
+            entry['attempts'] = result.attempts
+        return entry
+
+    print(f"Size: {result.image_width}x{result.image_height}px, mode: {result.mode}")
+    if result.page_class == 'blank':
+        print(f"[SKIPPED] Blank page, no inference ({result.time_seconds:.1f}s)\n")
+    else:
+        print(f"[OK] {result.characters} characters in {result.time_seconds:.1f}s{' (cached)' if result.cached else ''}\n")
+    if result.status != 'ok':
+        print(f"[WARNING] {result.status} ({result.stop_reason}), partial text kept\n")
+
+    # Ohne gespeichertes Seitenbild (--in-memory --save-images none) kein image_file
+    entry = {'page': page_num}
+    if image_path:
+        entry['image_file'] = Path(image_path).name
+    entry.update({
+        'text': result.text,
+        'characters': result.characters,
+        'time_seconds': round(result.time_seconds, 2),
+        'vision_tokens': result.vision_tokens,
+        'output_tokens': result.output_tokens,
+        'status': result.status,
+        'mode': result.mode,
+        'text_source': 'ocr'
+    })
+    if result.attempts:
+        entry['attempts'] = result.attempts
+    if result.cached:
+        entry['cached'] = True
+    if result.page_class:
+        entry['page_class'] = result.page_class
+
+    return entry
+
+def text_layer_entry(info):
+    """JSON-Eintrag für eine Seite, deren Text aus dem PDF-Text-Layer stammt (ohne Seitenbild)"""
+    text = info['text'].strip()
+    return {
+        'page': info['page'],
+        'text': text,
+        'characters': len(text),
+        'time_seconds': 0.0,
+        'text_source': 'text_layer',
+        'page_class': info['page_class']
+    }
 
-    try:
-        image = Image.open(image_path)
-        print(f"Size: {image.size[0]}x{image.size[1]}px")
-
-        start_time = time.time()
-
-        prompt = "<image>\nExtract all text from this document."
-
-        # Temp output
-        temp_output = os.path.join(output_dir, f"page_{page_num:03d}")
-        os.makedirs(temp_output, exist_ok=True)
-
-        model.infer(
-            tokenizer,
-            prompt=prompt,
-            image_file=str(image_path),
-            output_path=temp_output,
-            base_size=base_size,
-            image_size=640,
-            crop_mode=True,
-            save_results=True,
-            test_compress=True
-        )
-
-        elapsed = time.time() - start_time
-
-        # Lese Ergebnis
-        result_file = os.path.join(temp_output, "result.mmd")
-        text = ""
-
-        if os.path.exists(result_file):
-            with open(result_file, 'r', encoding='utf-8') as f:
-                text = f.read()
-
-        char_count = len(text.strip())
-        print(f"[OK] {char_count} characters in {elapsed:.1f}s\n")
-
-        return {
-            'page': page_num,
-            'image_file': Path(image_path).name,
-            'text': text,
-            'characters': char_count,
-            'time_seconds': round(elapsed, 2)
-        }
+def process_images(image_paths, engine, page_numbers, base_size=640, batch_size=1, prefetch=0, saver=None,
+                   mode=None):
+    """
+    Verarbeite alle Bilder (optional gebatcht), liefert Seiten in Reihenfolge
 
-    except Exception as e:
-        print(f"[ERROR] {e}\n")
-        return {
-            'page': page_num,
-            'image_file': Path(image_path).name,
-            'error': str(e)
-        }
+    image_paths darf eine Liste, ein PageRenderer (Render-Ahead) oder ein
+    Generator von In-Memory Seiten sein. Mit saver werden In-Memory Seiten
+    asynchron als Bilddatei gespeichert.
+    """
+    seen = []
+
+    def track(paths):
+        for page_num, image_path in zip(page_numbers, paths):
+            if isinstance(image_path, (str, Path)):
+                seen.append(image_path)
+            elif saver is not None:
+                seen.append(saver.submit(image_path, page_num))
+            else:
+                # In-Memory ohne --save-images: es gibt keine Bilddatei
+                seen.append(None)
+            yield image_path
+
+    names = [f"page_{page_num:03d}" for page_num in page_numbers]
+
+    results = engine.ocr_many(
+        track(image_paths),
+        batch_size=batch_size,
+        base_size=base_size,
+        image_size=640,
+        crop_mode=True,
+        names=names,
+        prefetch=prefetch,
+        mode=mode
+    )
+
+    for index, result in results:
+        page_num = page_numbers[index]
+        print("="*60)
+        print(f"PAGE {page_num}")
+        print("="*60)
+        print(f"Image: {Path(seen[index]).name if seen[index] else '(in memory)'}")
+
+        yield page_entry(page_num, seen[index], result)
 
 def main():
     """Hauptprogramm"""
     setup_utf8()
 
-    if len(sys.argv) < 2:
-        print("Usage: python test_ocr_pdf.py <pdf_file>")
-        print("Example: python test_ocr_pdf.py data/DTS_Flechte.pdf")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='DeepSeek-OCR PDF Processing')
+    parser.add_argument('pdf_file', help='Path to PDF file')
+    parser.add_argument('--batch-size', type=int, default=1, help='Pages per generate() call; pages are grouped by mode and crop grid (default: 1)')
+    parser.add_argument('--pipeline', action='store_true', help='Render pages in background workers while the GPU works (render-ahead)')
+    parser.add_argument('--render-workers', type=int, default=2, help='Render processes for --pipeline (default: 2)')
+    parser.add_argument('--prefetch', type=int, default=4, help='Max. pages rendered/prepared ahead for --pipeline (default: 4)')
+    parser.add_argument('--in-memory', action='store_true', help='Rasterize pages straight into memory (no PNG round trip through disk)')
+    parser.add_argument('--save-images', choices=['png', 'jpeg', 'webp', 'none'], default='jpeg',
+                        help='With --in-memory: save page images for the viewer asynchronously in this format (default: jpeg)')
+    parser.add_argument('--image-quality', type=int, default=90, help='JPEG/WebP quality for --save-images (default: 90)')
+    parser.add_argument('--text-policy', choices=POLICIES, default='ocr-only',
+                        help='Use the embedded PDF text layer instead of OCR: ocr-only (default), ocr-missing (only born-digital pages), prefer-text-layer (also mixed pages)')
+    parser.add_argument('--pages', help='Only process these pages, e.g. 100-199 or 1-10,20-30')
+    parser.add_argument('--shard', help='Process contiguous shard i of N (1-based, e.g. 2/4); merge shards with merge_shards.py')
+    parser.add_argument('--resume', metavar='OUTPUT_DIR', help='Continue an interrupted run: skip finished pages, retry failed ones')
+    parser.add_argument('--save-artifacts', action='store_true', help='Write model debug artifacts (result.mmd, images) to <output>/temp/')
+    parser.add_argument('--mode', choices=['auto'] + list(MODES),
+                        help='Resolution mode for all pages, or auto: cheapest mode per page from image statistics (default: 640/640 with crops)')
+    parser.add_argument('--devices', help='Run one engine replica per device in worker processes, e.g. cuda:0,cuda:1, cuda:0*2 or auto (all GPUs); pages are reassembled in order')
+    add_engine_args(parser)
+    add_daemon_args(parser)
+
+    args = parser.parse_args()
+
+    if args.devices and args.save_artifacts:
+        parser.error("--save-artifacts needs a single in-process engine, it cannot be combined with --devices")
+
+    pdf_file = args.pdf_file
 
-    pdf_file = sys.argv[1]
+    try:
+        suffix = shard_suffix(args.pages, args.shard)
+        if args.pages:
+            parse_page_ranges(args.pages)
+        parse_ladder(args.retry_modes)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
 
     if not os.path.exists(pdf_file):
         print(f"[ERROR] File not found: {pdf_file}")
@@ -184,52 +248,137 @@ def main():
     print(f"Input: {pdf_file}\n")
 
     # Output setup
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     pdf_name = Path(pdf_file).stem
-    output_dir = f"results/pdf_{pdf_name}_{timestamp}"
+    if args.resume:
+        output_dir = args.resume
+        if not os.path.isdir(output_dir):
+            print(f"[ERROR] Resume directory not found: {output_dir}")
+            sys.exit(1)
+    else:
+        output_dir = f"results/pdf_{pdf_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{suffix}"
     images_dir = os.path.join(output_dir, "images")
 
     os.makedirs(output_dir, exist_ok=True)
 
-    # 1. PDF → Images
-    image_paths = pdf_to_images(pdf_file, images_dir, dpi=300)
+    # Journal: jede fertige Seite wird sofort gespeichert
+    journal = PageJournal(output_dir, pdf_name)
+    timestamp = journal.start_run(timestamp=datetime.now().strftime("%Y%m%d_%H%M%S"),
+                                  source_pdf=str(Path(pdf_file).name))['timestamp']
+    done_pages = journal.done_pages()
+
+    if args.resume:
+        print(f"Resume: {len(done_pages)} pages done, {len(journal.failed_pages())} failed pages will be retried\n")
 
-    if not image_paths:
-        print("[ERROR] No images created")
+    # 0. Text-Layer Pre-Pass
+    page_count = pdf_page_count(pdf_file)
+    text_pages = {}
+
+    if not page_count:
+        print("[ERROR] PDF has no pages")
         sys.exit(1)
 
-    # 2. Load Model
-    tokenizer, model = load_model()
+    # Seitenauswahl (--pages / --shard): nur diese Seiten werden gerastert
+    selected_pages = select_pages(range(1, page_count + 1), args.pages, args.shard)
 
-    # 3. Process alle Seiten
-    results = []
+    if not selected_pages:
+        print("[ERROR] No pages selected")
+        sys.exit(1)
 
-    for i, image_path in enumerate(image_paths, 1):
-        result = process_image(image_path, i, tokenizer, model, os.path.join(output_dir, "temp"))
-        results.append(result)
+    if args.pages or args.shard:
+        print(f"Selection: {len(selected_pages)} of {page_count} pages "
+              f"({selected_pages[0]}-{selected_pages[-1]})\n")
+
+    if args.text_policy != 'ocr-only':
+        page_classes = classify_pdf(pdf_file, pages=selected_pages)
+        text_pages = {info['page']: info for info in page_classes if use_text_layer(info, args.text_policy)}
+
+        print("="*60)
+        print("TEXT LAYER DETECTION")
+        print("="*60)
+        for page_class in ['text', 'mixed', 'scanned']:
+            print(f"{page_class:8s} {sum(1 for info in page_classes if info['page_class'] == page_class)} pages")
+        print(f"Policy:  {args.text_policy} → {len(text_pages)} pages from text layer, "
+              f"{len(selected_pages) - len(text_pages)} pages OCR\n")
+
+    text_pages = {page_num: info for page_num, info in text_pages.items() if page_num not in done_pages}
+    ocr_pages = [page_num for page_num in selected_pages
+                 if page_num not in text_pages and page_num not in done_pages]
+
+    # 1. PDF → Images
+    saver = None
+    if args.in_memory and args.save_images != 'none':
+        saver = ImageSaver(images_dir, image_format=args.save_images, quality=args.image_quality)
+
+    if not ocr_pages:
+        image_paths = []
+        prefetch = 0
+    elif args.pipeline:
+        # Render-Ahead: Worker rendern bereits, während das Modell lädt
+        image_paths = PageRenderer(pdf_file, images_dir, dpi=300, workers=args.render_workers,
+                                   prefetch=args.prefetch, in_memory=args.in_memory, pages=ocr_pages).start()
+        prefetch = args.prefetch
+    elif args.in_memory:
+        image_paths = iter_page_images(pdf_file, dpi=300, pages=ocr_pages)
+        prefetch = 0
+    else:
+        image_paths = pdf_to_images(pdf_file, images_dir, dpi=300, pages=ocr_pages)
+        prefetch = 0
+
+    # 2. Load Model + 3. Process alle Seiten
+    for info in text_pages.values():
+        journal.append(text_layer_entry(info))
+
+    if ocr_pages:
+        # Laufender Daemon (ocr_daemon.py) spart das Laden des Modells
+        engine = None
+        if args.devices:
+            # Eine Engine-Replika pro Device, Seiten werden verteilt und in Reihenfolge zurückgegeben
+            engine = DispatchEngine.start(args.devices, engine_options(args))
+        elif not args.no_daemon and not args.save_artifacts:
+            engine = connect_daemon(args.daemon, engine_settings(args))
+        if engine is None:
+            engine = engine_from_args(args, artifacts_dir=os.path.join(output_dir, "temp") if args.save_artifacts else None)
+
+        try:
+            for entry in process_images(image_paths, engine, ocr_pages, batch_size=args.batch_size,
+                                        prefetch=prefetch, saver=saver, mode=args.mode):
+                journal.append(entry)
+        finally:
+            if args.devices:
+                engine.close()
+            if args.pipeline:
+                image_paths.close()
+            if saver is not None:
+                saver.close()
+
+    results = journal.entries(selected_pages)
+    if len(results) < len(journal.pages):
+        print(f"[WARNING] {len(journal.pages) - len(results)} journal pages outside the selection are not included\n")
 
     # 4. Speichere Ergebnisse
     output_data = {
         'source_pdf': str(Path(pdf_file).name),
-        'total_pages': len(image_paths),
+        'total_pages': len(selected_pages),
         'successful': sum(1 for r in results if 'text' in r),
         'failed': sum(1 for r in results if 'error' in r),
         'pages': results,
         'timestamp': timestamp
     }
 
+    if args.pages or args.shard:
+        output_data['selection'] = {
+            'pages': args.pages,
+            'shard': args.shard,
+            'document_pages': page_count,
+            'page_numbers': selected_pages
+        }
+
     output_file = os.path.join(output_dir, f"{pdf_name}_ocr.json")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+    write_json_atomic(output_file, output_data)
 
     # Fulltext
     text_file = os.path.join(output_dir, f"{pdf_name}_fulltext.txt")
-    with open(text_file, 'w', encoding='utf-8') as f:
-        for page_result in results:
-            if 'text' in page_result:
-                f.write(f"--- PAGE {page_result['page']} ---\n\n")
-                f.write(page_result['text'])
-                f.write("\n\n")
+    write_fulltext(text_file, results)
 
     # Summary
     print("="*60)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Text-Layer Detection für PDFs
+=============================
+Erkennt Seiten mit eingebettetem Text-Layer (born-digital), damit OCR
+nur dort läuft, wo es nötig ist
+
+Klassen:
+- text:    Brauchbarer Text-Layer, kaum/keine Bilder
+- mixed:   Text-Layer + großflächige Bilder (z.B. Scan mit OCR-Layer, Abbildungen)
+- scanned: Kein brauchbarer Text, Seite besteht aus Bildern (oder ist leer)
+
+Policies:
+- ocr-only:          Immer OCR (bisheriges Verhalten)
+- ocr-missing:       Text-Layer nur für "text"-Seiten, sonst OCR
+- prefer-text-layer: Text-Layer für "text" und "mixed", OCR nur für "scanned"
+
+Usage:
+    from text_layer import classify_pdf, use_text_layer
+
+    for info in classify_pdf("data/DTS_Flechte.pdf"):
+        if use_text_layer(info, "prefer-text-layer"):
+            ...
+"""
+
+import fitz  # PyMuPDF
+
+POLICIES = ['ocr-only', 'ocr-missing', 'prefer-text-layer']
+
+# Mindestanzahl sichtbarer Zeichen für einen "brauchbaren" Text-Layer
+MIN_TEXT_CHARS = 50
+
+# Anteil der Seitenfläche, ab dem Bilder als "großflächig" gelten
+IMAGE_COVERAGE_MIXED = 0.5
+
+# Max. Anteil unlesbarer Zeichen (kaputtes Font-Encoding → U+FFFD, Private Use Area)
+MAX_GARBAGE_RATIO = 0.1
+
+
+def _garbage_ratio(text: str) -> float:
+    """Anteil von Ersatz-/Private-Use-Zeichen im sichtbaren Text"""
+    visible = [c for c in text if not c.isspace()]
+    if not visible:
+        return 0.0
+
+    garbage = sum(1 for c in visible if c == '\ufffd' or '\ue000' <= c <= '\uf8ff')
+    return garbage / len(visible)
+
+
+def _image_coverage(page) -> float:
+    """Anteil der Seitenfläche, die von Bildern bedeckt ist"""
+    page_rect = page.rect
+    page_area = page_rect.width * page_rect.height
+    if page_area <= 0:
+        return 0.0
+
+    area = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info['bbox']) & page_rect
+        if not bbox.is_empty:
+            area += bbox.width * bbox.height
+
+    return min(area / page_area, 1.0)
+
+
+def classify_page(page) -> dict:
+    """
+    Klassifiziere eine PDF-Seite anhand Text-Layer und Bildfläche
+
+    Args:
+        page: fitz.Page
+
+    Returns:
+        dict mit page, page_class, text, text_characters, image_coverage
+    """
+    text = page.get_text("text")
+    visible_chars = sum(1 for c in text if not c.isspace())
+    coverage = _image_coverage(page)
+
+    usable = visible_chars >= MIN_TEXT_CHARS and _garbage_ratio(text) <= MAX_GARBAGE_RATIO
+
+    if not usable:
+        page_class = 'scanned'
+    elif coverage >= IMAGE_COVERAGE_MIXED:
+        page_class = 'mixed'
+    else:
+        page_class = 'text'
+
+    return {
+        'page': page.number + 1,
+        'page_class': page_class,
+        'text': text,
+        'text_characters': visible_chars,
+        'image_coverage': round(coverage, 3)
+    }
+
+
+def classify_pdf(pdf_path, pages=None) -> list:
+    """
+    Klassifiziere alle (oder ausgewählte) Seiten eines PDFs
+
+    Args:
+        pdf_path: Pfad zum PDF
+        pages: Optional Liste von Seitennummern (1-basiert)
+
+    Returns:
+        Liste von classify_page() Ergebnissen in Seitenreihenfolge
+    """
+    with fitz.open(pdf_path) as pdf_document:
+        if pages is None:
+            pages = range(1, len(pdf_document) + 1)
+
+        return [classify_page(pdf_document[page_num - 1]) for page_num in pages]
+
+
+def use_text_layer(info: dict, policy: str) -> bool:
+    """Soll für diese Seite der Text-Layer statt OCR verwendet werden?"""
+    if policy == 'ocr-only':
+        return False
+    if policy == 'ocr-missing':
+        return info['page_class'] == 'text'
+    if policy == 'prefer-text-layer':
+        return info['page_class'] in ('text', 'mixed')
+
+    raise ValueError(f"Unknown text layer policy: {policy}")
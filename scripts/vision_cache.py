@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Vision Encoding Cache
+=====================
+Wiederverwendung der Vision-Encoder-Ausgaben (globale Ansicht + Crop-Tiles) für
+mehrere Prompts auf demselben Bild
+
+Prompt-Vergleiche ("Extract all text", "Convert the document to markdown",
+"Free OCR") und Mehrfach-Ausgaben (Text + Markdown) kosten so nur einen
+Vision-Durchlauf pro Seite und Modus.
+
+Funktionsweise:
+- Key = Bildinhalt + base_size, image_size, crop_mode (ohne Prompt)
+- Pro Key werden die Bild-Tensoren einmal auf das Device gelegt und bei jedem
+  Prompt als dieselben Tensor-Objekte an model.generate() übergeben
+- sam_model und vision_model des Modells werden umhüllt: bekommen sie einen dieser
+  Tensoren, wird die gespeicherte Ausgabe zurückgegeben statt neu zu rechnen
+  (Projector und Decoder laufen normal)
+- LRU-Limit auf Anzahl Einträge (liegt im GPU-Speicher)
+
+Usage:
+    from vision_cache import VisionCache
+
+    engine = OcrEngine.load(vision_cache=VisionCache(max_entries=8))
+    text = engine.ocr(page, prompt=PROMPT_TEXT)
+    markdown = engine.ocr(page, prompt=PROMPT_MARKDOWN)   # Vision-Encoder aus dem Cache
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from result_cache import image_digest
+
+# Module des Modells, deren Ausgaben zwischengespeichert werden (Attributnamen im Modell-Code)
+ENCODERS = ('sam_model', 'vision_model')
+
+DEFAULT_MAX_ENTRIES = 8
+
+
+class _Encoding:
+    """Device-Tensoren eines Bildes in einem Modus und die Encoder-Ausgaben dazu"""
+
+    def __init__(self, crop, ori):
+        self.tensors = {'crop': crop, 'ori': ori}
+        self.outputs = {}
+
+
+class VisionCache:
+    """LRU-Cache für Vision-Encoder-Ausgaben pro Bild und Modus"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()
+        self._by_tensor = {}
+        self._lock = threading.Lock()
+        self._wrapped = set()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(image, base_size: int, image_size: int, crop_mode: bool) -> str:
+        """Key für Bild + Modus (unabhängig vom Prompt)"""
+        settings = json.dumps([base_size, image_size, crop_mode])
+        return hashlib.sha256(f"{image_digest(image)}\n{settings}".encode('utf-8')).hexdigest()
+
+    def attach(self, model) -> bool:
+        """
+        Encoder-Module des Modells umhüllen
+
+        Returns:
+            False, wenn das Modell keine bekannten Encoder-Module hat (Cache wirkungslos)
+        """
+        found = False
+        for name, module in model.named_modules():
+            role = name.rsplit('.', 1)[-1]
+            if role in ENCODERS and id(module) not in self._wrapped:
+                module.forward = self._memoized(role, module.forward)
+                self._wrapped.add(id(module))
+                found = True
+        return found
+
+    def _memoized(self, role, forward):
+        def wrapper(x, *args, **kwargs):
+            owner = self._by_tensor.get(id(x))
+            if owner is None or owner[0] is not x:
+                return forward(x, *args, **kwargs)
+
+            _, entry, view = owner
+            output = entry.outputs.get((role, view))
+            if output is not None:
+                self.hits += 1
+                return output
+
+            self.misses += 1
+            output = forward(x, *args, **kwargs)
+            entry.outputs[(role, view)] = output
+            return output
+
+        return wrapper
+
+    def tensors(self, key: str, inputs: dict, device):
+        """
+        (images_crop, images_ori) auf dem Device: bei bekanntem Key dieselben Objekte
+        wie beim letzten Mal, damit die Encoder ihre Ausgaben wiederfinden
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry.tensors['crop'], entry.tensors['ori']
+
+            entry = _Encoding(inputs['images_crop'].to(device), inputs['images_ori'].to(device))
+            self._entries[key] = entry
+            for view, tensor in entry.tensors.items():
+                self._by_tensor[id(tensor)] = (tensor, entry, view)
+
+            while len(self._entries) > self.max_entries:
+                _, old = self._entries.popitem(last=False)
+                for tensor in old.tensors.values():
+                    self._by_tensor.pop(id(tensor), None)
+
+            return entry.tensors['crop'], entry.tensors['ori']
+
+    def stats(self) -> dict:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+VRAM Budget
+===========
+Speicher-Abschätzung pro Seite und Zulassung von Seiten/Batches zur GPU
+
+Häufigster Abbruchgrund bei großen Dokumenten (DTS_Flechte) war CUDA out of memory.
+Statt die Seite als Fehler zu speichern, wird der Bedarf vor model.generate()
+abgeschätzt:
+
+- Vision-Encoder: Aktivierungen + Attention (quadratisch in den Patches) für
+  die globale Ansicht und jedes Crop-Tile
+- Decoder: KV-Cache für Prompt + max. Ausgabe-Tokens
+- Fester Overhead pro generate()-Aufruf
+
+Batches werden so geschnitten, dass sie ins Budget passen; eine Seite, die allein
+nicht passt, wird vorab in einem kleineren Modus gerechnet. Nach jedem Aufruf
+wird der gemessene Spitzenverbrauch mit der Schätzung verglichen und der
+Korrekturfaktor nachgeführt, nach einem OOM wird er verschärft. Die Verschärfung
+baut sich wieder ab, solange die Messungen darunter bleiben (ein einzelnes OOM,
+z.B. durch Fragmentierung, halbiert sonst die Batches für den Rest des Laufs).
+
+Usage:
+    from vram_budget import MemoryBudget, estimate_page_bytes
+
+    budget = MemoryBudget(limit_bytes=free_bytes * 0.9)
+    estimate = estimate_page_bytes(1024, 640, True, (3, 2), seq_len=9000, kv_bytes_per_token=61440)
+    if budget.fits(estimate): ...
+
+    # CLI: --vram-budget-gb 20 (Default: freier Speicher nach dem Laden, 0 = aus)
+"""
+
+from typing import List, Optional, Tuple
+
+PATCH_SIZE = 16
+
+# SAM-Encoder (ViT-B): Breite, Heads, gleichzeitig lebende Aktivierungen pro Patch
+VISION_WIDTH = 768
+VISION_HEADS = 12
+VISION_LIVE_TENSORS = 24
+
+# Decoder-Defaults, falls die Modell-Config nichts hergibt (DeepSeek-OCR 3B)
+DEFAULT_LAYERS = 12
+DEFAULT_HIDDEN = 1280
+DEFAULT_HEADS = 10
+
+# Workspace, Logits, Allocator-Verschnitt pro generate()-Aufruf
+FIXED_OVERHEAD = 512 * 1024 ** 2
+
+# Anteil des freien Speichers nach dem Laden, der als Budget gilt
+DEFAULT_HEADROOM = 0.9
+
+# Abbau der OOM-Verschärfung pro Aufruf, dessen Messung darunter liegt (nie unter den Messwert)
+OOM_DECAY = 0.9
+
+# Modi für OOM-Wiederholungen ohne konfigurierte Leiter, absteigender Speicherbedarf
+OOM_LADDER = ('base', 'small', 'tiny')
+
+GB = 1024 ** 3
+
+
+def _config_value(config, *names, default=None):
+    for name in names:
+        value = config.get(name) if isinstance(config, dict) else getattr(config, name, None)
+        if value:
+            return value
+    return default
+
+
+def kv_bytes_per_token(config=None, dtype_bytes: int = 2) -> int:
+    """KV-Cache pro Token (alle Layer, Key + Value) aus der Modell-Config"""
+    language = _config_value(config, 'language_config', default=config) if config is not None else None
+
+    layers = _config_value(language, 'num_hidden_layers', default=DEFAULT_LAYERS) if language else DEFAULT_LAYERS
+    hidden = _config_value(language, 'hidden_size', default=DEFAULT_HIDDEN) if language else DEFAULT_HIDDEN
+    heads = _config_value(language, 'num_attention_heads', default=DEFAULT_HEADS) if language else DEFAULT_HEADS
+    kv_heads = _config_value(language, 'num_key_value_heads', default=heads) if language else heads
+
+    head_dim = hidden // heads
+    return 2 * layers * kv_heads * head_dim * dtype_bytes
+
+
+def view_bytes(size: int, dtype_bytes: int = 2) -> int:
+    """Vision-Encoder-Spitze für eine quadratische Ansicht (global oder Tile)"""
+    patches = (size // PATCH_SIZE) ** 2
+    activations = patches * VISION_WIDTH * VISION_LIVE_TENSORS * dtype_bytes
+    attention = VISION_HEADS * patches * patches * dtype_bytes
+    return activations + attention
+
+
+def estimate_page_bytes(base_size: int, image_size: int, crop_mode: bool, crop_ratio: Tuple[int, int],
+                        seq_len: int, kv_bytes_per_token: int, dtype_bytes: int = 2) -> int:
+    """
+    Geschätzter Aktivierungs-Speicher einer Seite (ohne Modell-Gewichte)
+
+    Args:
+        crop_ratio: Crop-Raster (Spalten, Zeilen), (1, 1) = keine Tiles
+        seq_len: Prompt-Tokens + max. Ausgabe-Tokens
+    """
+    tiles = crop_ratio[0] * crop_ratio[1] if crop_mode and crop_ratio != (1, 1) else 0
+    vision = view_bytes(base_size if crop_mode else image_size, dtype_bytes) + tiles * view_bytes(image_size, dtype_bytes)
+    return vision + seq_len * kv_bytes_per_token
+
+
+def is_oom_error(error: BaseException) -> bool:
+    """CUDA/CPU out of memory (torch.cuda.OutOfMemoryError oder RuntimeError-Text)"""
+    if type(error).__name__ == 'OutOfMemoryError':
+        return True
+    message = str(error).lower()
+    return 'out of memory' in message or 'cublas_status_alloc_failed' in message
+
+
+class MemoryBudget:
+    """Zulassung von Batches anhand geschätzter Bytes, mit gemessenem Korrekturfaktor"""
+
+    def __init__(self, limit_bytes: Optional[int]):
+        """
+        Args:
+            limit_bytes: Verfügbarer Speicher für Aktivierungen (None/0 = keine Begrenzung)
+        """
+        self.limit = int(limit_bytes) if limit_bytes else None
+        self.factor = 1.0
+        # Höchster gemessener Faktor (Spitzenverbrauch / Schätzung), Untergrenze für factor
+        self.measured = 1.0
+        self.ooms = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit is not None
+
+    def cost(self, estimates) -> int:
+        """Korrigierter Bedarf eines Batches"""
+        return int((FIXED_OVERHEAD + sum(estimates)) * self.factor)
+
+    def fits(self, *estimates) -> bool:
+        return not self.enabled or self.cost(estimates) <= self.limit
+
+    def plan(self, estimates: List[int], batch_size: int) -> List[List[int]]:
+        """
+        Teile Seiten (in Reihenfolge) in Batches mit max. batch_size Seiten,
+        die jeweils ins Budget passen
+
+        Returns:
+            Listen von Positionen in estimates
+        """
+        chunks = []
+        current = []
+        for position, estimate in enumerate(estimates):
+            candidate = [estimates[i] for i in current] + [estimate]
+            if current and (len(current) >= batch_size or not self.fits(*candidate)):
+                chunks.append(current)
+                current = []
+            current.append(position)
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def observe(self, estimates, peak_bytes: int):
+        """
+        Gemessenen Spitzenverbrauch eines Aufrufs einrechnen
+
+        Der Messwert wächst nur; eine OOM-Verschärfung darüber baut sich mit jeder
+        niedrigeren Messung um OOM_DECAY ab.
+        """
+        expected = FIXED_OVERHEAD + sum(estimates)
+        if expected <= 0:
+            return
+        self.measured = max(self.measured, peak_bytes / expected)
+        if self.factor < self.measured:
+            self.factor = self.measured
+        elif self.factor > self.measured:
+            self.factor = max(self.measured, self.factor * OOM_DECAY)
+
+    def record_oom(self, estimates):
+        """Nach OOM: dieser Bedarf passt offenbar nicht, Faktor so setzen, dass er knapp drüber liegt"""
+        self.ooms += 1
+        if not self.enabled:
+            return
+        expected = FIXED_OVERHEAD + sum(estimates)
+        self.factor = max(self.factor * 1.1, self.limit * 1.05 / expected)
+
+    def describe(self) -> str:
+        if not self.enabled:
+            return "off"
+        return f"{self.limit / GB:.1f} GB (correction x{self.factor:.2f})"